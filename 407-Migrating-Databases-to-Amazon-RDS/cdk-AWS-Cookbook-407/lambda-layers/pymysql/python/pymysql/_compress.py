@@ -0,0 +1,86 @@
+"""
+Compression of the client/server protocol.
+
+https://dev.mysql.com/doc/dev/mysql-server/latest/page_protocol_basic_compression.html
+
+Once compression is negotiated, the stream of packets is split into
+compressed packets. Each has a 7 byte header: the length of its payload,
+its own sequence id and the length of the payload uncompressed, which is
+0 when the payload was not compressed.
+"""
+import struct
+import zlib
+
+from ._compat import range_type
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+#: Payloads shorter than this are sent uncompressed, like libmysqlclient does.
+MIN_COMPRESS_LENGTH = 50
+
+MAX_PAYLOAD_LEN = 2**24-1
+
+#: Level the server is asked to compress with, the default of MySQL.
+ZSTD_LEVEL = 3
+
+_HEADER = struct.Struct('<HBBHB')
+HEADER_LEN = _HEADER.size
+
+
+class ZlibCodec(object):
+    name = 'zlib'
+
+    def compress(self, data):
+        return zlib.compress(data)
+
+    def decompress(self, data, length):
+        return zlib.decompress(data, 15, length)
+
+
+class ZstdCodec(object):
+    name = 'zstd'
+
+    def __init__(self, level=ZSTD_LEVEL):
+        self._compressor = zstandard.ZstdCompressor(level=level)
+        self._decompressor = zstandard.ZstdDecompressor()
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def decompress(self, data, length):
+        return self._decompressor.decompress(data, max_output_size=length)
+
+
+def pack(codec, data, sequence_id):
+    """Frame *data* in compressed packets.
+
+    Returns the packets and the sequence id that follows them.
+    """
+    packets = []
+    for start in range_type(0, max(len(data), 1), MAX_PAYLOAD_LEN):
+        chunk = data[start:start + MAX_PAYLOAD_LEN]
+        length = len(chunk)
+        payload = chunk
+        uncompressed_length = 0
+        if length >= MIN_COMPRESS_LENGTH:
+            compressed = codec.compress(chunk)
+            if len(compressed) < length:
+                payload = compressed
+                uncompressed_length = length
+        packets.append(_HEADER.pack(
+            len(payload) & 0xffff, len(payload) >> 16, sequence_id,
+            uncompressed_length & 0xffff, uncompressed_length >> 16))
+        packets.append(payload)
+        sequence_id = (sequence_id + 1) % 256
+    return b''.join(packets), sequence_id
+
+
+def unpack_header(header):
+    """Return the payload length, sequence id and uncompressed length."""
+    low, high, sequence_id, uncompressed_low, uncompressed_high = \
+        _HEADER.unpack(header)
+    return (low + (high << 16), sequence_id,
+            uncompressed_low + (uncompressed_high << 16))
@@ -0,0 +1,168 @@
+"""
+Compiled query templates for Cursor.mogrify.
+
+A query is split at its ``%s`` and ``%(name)s`` placeholders once and
+kept in a cache. It is formatted by escaping each argument with the
+function chosen for its position, from the types of the arguments it
+was last formatted with, and by joining the pieces at once, instead of
+running ``query % escaped_args``.
+
+Queries with other ``%`` formats are not compiled, nor are queries in
+bytes or on Python 2; they are formatted with ``%`` as before.
+"""
+import re
+
+from ._compat import PY2, str_type, text_type
+from . import converters
+from .constants import SERVER_STATUS
+
+#: Number of templates cached, the cache is cleared when it is full.
+CACHE_SIZE = 512
+
+#: A ``%`` format: ``%s``, ``%(name)s``, ``%%`` or anything else.
+RE_FORMAT = re.compile(r"%(?:\(([^()]*)\))?(.?)", re.DOTALL)
+
+#: Encoders of converters which escape a value by itself.
+_PLAIN_ENCODERS = frozenset([
+    converters.escape_bool, converters.escape_int, converters.escape_float,
+    converters.escape_str, converters.escape_unicode, converters.escape_None,
+    converters.escape_datetime, converters.escape_date, converters.escape_timedelta,
+    converters.escape_time, converters.escape_struct_time,
+])
+
+_cache = {}
+
+
+def get_template(query):
+    """Return the template of *query*, None if it can not be compiled."""
+    try:
+        return _cache[query]
+    except KeyError:
+        pass
+    if PY2 or not isinstance(query, text_type):
+        return None
+    template = QueryTemplate.compile(query)
+    if len(_cache) >= CACHE_SIZE:
+        _cache.clear()
+    _cache[query] = template
+    return template
+
+
+class QueryTemplate(object):
+    """A query split at its placeholders."""
+
+    def __init__(self, parts, keys):
+        #: Pieces of the query, with None where the arguments go.
+        self._parts = parts
+        #: Position or name of the argument of each placeholder.
+        self.keys = keys
+        self.named = bool(keys) and isinstance(keys[0], text_type)
+        # (encoders, options, types, escapers) it was formatted with last
+        self._bound = None
+
+    @classmethod
+    def compile(cls, query):
+        """Split *query*, return None if it has other formats than
+        ``%s``, ``%(name)s`` and ``%%``."""
+        parts = []
+        keys = []
+        literal = []
+        pos = 0
+        for m in RE_FORMAT.finditer(query):
+            name, conversion = m.groups()
+            literal.append(query[pos:m.start()])
+            pos = m.end()
+            if conversion == '%' and name is None:
+                literal.append('%')
+                continue
+            if conversion != 's':
+                return None
+            parts.append(''.join(literal))
+            parts.append(None)
+            literal = []
+            keys.append(len(keys) if name is None else name)
+        literal.append(query[pos:])
+        parts.append(''.join(literal))
+        if len(set(type(key) for key in keys)) > 1:
+            # mixed %s and %(name)s
+            return None
+        return cls(parts, keys)
+
+    def format(self, conn, args):
+        """Return the query with *args* escaped for *conn*.
+
+        Returns None if *args* do not suit the template, such as a dict for
+        ``%s`` placeholders, and raise like ``%`` for missing arguments.
+        """
+        values = self.values(args)
+        if values is None:
+            return None
+        return self.join(conn, values, self.escapers(conn, values))
+
+    def values(self, args):
+        """Return the arguments of the placeholders in order, None if *args*
+        do not suit the template."""
+        if isinstance(args, (tuple, list)) and not self.named:
+            if len(args) != len(self.keys):
+                if len(args) < len(self.keys):
+                    raise TypeError("not enough arguments for format string")
+                raise TypeError("not all arguments converted during string formatting")
+            return args
+        if isinstance(args, dict) and (self.named or not self.keys):
+            return [args[key] for key in self.keys]
+        return None
+
+    def escapers(self, conn, values):
+        """Return the type and escape function of each of *values* for *conn*."""
+        types = tuple(map(type, values))
+        options = (conn.charset, conn._binary_prefix,
+                   bool(conn.server_status & SERVER_STATUS.SERVER_STATUS_NO_BACKSLASH_ESCAPES))
+        bound = self._bound
+        if bound is not None and bound[0] is conn.encoders \
+                and bound[1] == options and bound[2] == types:
+            return bound[3]
+        found = {}
+        for t in types:
+            if t not in found:
+                found[t] = _escaper(t, conn.encoders, *options)
+        # a position without its escape function goes through conn.literal()
+        escapers = [(t, found[t]) if found[t] is not None else (None, None)
+                    for t in types]
+        self._bound = (conn.encoders, options, types, escapers)
+        return escapers
+
+    def join(self, conn, values, escapers):
+        """Escape *values* with *escapers*, or with conn.literal() the values
+        of other types, and join them in the query."""
+        literal = conn.literal
+        parts = list(self._parts)
+        parts[1::2] = [f(v) if type(v) is t else literal(v)
+                       for v, (t, f) in zip(values, escapers)]
+        return ''.join(parts)
+
+
+def _escaper(t, encoders, charset, binary_prefix, no_backslash_escapes):
+    """Return the function Connection.literal() would escape a *t* with."""
+    if issubclass(t, str_type):
+        if no_backslash_escapes:
+            return _escape_quotes
+        return converters.escape_unicode
+    if issubclass(t, (bytes, bytearray)):
+        if no_backslash_escapes:
+            return None
+        if binary_prefix:
+            return converters.escape_bytes_prefixed
+        return converters.escape_bytes
+    encoder = encoders.get(t) or encoders.get(text_type)
+    if encoder is None:
+        return None
+    if encoder in (converters.escape_dict, converters.escape_sequence):
+        return lambda v: encoder(v, charset, encoders)
+    if encoder in _PLAIN_ENCODERS:
+        # they do not use the mapping
+        return encoder
+    return lambda v: encoder(v, encoders)
+
+
+def _escape_quotes(value):
+    return "'" + value.replace("'", "''") + "'"
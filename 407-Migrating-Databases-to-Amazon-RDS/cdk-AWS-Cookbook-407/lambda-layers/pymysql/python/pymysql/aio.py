@@ -0,0 +1,920 @@
+"""
+asyncio connections, cursors and pool.
+
+The protocol handling of :class:`connections.Connection` is reused: the
+connection receives each response with asyncio streams and queues its
+packets, then the usual parsing code reads them from that queue. Writes
+go to the stream's transport without blocking. Requires Python 3.7+::
+
+    conn = await pymysql.aio.connect(host=..., user=..., password=...)
+    async with conn.cursor() as cursor:
+        await cursor.execute("SELECT 1")
+        print(cursor.fetchall())
+    await conn.close()
+
+Rows of a buffered cursor are all received by ``execute()``, fetching
+them does not wait. :class:`AsyncSSCursor` receives them as they are
+fetched, with ``await cursor.fetchone()`` or ``async for row in cursor``.
+
+One connection runs one command at a time; use one connection per task,
+or an :class:`AsyncConnectionPool`.
+
+Authentication is the only part that runs on a thread of the event
+loop's default executor, so that every authentication method and TLS
+work as they do with the blocking connection.
+"""
+import asyncio
+import collections
+import socket
+import struct
+import warnings
+
+from . import connections, cursors, err
+from .constants import COMMAND, CR
+from .pool import PoolStats, PoolTimeoutError, _Entry, _now
+from .protocol import MysqlPacket, LoadLocalPacketWrapper
+
+
+async def connect(*args, **kwargs):
+    """Open a connection, see :class:`connections.Connection` for arguments."""
+    conn = AsyncConnection(*args, **kwargs)
+    await conn.connect()
+    return conn
+
+
+class _StreamSocket(object):
+    """Stands in for the socket of a connection that uses asyncio streams."""
+
+    def __init__(self, writer):
+        self.writer = writer
+
+    def write(self, data):
+        self.writer.write(data)
+
+    def close(self):
+        self.writer.close()
+
+    def settimeout(self, timeout):
+        pass
+
+    def makefile(self, mode):
+        return None
+
+
+class _StartTLS(object):
+    """Stands in for the SSL context during authentication.
+
+    Connection._request_authentication wraps the socket once the server
+    agreed to TLS. This upgrades the stream on the event loop instead.
+    """
+
+    def __init__(self, conn, ctx, loop):
+        self.conn = conn
+        self.ctx = ctx
+        self.loop = loop
+
+    def wrap_socket(self, sock, server_hostname=None):
+        asyncio.run_coroutine_threadsafe(
+            self.conn._start_tls(self.ctx, server_hostname), self.loop).result()
+        return sock
+
+
+class AsyncConnection(connections.Connection):
+    """
+    Connection to a MySQL server for use with asyncio.
+
+    Takes the same arguments as :class:`connections.Connection`, but does
+    not connect on construction: await :meth:`connect`, or use the
+    module's :func:`connect`. Methods that talk to the server are
+    coroutines. The default cursor class is :class:`AsyncCursor`.
+    """
+
+    def __init__(self, *args, **kwargs):
+        kwargs['defer_connect'] = True
+        super().__init__(*args, **kwargs)
+        if self.compress:
+            raise NotImplementedError(
+                "compress is not supported by AsyncConnection")
+        if self.cursorclass is cursors.Cursor:
+            self.cursorclass = AsyncCursor
+        self._reader = None
+        self._packets = collections.deque()
+        # event loop of the connection while authentication runs in a thread
+        self._auth_loop = None
+
+    def pipeline(self, depth=connections.PIPELINE_DEPTH):
+        raise NotImplementedError(
+            "pipeline() is not supported by AsyncConnection")
+
+    async def connect(self):
+        self._closed = False
+        loop = asyncio.get_running_loop()
+        try:
+            if self.unix_socket:
+                reader, writer = await asyncio.wait_for(
+                    asyncio.open_unix_connection(self.unix_socket),
+                    self.connect_timeout)
+                self.host_info = "Localhost via UNIX socket"
+                self._secure = True
+            else:
+                local_addr = None
+                if self.bind_address is not None:
+                    local_addr = (self.bind_address, 0)
+                reader, writer = await asyncio.wait_for(
+                    asyncio.open_connection(self.host, self.port,
+                                            local_addr=local_addr),
+                    self.connect_timeout)
+                self.host_info = "socket %s:%d" % (self.host, self.port)
+                sock = writer.get_extra_info('socket')
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+
+            self._reader = reader
+            self._sock = _StreamSocket(writer)
+            self._next_seq_id = 0
+            self._packets.clear()
+
+            await self._read_packets(1)
+            self._get_server_information()
+            await self._authenticate(loop)
+
+            if self.sql_mode is not None:
+                await self.query("SET sql_mode=%s" % self.escape(self.sql_mode))
+
+            if self.init_command is not None:
+                await self.query(self.init_command)
+                await self.commit()
+
+            if self.autocommit_mode is not None:
+                await self.autocommit(self.autocommit_mode)
+        except BaseException as e:
+            self._force_close()
+            if isinstance(e, (OSError, asyncio.TimeoutError)):
+                exc = err.OperationalError(
+                    2003,
+                    "Can't connect to MySQL server on %r (%r)" % (self.host, e))
+                exc.original_exception = e
+                raise exc from e
+            raise
+
+    async def _authenticate(self, loop):
+        if self.ssl:
+            ctx = self.ctx
+            self.ctx = _StartTLS(self, ctx, loop)
+        self._auth_loop = loop
+        try:
+            await loop.run_in_executor(None, self._request_authentication)
+        finally:
+            self._auth_loop = None
+            if self.ssl:
+                self.ctx = ctx
+
+    async def _start_tls(self, ctx, server_hostname):
+        writer = self._sock.writer
+        await writer.drain()
+        if hasattr(writer, 'start_tls'):
+            await writer.start_tls(ctx, server_hostname=server_hostname)
+            return
+        # StreamWriter.start_tls() is only available since Python 3.11
+        transport = await asyncio.get_running_loop().start_tls(
+            writer.transport, writer.transport.get_protocol(), ctx,
+            server_hostname=server_hostname)
+        writer._transport = transport
+        self._reader._transport = transport
+
+    async def close(self):
+        """Send the quit message and close the connection."""
+        if self._closed:
+            raise err.Error("Already closed")
+        self._closed = True
+        if self._sock is None:
+            return
+        writer = self._sock.writer
+        try:
+            writer.write(struct.pack('<iB', 1, COMMAND.COM_QUIT))
+            await writer.drain()
+        except Exception:
+            pass
+        finally:
+            self._force_close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        if not self._closed:
+            await self.close()
+
+    async def autocommit(self, value):
+        self.autocommit_mode = bool(value)
+        if value != self.get_autocommit():
+            await self._ok_command(
+                COMMAND.COM_QUERY,
+                "SET AUTOCOMMIT = %s" % self.escape(self.autocommit_mode))
+
+    async def begin(self):
+        """Begin transaction."""
+        await self._ok_command(COMMAND.COM_QUERY, "BEGIN")
+
+    async def commit(self):
+        """Commit changes to stable storage."""
+        await self._ok_command(COMMAND.COM_QUERY, "COMMIT")
+
+    async def rollback(self):
+        """Roll back the current transaction."""
+        await self._ok_command(COMMAND.COM_QUERY, "ROLLBACK")
+
+    async def show_warnings(self):
+        """Send the "SHOW WARNINGS" SQL command."""
+        await self.query("SHOW WARNINGS")
+        return self._result.rows
+
+    async def select_db(self, db):
+        """Set current db."""
+        await self._ok_command(COMMAND.COM_INIT_DB, db)
+
+    async def query(self, sql, unbuffered=False):
+        if isinstance(sql, str):
+            sql = sql.encode(self.encoding, 'surrogateescape')
+        await self._command(COMMAND.COM_QUERY, sql)
+        self._affected_rows = await self._read_query_result(unbuffered)
+        return self._affected_rows
+
+    async def next_result(self, unbuffered=False):
+        self._affected_rows = await self._read_query_result(unbuffered)
+        return self._affected_rows
+
+    async def kill(self, thread_id):
+        arg = struct.pack('<I', thread_id)
+        return await self._ok_command(COMMAND.COM_PROCESS_KILL, arg)
+
+    async def ping(self, reconnect=True):
+        """Check if the server is alive, see Connection.ping()."""
+        if self._sock is None:
+            if reconnect:
+                await self.connect()
+                reconnect = False
+            else:
+                raise err.Error("Already closed")
+        try:
+            await self._ok_command(COMMAND.COM_PING, "")
+        except Exception:
+            if reconnect:
+                await self.connect()
+                await self.ping(False)
+            else:
+                raise
+
+    async def set_charset(self, charset):
+        encoding = connections.charset_by_name(charset).encoding
+        await self._command(COMMAND.COM_QUERY,
+                            "SET NAMES %s" % self.escape(charset))
+        await self._read_packets(1)
+        self._read_packet()
+        self.charset = charset
+        self.encoding = encoding
+
+    async def _command(self, command, sql):
+        await self._finish_result()
+        self._execute_command(command, sql)
+
+    async def _ok_command(self, command, sql):
+        await self._command(command, sql)
+        await self._read_packets(1)
+        return self._read_ok_packet()
+
+    async def _finish_result(self):
+        """Receive what is left of the last result before a new command."""
+        result = self._result
+        if result is None:
+            return
+        if result.unbuffered_active:
+            warnings.warn("Previous unbuffered result was left incomplete")
+            await self._finish_unbuffered_query(result)
+        while self._result.has_next:
+            await self.next_result()
+        self._result = None
+
+    async def _read_query_result(self, unbuffered=False):
+        self._result = None
+        result = connections.MySQLResult(self)
+        first = await self._read_packet_data()
+        if first[0] == 0xfb:
+            await self._read_load_local_packet(result)
+        elif first[0] in (0x00, 0xff):
+            # OK or error
+            result.read()
+        else:
+            field_count = MysqlPacket(first, None).read_length_encoded_integer()
+            # column definitions and the EOF packet after them
+            await self._read_packets(field_count + 1)
+            if unbuffered:
+                try:
+                    result.init_unbuffered_query()
+                except:  # noqa
+                    result.unbuffered_active = False
+                    result.connection = None
+                    raise
+            else:
+                while True:
+                    data = await self._read_packet_data()
+                    if data[0] == 0xff or (data[0] == 0xfe and len(data) < 9):
+                        break
+                result.read()
+        self._result = result
+        if result.server_status is not None:
+            self.server_status = result.server_status
+        return result.affected_rows
+
+    async def _read_load_local_packet(self, result):
+        """Send the file the server asked for with LOAD DATA LOCAL INFILE."""
+        packet = self._read_packet()
+        if not self._local_infile:
+            raise RuntimeError(
+                "**WARN**: Received LOAD_LOCAL packet but local_infile option is false.")
+        filename = LoadLocalPacketWrapper(packet).filename
+        source, progress = self._local_infile_source or (None, None)
+        sender = connections.LoadLocalFile(filename, self, source, progress)
+        writer = self._sock.writer
+        try:
+            try:
+                for chunk in sender.read_chunks():
+                    self.write_packet(chunk)
+                    await writer.drain()
+            finally:
+                # send the empty packet to signify we are done sending data
+                self.write_packet(b'')
+        except:  # noqa
+            await self._read_packets(1)
+            self._read_packet()  # skip ok packet
+            raise
+
+        await self._read_packets(1)
+        ok_packet = self._read_packet()
+        if not ok_packet.is_ok_packet():
+            raise err.OperationalError(2014, "Commands Out of Sync")
+        result._read_ok_packet(ok_packet)
+        result.connection = None
+
+    async def _read_unbuffered_row(self, result):
+        """Receive and return the next row of an unbuffered result."""
+        if not result.unbuffered_active:
+            return None
+        await self._read_packets(1)
+        return result._read_rowdata_packet_unbuffered()
+
+    async def _finish_unbuffered_query(self, result):
+        while result.unbuffered_active:
+            await self._read_packets(1)
+            if result._check_packet_is_eof(self._read_packet()):
+                result.unbuffered_active = False
+                result.connection = None
+
+    async def _read_packets(self, count):
+        """Receive *count* packets for _read_packet to return."""
+        for _ in range(count):
+            await self._read_packet_data()
+
+    async def _read_packet_data(self):
+        """Receive the next packet, queue its payload and return it."""
+        writer = self._sock.writer
+        if writer.transport.get_write_buffer_size():
+            await writer.drain()
+        chunks = []
+        while True:
+            header = await self._read_exactly(4)
+            btrl, btrh, packet_number = struct.unpack('<HBB', header)
+            bytes_to_read = btrl + (btrh << 16)
+            if packet_number != self._next_seq_id:
+                self._force_close()
+                if packet_number == 0:
+                    # MariaDB sends error packet with seqno==0 when shutdown
+                    raise err.OperationalError(
+                        CR.CR_SERVER_LOST,
+                        "Lost connection to MySQL server during query")
+                raise err.InternalError(
+                    "Packet sequence number wrong - got %d expected %d"
+                    % (packet_number, self._next_seq_id))
+            self._next_seq_id = (self._next_seq_id + 1) % 256
+            chunks.append(await self._read_exactly(bytes_to_read))
+            if bytes_to_read < connections.MAX_PACKET_LEN:
+                break
+        data = chunks[0] if len(chunks) == 1 else b''.join(chunks)
+        self._packets.append(data)
+        return data
+
+    async def _read_exactly(self, num_bytes):
+        try:
+            if self._read_timeout:
+                return await asyncio.wait_for(
+                    self._reader.readexactly(num_bytes), self._read_timeout)
+            return await self._reader.readexactly(num_bytes)
+        except (asyncio.IncompleteReadError, asyncio.TimeoutError,
+                OSError) as e:
+            self._force_close()
+            raise err.OperationalError(
+                CR.CR_SERVER_LOST,
+                "Lost connection to MySQL server during query (%r)" % (e,))
+
+    def _read_packet(self, packet_type=MysqlPacket, allow_view=False):
+        """Return the next received packet as *packet_type*.
+
+        While authenticating on an executor thread, the packet is received
+        on the event loop first.
+        """
+        if self._auth_loop is not None:
+            asyncio.run_coroutine_threadsafe(
+                self._read_packets(1), self._auth_loop).result()
+        try:
+            data = self._packets.popleft()
+        except IndexError:
+            raise err.InternalError("Packet read before it was received")
+        packet = packet_type(data, self.encoding)
+        if packet.is_error_packet():
+            if self._result is not None and self._result.unbuffered_active is True:
+                self._result.unbuffered_active = False
+            packet.raise_for_error()
+        return packet
+
+    def _write_bytes(self, data):
+        if self._auth_loop is not None:
+            self._auth_loop.call_soon_threadsafe(self._sock.write, data)
+        else:
+            self._sock.write(data)
+
+
+class AsyncCursor(cursors.Cursor):
+    """
+    Cursor for an :class:`AsyncConnection`.
+
+    execute(), executemany(), callproc(), nextset() and close() are
+    coroutines. The whole result is received by execute(), fetching rows
+    does not wait.
+    """
+
+    async def close(self):
+        conn = self.connection
+        if conn is None:
+            return
+        try:
+            while await self.nextset():
+                pass
+        finally:
+            self.connection = None
+
+    def __enter__(self):
+        # close() is a coroutine, Cursor.__exit__ would never await it
+        raise TypeError("Use 'async with' with an AsyncCursor")
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def _nextset(self, unbuffered=False):
+        """Get the next query set"""
+        conn = self._get_db()
+        current_result = self._result
+        if current_result is None or current_result is not conn._result:
+            return None
+        if not current_result.has_next:
+            return None
+        self._result = None
+        self._clear_result()
+        await conn.next_result(unbuffered=unbuffered)
+        self._do_get_result()
+        return True
+
+    async def nextset(self):
+        return await self._nextset(False)
+
+    async def execute(self, query, args=None):
+        """Execute a query, see Cursor.execute()."""
+        while await self.nextset():
+            pass
+
+        query = self.mogrify(query, args)
+
+        result = await self._query(query)
+        self._executed = query
+        return result
+
+    async def load_data_local(self, query, source, progress=None):
+        """Execute LOAD DATA LOCAL INFILE with data from source, see Cursor.load_data_local()."""
+        conn = self._get_db()
+        conn._local_infile_source = (source, progress)
+        try:
+            return await self.execute(query)
+        finally:
+            conn._local_infile_source = None
+
+    async def executemany(self, query, args):
+        """Run several data against one query, see Cursor.executemany()."""
+        if not args:
+            return
+
+        m = cursors.RE_INSERT_VALUES.match(query)
+        if m:
+            q_prefix = m.group(1) % ()
+            q_values = m.group(2).rstrip()
+            q_postfix = m.group(3) or ''
+            assert q_values[0] == '(' and q_values[-1] == ')'
+            rows = 0
+            for sql in self._iter_execute_many(q_prefix, q_values, q_postfix,
+                                               args, self.max_stmt_length,
+                                               self._get_db().encoding):
+                rows += await self.execute(sql)
+        else:
+            rows = 0
+            for arg in args:
+                rows += await self.execute(query, arg)
+        self.rowcount = rows
+        return rows
+
+    async def callproc(self, procname, args=()):
+        """Execute stored procedure procname with args, see Cursor.callproc()."""
+        conn = self._get_db()
+        if args:
+            fmt = '@_{0}_%d=%s'.format(procname)
+            await self._query('SET %s' % ','.join(fmt % (index, conn.escape(arg))
+                                                  for index, arg in enumerate(args)))
+            await self.nextset()
+
+        q = "CALL %s(%s)" % (procname,
+                             ','.join(['@_%s_%d' % (procname, i)
+                                       for i in range(len(args))]))
+        await self._query(q)
+        self._executed = q
+        return args
+
+    async def _query(self, q):
+        conn = self._get_db()
+        self._last_executed = q
+        self._clear_result()
+        await conn.query(q)
+        self._do_get_result()
+        return self.rowcount
+
+
+class AsyncDictCursor(cursors.DictCursorMixin, AsyncCursor):
+    """A cursor which returns results as a dictionary"""
+
+
+class AsyncSSCursor(AsyncCursor):
+    """
+    Unbuffered cursor, see :class:`cursors.SSCursor`.
+
+    Rows are received as they are fetched, so the fetch methods are
+    coroutines too. Iterate over the rows with ``async for``.
+    """
+
+    async def close(self):
+        conn = self.connection
+        if conn is None:
+            return
+
+        if self._result is not None and self._result is conn._result:
+            await conn._finish_unbuffered_query(self._result)
+
+        try:
+            while await self.nextset():
+                pass
+        finally:
+            self.connection = None
+
+    async def _query(self, q):
+        conn = self._get_db()
+        self._last_executed = q
+        self._clear_result()
+        await conn.query(q, unbuffered=True)
+        self._do_get_result()
+        return self.rowcount
+
+    async def nextset(self):
+        return await self._nextset(unbuffered=True)
+
+    async def read_next(self):
+        """Read next row"""
+        row = await self._get_db()._read_unbuffered_row(self._result)
+        return self._conv_row(row)
+
+    async def fetchone(self):
+        """Fetch next row"""
+        self._check_executed()
+        row = await self.read_next()
+        if row is None:
+            return None
+        self.rownumber += 1
+        return row
+
+    async def fetchmany(self, size=None):
+        """Fetch many"""
+        self._check_executed()
+        if size is None:
+            size = self.arraysize
+
+        rows = []
+        for i in range(size):
+            row = await self.read_next()
+            if row is None:
+                break
+            rows.append(row)
+            self.rownumber += 1
+        return rows
+
+    async def fetchall(self):
+        """Fetch all remaining rows into a list."""
+        return [row async for row in self]
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        row = await self.fetchone()
+        if row is None:
+            raise StopAsyncIteration
+        return row
+
+    def scroll(self, value, mode='relative'):
+        raise err.NotSupportedError("Scrolling not supported by this cursor")
+
+
+class AsyncSSDictCursor(cursors.DictCursorMixin, AsyncSSCursor):
+    """An unbuffered cursor, which returns results as a dictionary"""
+
+
+class AsyncConnectionPool(object):
+    """
+    Pool of :class:`AsyncConnection`, the asyncio counterpart of
+    :class:`pool.ConnectionPool` with the same options and statistics.
+
+    Await :meth:`open` to open minsize connections up front. Waiters are
+    served in order of arrival.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.minsize = kwargs.pop('minsize', 0)
+        self.maxsize = kwargs.pop('maxsize', 10)
+        self.timeout = kwargs.pop('timeout', None)
+        self.max_lifetime = kwargs.pop('max_lifetime', None)
+        self.max_idle = kwargs.pop('max_idle', None)
+        self.ping_interval = kwargs.pop('ping_interval', 1)
+        if not 0 <= self.minsize <= self.maxsize or self.maxsize < 1:
+            raise ValueError("Invalid pool size: minsize=%r, maxsize=%r"
+                             % (self.minsize, self.maxsize))
+        self._args = args
+        self._kwargs = kwargs
+
+        self._idle = collections.deque()
+        self._in_use = {}
+        self._size = 0
+        # futures of the tasks waiting for a connection, in order of arrival
+        self._waiters = collections.deque()
+        self._closed = False
+        self._checkouts = self._waits = self._timeouts = 0
+        self._created = self._discarded = 0
+        self._checkout_time = self._max_checkout_time = 0.0
+
+    async def open(self):
+        """Open connections until there are minsize."""
+        while self._size < self.minsize:
+            self._size += 1
+            try:
+                entry = await self._open()
+            except BaseException:
+                self._size -= 1
+                raise
+            self._put(entry)
+        return self
+
+    async def acquire(self, timeout=-1):
+        """
+        Check out a connection, waiting at most *timeout* seconds for one.
+
+        :raise PoolTimeoutError: If no connection became available in time.
+        :raise InterfaceError: If the pool is closed.
+        """
+        if timeout == -1:
+            timeout = self.timeout
+        start = _now()
+        deadline = None if timeout is None else start + timeout
+        while True:
+            entry, waited = await self._checkout(deadline)
+            if entry is None:
+                try:
+                    entry = await self._open()
+                except BaseException:
+                    self._forget()
+                    raise
+            elif not await self._is_healthy(entry):
+                self._close(entry.conn)
+                self._forget()
+                continue
+            break
+
+        elapsed = _now() - start
+        self._in_use[id(entry.conn)] = entry
+        self._checkouts += 1
+        self._checkout_time += elapsed
+        if elapsed > self._max_checkout_time:
+            self._max_checkout_time = elapsed
+        if waited:
+            self._waits += 1
+        return entry.conn
+
+    async def release(self, conn, discard=False):
+        """Return a connection to the pool, see ConnectionPool.release()."""
+        try:
+            entry = self._in_use.pop(id(conn))
+        except KeyError:
+            raise ValueError("Connection does not belong to this pool")
+
+        if not discard:
+            try:
+                await self._reset(entry)
+            except Exception:
+                discard = True
+        now = _now()
+        if (self.max_lifetime is not None
+                and now - entry.created >= self.max_lifetime):
+            discard = True
+
+        if discard or self._closed:
+            self._close(conn)
+            self._forget()
+        else:
+            entry.last_used = now
+            self._put(entry)
+
+    def connection(self, timeout=-1):
+        """
+        Async context manager that checks out a connection and returns it.
+
+        The connection is discarded if the block raised an
+        :class:`OperationalError` or :class:`InterfaceError`.
+        """
+        return _PooledConnection(self, timeout)
+
+    def close(self):
+        """Close the idle connections and the others when they are returned."""
+        self._closed = True
+        idle = list(self._idle)
+        self._idle.clear()
+        self._size -= len(idle)
+        self._discarded += len(idle)
+        for entry in idle:
+            self._close(entry.conn)
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_exception(err.InterfaceError(0, "Pool is closed"))
+
+    def stats(self):
+        """Return a :data:`pool.PoolStats` snapshot."""
+        return PoolStats(
+            size=self._size,
+            idle=len(self._idle),
+            in_use=len(self._in_use),
+            waiting=len(self._waiters),
+            checkouts=self._checkouts,
+            checkout_time=self._checkout_time,
+            max_checkout_time=self._max_checkout_time,
+            waits=self._waits,
+            timeouts=self._timeouts,
+            created=self._created,
+            closed=self._discarded)
+
+    async def __aenter__(self):
+        return await self.open()
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+    async def _checkout(self, deadline):
+        if self._closed:
+            raise err.InterfaceError(0, "Pool is closed")
+        self._evict(_now())
+        if not self._waiters:
+            if self._idle:
+                # most recently used first, so the others can idle out
+                return self._idle.pop(), False
+            if self._size < self.maxsize:
+                self._size += 1
+                return None, False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        timeout = None if deadline is None else max(deadline - _now(), 0)
+        try:
+            return await asyncio.wait_for(asyncio.shield(waiter), timeout), True
+        except asyncio.TimeoutError:
+            if waiter.done():
+                # handed over just as the time ran out
+                return waiter.result(), True
+            self._waiters.remove(waiter)
+            waiter.cancel()
+            self._timeouts += 1
+            raise PoolTimeoutError(0, "No connection available in the pool")
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # pass on what was handed over
+                entry = waiter.result()
+                if entry is None:
+                    self._forget()
+                else:
+                    self._put(entry)
+            else:
+                self._waiters.remove(waiter)
+                waiter.cancel()
+            raise
+
+    def _put(self, entry):
+        """Hand *entry* to the first waiter or make it idle.
+
+        None hands over the room for a new connection.
+        """
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(entry)
+                return True
+        if entry is not None:
+            self._idle.append(entry)
+        return False
+
+    def _forget(self):
+        """Give up the room of a connection that was closed or not opened."""
+        self._discarded += 1
+        if self._closed or not self._put(None):
+            self._size -= 1
+
+    def _evict(self, now):
+        expired = []
+        if self.max_lifetime is not None:
+            for entry in list(self._idle):
+                if now - entry.created >= self.max_lifetime:
+                    self._idle.remove(entry)
+                    expired.append(entry)
+        if self.max_idle is not None:
+            # the least recently used entries are on the left
+            while (self._idle and self._size - len(expired) > self.minsize
+                   and now - self._idle[0].last_used >= self.max_idle):
+                expired.append(self._idle.popleft())
+        self._size -= len(expired)
+        self._discarded += len(expired)
+        for entry in expired:
+            self._close(entry.conn)
+
+    async def _open(self):
+        conn = await connect(*self._args, **self._kwargs)
+        self._created += 1
+        return _Entry(conn, _now())
+
+    async def _is_healthy(self, entry):
+        if not entry.conn.open:
+            return False
+        if _now() - entry.last_used < self.ping_interval:
+            return True
+        try:
+            await entry.conn.ping(reconnect=False)
+        except Exception:
+            return False
+        return True
+
+    async def _reset(self, entry):
+        conn = entry.conn
+        if not conn.open:
+            raise err.InterfaceError(0, "Connection is closed")
+        result = conn._result
+        if result is not None:
+            if result.unbuffered_active:
+                await conn._finish_unbuffered_query(result)
+            while conn._result is not None and conn._result.has_next:
+                await conn.next_result()
+            conn._result = None
+        await conn.rollback()
+        if conn.get_autocommit() != entry.autocommit:
+            await conn.autocommit(entry.autocommit)
+
+    @staticmethod
+    def _close(conn):
+        # no QUIT message, which would need to be awaited
+        conn._closed = True
+        conn._force_close()
+
+
+class _PooledConnection(object):
+
+    def __init__(self, pool, timeout):
+        self.pool = pool
+        self.timeout = timeout
+        self.conn = None
+
+    async def __aenter__(self):
+        self.conn = await self.pool.acquire(self.timeout)
+        return self.conn
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        discard = exc_type is not None and issubclass(
+            exc_type, (err.OperationalError, err.InterfaceError))
+        await self.pool.release(self.conn, discard=discard)
@@ -0,0 +1,333 @@
+# -*- coding: utf-8 -*-
+"""
+Parallel bulk insert over several pooled connections.
+
+:func:`bulk_insert` splits the rows into batches and inserts them on
+several connections of a :class:`pool.ConnectionPool` at once. Each batch
+is sent as multiple-row statements, like :meth:`Cursor.executemany`, in a
+transaction of its own::
+
+    pool = pymysql.pool.ConnectionPool(host=..., user=..., password=...,
+                                       database=..., maxsize=4)
+    pymysql.bulk.bulk_insert(
+        pool, "INSERT INTO employees VALUES (%s, %s, %s)", rows)
+
+The statements of a batch are pipelined: the next one is sent before the
+result of the previous one is read, so a batch does not wait for a round
+trip per statement.
+
+Escaping the values costs more CPU than anything else in a bulk insert.
+With *processes*, it is done in worker processes while the connections
+send the batches that are ready.
+
+Batches are committed as they complete and in no particular order. When
+one fails, no new batch is started and :class:`BulkInsertError` tells
+which rows failed and which batches were committed.
+"""
+from __future__ import absolute_import
+from collections import namedtuple
+import threading
+
+from ._compat import PY2, range_type, text_type
+from . import cursors, err
+from .connections import Connection, Pipeline
+
+try:
+    import queue
+except ImportError:  # Python 2
+    import Queue as queue
+
+try:
+    from concurrent.futures import ProcessPoolExecutor
+except ImportError:  # Python 2 without the futures backport
+    ProcessPoolExecutor = None
+
+
+#: A range of rows, by their position in the input.
+RowRange = namedtuple('RowRange', ['start', 'stop'])
+
+
+class BulkInsertError(err.Error):
+    """
+    Raised by :func:`bulk_insert` when some rows could not be inserted.
+
+    ``errors`` lists ``(RowRange, exception)`` of the failed statements, or
+    of the batches which could not be escaped, in order of rows. The batches
+    with these rows were rolled back. ``committed`` lists the ranges of rows
+    that were committed, merged and in order.
+    """
+
+    def __init__(self, errors, committed):
+        rows, exc = errors[0]
+        super(BulkInsertError, self).__init__(
+            "Rows %d to %d could not be inserted: %r%s"
+            % (rows.start, rows.stop - 1, exc,
+               " (and %d more errors)" % (len(errors) - 1)
+               if len(errors) > 1 else ""))
+        self.errors = errors
+        self.committed = committed
+
+
+def bulk_insert(pool, query, rows, connections=None, processes=0,
+                batch_size=10000, max_stmt_length=None, pipeline_depth=4):
+    """
+    Insert *rows* with *query* on several connections of *pool*.
+
+    :param pool: A :class:`pool.ConnectionPool`.
+    :param query: INSERT or REPLACE statement with a VALUES clause of
+        placeholders, as for :meth:`Cursor.executemany`.
+    :param rows: Iterable of sequences or mappings, it is read as the rows
+        are sent.
+    :param connections: Number of connections used at once, at most the
+        maxsize of the pool. (default: the maxsize of the pool)
+    :param processes: Number of worker processes that escape the values,
+        None for one per CPU. With 0 they are escaped by the threads that
+        send them. Where processes can not be started, as in AWS Lambda,
+        the threads escape them too. (default: 0)
+    :param batch_size: Number of rows committed together.
+    :param max_stmt_length: Max size of a statement.
+        (default: :attr:`Cursor.max_stmt_length`)
+    :param pipeline_depth: Number of statements a connection sends
+        before it reads the first result.
+    :return: Number of affected rows.
+
+    :raise BulkInsertError: If some rows could not be inserted.
+    """
+    m = cursors.RE_INSERT_VALUES.match(query)
+    if not m:
+        raise err.ProgrammingError(
+            "bulk_insert() needs an INSERT or REPLACE ... VALUES statement")
+    prefix = m.group(1) % ()
+    values = m.group(2).rstrip()
+    postfix = m.group(3) or ''
+    if connections is None or connections > pool.maxsize:
+        connections = pool.maxsize
+    if max_stmt_length is None:
+        max_stmt_length = cursors.Cursor.max_stmt_length
+    if pipeline_depth < 1:
+        raise ValueError("pipeline_depth should be at least 1")
+
+    executor = None
+    if processes != 0 and ProcessPoolExecutor is not None:
+        try:
+            executor = ProcessPoolExecutor(processes)
+        except (OSError, NotImplementedError, ImportError):
+            # no shared memory for the queues, as in AWS Lambda
+            executor = None
+
+    loader = _BulkLoader(pool, prefix, values, postfix, max_stmt_length,
+                         pipeline_depth, executor)
+    try:
+        return loader.run(rows, connections, batch_size)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+
+class _BulkLoader(object):
+
+    def __init__(self, pool, prefix, values, postfix, max_stmt_length,
+                 pipeline_depth, executor):
+        self.pool = pool
+        self.prefix = prefix
+        self.values = values
+        self.postfix = postfix
+        self.max_stmt_length = max_stmt_length
+        self.pipeline_depth = pipeline_depth
+        self.executor = executor
+
+        self._lock = threading.Lock()
+        self._failed = False
+        self._errors = []
+        self._committed = []
+        self._affected_rows = 0
+
+    def run(self, rows, connections, batch_size):
+        # batches waiting for a connection, bounded to keep memory in check
+        batches = queue.Queue(2 * connections)
+        threads = [threading.Thread(target=self._worker, args=(batches,))
+                   for _ in range_type(connections)]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+
+        try:
+            if self.executor is not None:
+                conn = self.pool.acquire()
+                try:
+                    options = _escape_options(conn)
+                finally:
+                    self.pool.release(conn)
+            rows = iter(rows)
+            start = 0
+            while not self._failed:
+                batch = []
+                for row in rows:
+                    batch.append(row)
+                    if len(batch) >= batch_size:
+                        break
+                if not batch:
+                    break
+                if self.executor is not None:
+                    escaped = self.executor.submit(
+                        _escape_rows_in_process, options, self.values, batch)
+                else:
+                    escaped = batch
+                batches.put((RowRange(start, start + len(batch)), escaped))
+                start += len(batch)
+        finally:
+            for _ in threads:
+                batches.put(None)
+            for thread in threads:
+                thread.join()
+
+        if self._errors:
+            errors = sorted(self._errors, key=lambda e: e[0].start)
+            raise BulkInsertError(errors, _merge(self._committed))
+        return self._affected_rows
+
+    def _worker(self, batches):
+        conn = None
+        try:
+            while True:
+                item = batches.get()
+                if item is None:
+                    return
+                rows, escaped = item
+                if self._failed:
+                    if self.executor is not None:
+                        escaped.cancel()
+                    continue
+                try:
+                    if conn is None:
+                        conn = self.pool.acquire()
+                    if self.executor is not None:
+                        escaped = escaped.result()
+                    else:
+                        escaped = _escape_rows(cursors.Cursor(conn),
+                                               self.values, escaped)
+                    affected = self._insert(conn, rows, escaped)
+                except _StatementError as e:
+                    self._fail(e.rows, e.error)
+                except Exception as e:
+                    self._fail(rows, e)
+                    if conn is not None and isinstance(
+                            e, (err.OperationalError, err.InterfaceError)):
+                        # the connection is probably no longer usable
+                        self.pool.release(conn, discard=True)
+                        conn = None
+                else:
+                    with self._lock:
+                        self._affected_rows += affected
+                        self._committed.append(rows)
+        finally:
+            if conn is not None:
+                self.pool.release(conn)
+
+    def _fail(self, rows, exc):
+        with self._lock:
+            self._failed = True
+            self._errors.append((rows, exc))
+
+    def _insert(self, conn, rows, escaped):
+        """Insert the escaped rows of a batch in a transaction."""
+        encoding = conn.encoding
+        prefix = self.prefix
+        postfix = self.postfix
+        if isinstance(prefix, text_type):
+            prefix = prefix.encode(encoding)
+        if isinstance(postfix, text_type):
+            postfix = postfix.encode(encoding)
+
+        statements = _pack(prefix, postfix, escaped, self.max_stmt_length)
+        pipeline = Pipeline(conn, self.pipeline_depth)
+        ranges = [rows]
+        pipeline.execute(b'BEGIN')
+        row = rows.start
+        for sql, count in statements:
+            if any(r.error is not None for r in pipeline.results):
+                break
+            pipeline.execute(sql)
+            ranges.append(RowRange(row, row + count))
+            row += count
+        results = pipeline.flush()
+        for rows, result in zip(ranges, results):
+            if result.error is not None:
+                conn.rollback()
+                raise _StatementError(rows, result.error)
+        conn.commit()
+        return sum(result.affected_rows for result in results)
+
+
+class _StatementError(Exception):
+
+    def __init__(self, rows, error):
+        Exception.__init__(self, rows, error)
+        self.rows = rows
+        self.error = error
+
+
+def _pack(prefix, postfix, escaped, max_stmt_length):
+    """Yield multiple-row statements and their number of rows."""
+    sql = bytearray(prefix)
+    count = 0
+    for v in escaped:
+        if count and len(sql) + len(v) + len(postfix) + 1 > max_stmt_length:
+            yield sql + postfix, count
+            sql = bytearray(prefix)
+            count = 0
+        elif count:
+            sql += b','
+        sql += v
+        count += 1
+    if count:
+        yield sql + postfix, count
+
+
+def _escape_options(conn):
+    """Return what the escaping of *conn* depends on."""
+    return (conn.charset, conn.encoders, conn._binary_prefix,
+            conn.server_status)
+
+
+# (options, cursor) of _escape_rows_in_process
+_process_cursor = None
+
+
+def _escape_rows_in_process(options, values, rows):
+    """Escape rows like a connection with the *options* would."""
+    global _process_cursor
+    if _process_cursor is None or _process_cursor[0] != options:
+        charset, encoders, binary_prefix, server_status = options
+        conn = Connection(charset=charset, conv=encoders,
+                          binary_prefix=binary_prefix, defer_connect=True)
+        conn.server_status = server_status
+        _process_cursor = options, cursors.Cursor(conn)
+    return _escape_rows(_process_cursor[1], values, rows)
+
+
+def _escape_rows(cursor, values, rows):
+    """Return the rows escaped with the VALUES clause *values*, as bytes."""
+    conn = cursor.connection
+    encoding = conn.encoding
+    if PY2 and isinstance(values, text_type):
+        values = values.encode(encoding)
+    escaped = []
+    for v in cursor._format_rows(values, rows, conn):
+        if isinstance(v, text_type):
+            if PY2:
+                v = v.encode(encoding)
+            else:
+                v = v.encode(encoding, 'surrogateescape')
+        escaped.append(v)
+    return escaped
+
+
+def _merge(ranges):
+    merged = []
+    for rows in sorted(ranges):
+        if merged and merged[-1].stop == rows.start:
+            merged[-1] = RowRange(merged[-1].start, rows.stop)
+        else:
+            merged.append(rows)
+    return merged
@@ -0,0 +1,298 @@
+# -*- coding: utf-8 -*-
+"""
+Results fetched as columns.
+
+:class:`ColumnarCursor` decodes a result set column by column into typed
+arrays, instead of a tuple of Python objects per row::
+
+    cursor = conn.cursor(pymysql.columnar.ColumnarCursor)
+    cursor.execute("SELECT emp_no, salary, from_date FROM salaries")
+    emp_no, salary, from_date = cursor.fetch_columns()
+    salary.values.mean()
+
+Each :class:`Column` has the name of the column, its values and a mask
+which is true for the NULL values, or None when there are none.
+
+With NumPy, integer columns are ``int64`` arrays (``uint64`` for unsigned
+BIGINT), FLOAT and DOUBLE columns ``float64`` arrays, DATETIME, TIMESTAMP
+and DATE columns ``datetime64`` arrays and the other columns arrays of
+objects, converted like the other cursors would. NULL numbers are 0, NULL
+floats NaN and NULL or invalid dates NaT. Without NumPy, integer and
+float columns are :class:`array.array`, the other columns lists and masks
+bytearrays.
+
+The rows are read in chunks of :data:`CHUNK_ROWS` rows and the values of
+a chunk are converted at once, the result set is never held as rows.
+:class:`SSColumnarCursor` reads the rows as they are fetched, a chunk of
+columns at a time.
+"""
+from __future__ import absolute_import
+from array import array
+from collections import namedtuple
+
+from ._compat import PY2, range_type
+from . import converters, err
+from .connections import MySQLResult, _make_row_decoder
+from .constants import FIELD_TYPE, FLAG
+from .cursors import Cursor, SSCursor
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+#: Number of rows decoded before their values are converted.
+CHUNK_ROWS = 8192
+
+#: A column of a result set.
+Column = namedtuple('Column', ['name', 'values', 'mask'])
+
+_INTEGER_TYPES = frozenset([
+    FIELD_TYPE.TINY, FIELD_TYPE.SHORT, FIELD_TYPE.INT24, FIELD_TYPE.LONG,
+    FIELD_TYPE.LONGLONG, FIELD_TYPE.YEAR])
+_FLOAT_TYPES = frozenset([FIELD_TYPE.FLOAT, FIELD_TYPE.DOUBLE])
+_DATETIME_UNITS = {
+    FIELD_TYPE.DATETIME: 'datetime64[us]',
+    FIELD_TYPE.TIMESTAMP: 'datetime64[us]',
+    FIELD_TYPE.DATE: 'datetime64[D]',
+}
+
+if PY2:
+    _INT64, _UINT64 = 'l', 'L'
+else:
+    _INT64, _UINT64 = 'q', 'Q'
+
+
+class ColumnarResult(MySQLResult):
+    """Result whose rows are read into columns."""
+
+    columns = None
+
+    def _get_descriptions(self):
+        super(ColumnarResult, self)._get_descriptions()
+        # values are read as bytes and converted by their column
+        self._decode_row = _make_row_decoder(
+            [(None, None)] * self.field_count)
+        self._builders = [
+            _ColumnBuilder(field.name, _column_converter(field, encoding, converter))
+            for field, (encoding, converter) in zip(self.fields, self.converters)]
+
+    def _read_rowdata_packet(self):
+        self.affected_rows = self._read_columns()
+        self.columns = self._take_columns()
+
+    def _read_columns(self, size=None):
+        """Read *size* rows, or all the rows left, into the columns.
+
+        Returns the number of rows read, 0 once all the rows were read.
+        """
+        count = 0
+        while self.connection is not None and (size is None or count < size):
+            limit = CHUNK_ROWS if size is None else min(CHUNK_ROWS, size - count)
+            rows = []
+            append = rows.append
+            read_packet = self.connection._read_packet
+            decode_row = self._decode_row
+            for _ in range_type(limit):
+                packet = read_packet(allow_view=True)
+                if self._check_packet_is_eof(packet):
+                    self.unbuffered_active = False
+                    self.connection = None  # release reference to kill cyclic reference.
+                    break
+                append(decode_row(packet))
+            if rows:
+                for builder, values in zip(self._builders, zip(*rows)):
+                    builder.add(values)
+                count += len(rows)
+        return count
+
+    def _take_columns(self):
+        """Return the columns read so far and start new ones."""
+        return [builder.take() for builder in self._builders]
+
+
+class _ColumnBuilder(object):
+    """Values of a column, converted a chunk at a time."""
+
+    def __init__(self, name, convert):
+        self.name = name
+        self._convert = convert
+        self._values = None
+        self._mask = None
+        self._length = 0
+
+    def add(self, values):
+        nulls = [v is None for v in values] if None in values else None
+        values, nulls = self._convert(values, nulls)
+        if nulls is not None and self._mask is None:
+            self._mask = _mask(self._length, None)
+        if self._mask is not None:
+            self._mask = _extend(self._mask, _mask(len(values), nulls))
+        self._values = _extend(self._values, values)
+        self._length += len(values)
+
+    def take(self):
+        """Return the column read so far and start a new one."""
+        values, mask = self._values, self._mask
+        if values is None:
+            values = self._convert((), None)[0]
+        self._values = self._mask = None
+        self._length = 0
+        return Column(self.name, values, mask)
+
+
+def _extend(values, chunk):
+    """Append *chunk* to *values*, in place."""
+    if values is None:
+        return chunk
+    if numpy is not None:
+        # grown with realloc, large arrays are usually not copied
+        length = len(values)
+        values.resize(length + len(chunk), refcheck=False)
+        values[length:] = chunk
+    else:
+        values.extend(chunk)
+    return values
+
+
+def _mask(length, nulls):
+    if numpy is not None:
+        if nulls is None:
+            return numpy.zeros(length, dtype=bool)
+        return numpy.array(nulls, dtype=bool)
+    if nulls is None:
+        return bytearray(length)
+    return bytearray(nulls)
+
+
+def _column_converter(field, encoding, converter):
+    """Return the function that converts the values of a column."""
+    field_type = field.type_code
+    if converter is int and field_type in _INTEGER_TYPES:
+        if field_type == FIELD_TYPE.LONGLONG and field.flags & FLAG.UNSIGNED:
+            return _numbers(int, 'uint64', _UINT64, b'0')
+        return _numbers(int, 'int64', _INT64, b'0')
+    if converter is float and field_type in _FLOAT_TYPES:
+        return _numbers(float, 'float64', 'd', b'nan')
+    if numpy is not None and field_type in _DATETIME_UNITS and converter in (
+            converters.convert_datetime, converters.convert_date):
+        return _datetimes(_DATETIME_UNITS[field_type])
+    return _objects(encoding, converter)
+
+
+def _numbers(convert, dtype, typecode, null):
+    def convert_numbers(values, nulls):
+        if nulls is not None:
+            values = [null if v is None else v for v in values]
+        if numpy is not None:
+            return numpy.fromiter(map(convert, values), dtype, len(values)), nulls
+        return array(typecode, map(convert, values)), nulls
+    return convert_numbers
+
+
+def _datetimes(dtype):
+    def convert_datetimes(values, nulls):
+        if nulls is not None:
+            values = [b'NaT' if v is None else v for v in values]
+        try:
+            return numpy.array(values, dtype=dtype), nulls
+        except ValueError:
+            pass
+        # zero and other invalid dates, as NULL
+        result = numpy.empty(len(values), dtype=dtype)
+        nulls = list(nulls) if nulls is not None else [False] * len(values)
+        for i, v in enumerate(values):
+            try:
+                result[i] = numpy.datetime64(v.decode('ascii'))
+            except ValueError:
+                result[i] = numpy.datetime64('NaT')
+                nulls[i] = True
+        return result, nulls
+    return convert_datetimes
+
+
+def _objects(encoding, converter):
+    def convert_objects(values, nulls):
+        if encoding is not None:
+            values = [v if v is None else v.decode(encoding) for v in values]
+        if converter is not None:
+            values = [v if v is None else converter(v) for v in values]
+        if numpy is not None:
+            result = numpy.empty(len(values), dtype=object)
+            result[:] = values
+            return result, nulls
+        return list(values), nulls
+    return convert_objects
+
+
+class ColumnarCursor(Cursor):
+    """
+    Cursor which fetches results as columns of typed arrays.
+
+    The rows are not available one by one, use :meth:`fetch_columns`.
+    """
+
+    _unbuffered = False
+    _columns = None
+
+    def _query(self, q):
+        conn = self._get_db()
+        self._last_executed = q
+        self._clear_result()
+        conn.query(q, unbuffered=self._unbuffered, result_class=ColumnarResult)
+        self._do_get_result()
+        return self.rowcount
+
+    def _do_get_result(self):
+        super(ColumnarCursor, self)._do_get_result()
+        self._columns = self._result.columns
+
+    def fetch_columns(self, size=None):
+        """
+        Fetch the columns of the next *size* rows, or of all the rows left.
+
+        :return: List of :class:`Column`, empty for statements without
+            a result set.
+        """
+        self._check_executed()
+        if self._columns is None:
+            return []
+        start = self.rownumber
+        stop = self.rowcount if size is None else min(start + size, self.rowcount)
+        self.rownumber = max(start, stop)
+        if start == 0 and stop == self.rowcount:
+            return list(self._columns)
+        return [Column(c.name, c.values[start:stop],
+                       None if c.mask is None else c.mask[start:stop])
+                for c in self._columns]
+
+    def _fetch_rows(self, *args):
+        raise err.NotSupportedError(
+            "%s fetches columns, use fetch_columns()" % type(self).__name__)
+
+    fetchone = fetchmany = fetchall = __iter__ = _fetch_rows
+
+
+class SSColumnarCursor(ColumnarCursor, SSCursor):
+    """
+    Unbuffered :class:`ColumnarCursor`.
+
+    Each call of :meth:`fetch_columns` reads the next rows from the
+    server, the columns are empty once all the rows were read.
+    """
+
+    _unbuffered = True
+
+    def fetch_columns(self, size=None):
+        """
+        Read the columns of the next *size* rows, or of all the rows left.
+
+        :return: List of :class:`Column`, empty for statements without
+            a result set.
+        """
+        self._check_executed()
+        result = self._result
+        if result is None or not result.description:
+            return []
+        self.rownumber += result._read_columns(size)
+        return result._take_columns()
@@ -5,16 +5,19 @@
 from __future__ import print_function
 from ._compat import PY2, range_type, text_type, str_type, JYTHON, IRONPYTHON
 
+from collections import deque, namedtuple
+from contextlib import contextmanager
 import errno
 import io
 import os
+import re
 import socket
 import struct
 import sys
 import traceback
 import warnings
 
-from . import _auth
+from . import _auth, _compress
 
 from .charset import charset_by_name, charset_by_id
 from .constants import CLIENT, COMMAND, CR, FIELD_TYPE, SERVER_STATUS
@@ -92,6 +95,25 @@ DEFAULT_CHARSET = 'utf8mb4'
 
 MAX_PACKET_LEN = 2**24-1
 
+# Row packets of at least VIEW_MIN_LEN bytes are read into a receive buffer
+# that is reused by each connection and parsed from a memoryview of it, so
+# column values are only copied when they are converted. Smaller packets are
+# cheaper to read as bytes. The buffer grows for larger packets up to
+# RECV_BUFFER_MAX, bigger ones get a buffer of their own.
+VIEW_MIN_LEN = 8 * 1024
+RECV_BUFFER_SIZE = 64 * 1024
+RECV_BUFFER_MAX = 1024 * 1024
+
+# Size of the data packets of LOAD DATA LOCAL INFILE. The server rejects
+# packets larger than its max_allowed_packet, which is at least 1MB by default.
+LOAD_LOCAL_PACKET_SIZE = 1024000
+
+# URIs of LOAD DATA LOCAL INFILE sources that are opened with smart_open.
+RE_URI = re.compile(r'^[a-zA-Z][a-zA-Z0-9+.-]*://')
+
+#: Number of statements a :class:`Pipeline` sends before it reads a result.
+PIPELINE_DEPTH = 32
+
 
 def pack_int24(n):
     return struct.pack('<I', n)[:3]
@@ -153,12 +175,14 @@ class Connection(object):
     :param ssl:
         A dict of arguments similar to mysql_ssl_set()'s parameters.
     :param read_default_group: Group to read from in the configuration file.
-    :param compress: Not supported
+    :param compress: Compress the traffic with the server: True or 'zlib', or 'zstd'
+        for MySQL 8.0.18 and later, which needs the zstandard module. Falls back to
+        zlib, or to no compression, when the server does not support it. (default: None)
     :param named_pipe: Not supported
     :param autocommit: Autocommit mode. None means use server default. (default: False)
     :param local_infile: Boolean to enable the use of LOAD DATA LOCAL command. (default: False)
     :param max_allowed_packet: Max size of packet sent to server in bytes. (default: 16MB)
-        Only used to limit size of "LOAD LOCAL INFILE" data packet smaller than default (16KB).
+        Only used to limit size of "LOAD LOCAL INFILE" data packet smaller than default (1MB).
     :param defer_connect: Don't explicitly connect on construction - wait for connect call.
         (default: False)
     :param auth_plugin_map: A dict of plugin names to a class that processes that plugin.
@@ -179,6 +203,9 @@ class Connection(object):
     _auth_plugin_name = ''
     _closed = False
     _secure = False
+    _compression = None
+    # (source, progress) of the next LOAD DATA LOCAL INFILE, see Cursor.load_data_local()
+    _local_infile_source = None
 
     def __init__(self, host=None, user=None, password="",
                  database=None, port=0, unix_socket=None,
@@ -200,8 +227,13 @@ class Connection(object):
         if passwd is not None and not password:
             password = passwd
 
-        if compress or named_pipe:
-            raise NotImplementedError("compress and named_pipe arguments are not supported")
+        if named_pipe:
+            raise NotImplementedError("named_pipe argument is not supported")
+        if compress is True:
+            compress = 'zlib'
+        if compress and compress not in ('zlib', 'zstd'):
+            raise ValueError("compress should be True, 'zlib' or 'zstd'")
+        self.compress = compress or None
 
         self._local_infile = bool(local_infile)
         if self._local_infile:
@@ -358,6 +390,7 @@ class Connection(object):
         if self._sock is None:
             return
         send_data = struct.pack('<iB', 1, COMMAND.COM_QUIT)
+        self._next_compressed_seq_id = 0
         try:
             self._write_bytes(send_data)
         except Exception:
@@ -492,8 +525,21 @@ class Connection(object):
             return cursor(self)
         return self.cursorclass(self)
 
+    def pipeline(self, depth=PIPELINE_DEPTH):
+        """
+        Create a :class:`Pipeline` to send statements without waiting for
+        the result of each one.
+
+        :param depth: Number of statements sent before the first result is read.
+
+        Nothing is read while the statements are sent: with large
+        statements that also return large results, use a small *depth*, see
+        :class:`Pipeline`.
+        """
+        return Pipeline(self, depth)
+
     # The following methods are INTERNAL USE ONLY (called from Cursor)
-    def query(self, sql, unbuffered=False):
+    def query(self, sql, unbuffered=False, result_class=None):
         # if DEBUG:
         #     print("DEBUG: sending query:", sql)
         if isinstance(sql, text_type) and not (JYTHON or IRONPYTHON):
@@ -502,11 +548,15 @@ class Connection(object):
             else:
                 sql = sql.encode(self.encoding, 'surrogateescape')
         self._execute_command(COMMAND.COM_QUERY, sql)
-        self._affected_rows = self._read_query_result(unbuffered=unbuffered)
+        self._affected_rows = self._read_query_result(
+            unbuffered=unbuffered, result_class=result_class)
         return self._affected_rows
 
     def next_result(self, unbuffered=False):
-        self._affected_rows = self._read_query_result(unbuffered=unbuffered)
+        # the next result of a prepared statement is in the binary protocol too
+        result_class = type(self._result) if self._result is not None else MySQLResult
+        self._affected_rows = self._read_query_result(
+            unbuffered=unbuffered, result_class=result_class)
         return self._affected_rows
 
     def affected_rows(self):
@@ -583,6 +633,8 @@ class Connection(object):
             self._sock = sock
             self._rfile = _makefile(sock, 'rb')
             self._next_seq_id = 0
+            self._recv_buf = bytearray(RECV_BUFFER_SIZE)
+            self._compression = None
 
             self._get_server_information()
             self._request_authentication()
@@ -634,21 +686,29 @@ class Connection(object):
         self._write_bytes(data)
         self._next_seq_id = (self._next_seq_id + 1) % 256
 
-    def _read_packet(self, packet_type=MysqlPacket):
+    def _read_packet(self, packet_type=MysqlPacket, allow_view=False):
         """Read an entire "mysql packet" in its entirety from the network
         and return a MysqlPacket type that represents the results.
 
+        If *allow_view* is true, packets of at least VIEW_MIN_LEN bytes are
+        read into the receive buffer of the connection and their data is a
+        memoryview of it, which is only valid until the next packet is read.
+
         :raise OperationalError: If the connection to the MySQL server is lost.
         :raise InternalError: If the packet sequence number is wrong.
         """
-        buff = bytearray()
+        chunks = []
+        buff = None
+        length = 0
         while True:
             packet_header = self._read_bytes(4)
             #if DEBUG: dump_packet(packet_header)
 
             btrl, btrh, packet_number = struct.unpack('<HBB', packet_header)
             bytes_to_read = btrl + (btrh << 16)
-            if packet_number != self._next_seq_id:
+            # with compression the server only keeps the sequence ids of
+            # the compressed packets in order
+            if packet_number != self._next_seq_id and self._compression is None:
                 self._force_close()
                 if packet_number == 0:
                     # MariaDB sends error packet with seqno==0 when shutdown
@@ -658,25 +718,83 @@ class Connection(object):
                 raise err.InternalError(
                     "Packet sequence number wrong - got %d expected %d"
                     % (packet_number, self._next_seq_id))
-            self._next_seq_id = (self._next_seq_id + 1) % 256
-
-            recv_data = self._read_bytes(bytes_to_read)
-            if DEBUG: dump_packet(recv_data)
-            buff += recv_data
+            self._next_seq_id = (packet_number + 1) % 256
+
+            if buff is None and not chunks and allow_view and not PY2 \
+                    and bytes_to_read >= VIEW_MIN_LEN:
+                buff = self._recv_buf
+            if buff is not None:
+                end = length + bytes_to_read
+                if end > len(buff):
+                    # never resize the buffer in place, packets handed out
+                    # earlier may still refer to it
+                    new_buff = bytearray(max(end, 2 * len(buff)))
+                    new_buff[:length] = memoryview(buff)[:length]
+                    buff = new_buff
+                    if len(buff) <= RECV_BUFFER_MAX:
+                        self._recv_buf = buff
+                self._read_into(memoryview(buff)[length:end])
+                length = end
+            else:
+                recv_data = self._read_bytes(bytes_to_read)
+                if DEBUG: dump_packet(recv_data)
+                chunks.append(recv_data)
             # https://dev.mysql.com/doc/internals/en/sending-more-than-16mbyte.html
             if bytes_to_read == 0xffffff:
                 continue
             if bytes_to_read < MAX_PACKET_LEN:
                 break
 
-        packet = packet_type(bytes(buff), self.encoding)
+        if buff is not None:
+            data = memoryview(buff)[:length]
+            if data[:1] == b'\xff':
+                data = data.tobytes()
+        elif len(chunks) == 1:
+            data = chunks[0]
+        else:
+            data = b''.join(chunks)
+        packet = packet_type(data, self.encoding)
         if packet.is_error_packet():
             if self._result is not None and self._result.unbuffered_active is True:
                 self._result.unbuffered_active = False
             packet.raise_for_error()
         return packet
 
+    def _read_into(self, buff):
+        """Fill the writable buffer *buff* with data from the server."""
+        if self._compression is not None:
+            buff[:] = self._read_uncompressed(len(buff))
+            return
+        self._sock.settimeout(self._read_timeout)
+        view = buff
+        while True:
+            try:
+                received = self._rfile.readinto(view)
+            except (IOError, OSError) as e:
+                if e.errno == errno.EINTR:
+                    continue
+                self._force_close()
+                raise err.OperationalError(
+                    CR.CR_SERVER_LOST,
+                    "Lost connection to MySQL server during query (%s)" % (e,))
+            except BaseException:
+                # Don't convert unknown exception to MySQLError.
+                self._force_close()
+                raise
+            if received == len(view):
+                return
+            if not received:
+                self._force_close()
+                raise err.OperationalError(
+                    CR.CR_SERVER_LOST, "Lost connection to MySQL server during query")
+            view = memoryview(view)[received:]
+
     def _read_bytes(self, num_bytes):
+        if self._compression is not None:
+            return self._read_uncompressed(num_bytes)
+        return self._recv_bytes(num_bytes)
+
+    def _recv_bytes(self, num_bytes):
         self._sock.settimeout(self._read_timeout)
         while True:
             try:
@@ -699,7 +817,45 @@ class Connection(object):
                 CR.CR_SERVER_LOST, "Lost connection to MySQL server during query")
         return data
 
+    def _read_uncompressed(self, num_bytes):
+        """Read *num_bytes* of the payloads of compressed packets."""
+        buff = self._uncompressed
+        start = self._uncompressed_pos
+        end = start + num_bytes
+        while end > len(buff):
+            buff = buff[start:] + self._read_compressed_packet()
+            end -= start
+            start = 0
+        self._uncompressed = buff
+        self._uncompressed_pos = end
+        return buff[start:end]
+
+    def _read_compressed_packet(self):
+        header = self._recv_bytes(_compress.HEADER_LEN)
+        length, packet_number, uncompressed_length = \
+            _compress.unpack_header(header)
+        if packet_number != self._next_compressed_seq_id:
+            self._force_close()
+            raise err.InternalError(
+                "Compressed packet sequence number wrong - got %d expected %d"
+                % (packet_number, self._next_compressed_seq_id))
+        self._next_compressed_seq_id = (packet_number + 1) % 256
+        payload = self._recv_bytes(length)
+        if uncompressed_length:
+            try:
+                payload = self._compression.decompress(payload,
+                                                       uncompressed_length)
+            except Exception as e:
+                self._force_close()
+                raise err.OperationalError(
+                    CR.CR_SERVER_LOST,
+                    "Invalid compressed packet (%s)" % (e,))
+        return payload
+
     def _write_bytes(self, data):
+        if self._compression is not None:
+            data, self._next_compressed_seq_id = _compress.pack(
+                self._compression, data, self._next_compressed_seq_id)
         self._sock.settimeout(self._write_timeout)
         try:
             self._sock.sendall(data)
@@ -709,18 +865,20 @@ class Connection(object):
                 CR.CR_SERVER_GONE_ERROR,
                 "MySQL server has gone away (%r)" % (e,))
 
-    def _read_query_result(self, unbuffered=False):
+    def _read_query_result(self, unbuffered=False, result_class=None):
+        if result_class is None:
+            result_class = MySQLResult
         self._result = None
         if unbuffered:
             try:
-                result = MySQLResult(self)
+                result = result_class(self)
                 result.init_unbuffered_query()
             except:
                 result.unbuffered_active = False
                 result.connection = None
                 raise
         else:
-            result = MySQLResult(self)
+            result = result_class(self)
             result.read()
         self._result = result
         if result.server_status is not None:
@@ -760,6 +918,7 @@ class Connection(object):
         # calling self..write_packet()
         prelude = struct.pack('<iB', packet_size, command)
         packet = prelude + sql[:packet_size-1]
+        self._next_compressed_seq_id = 0
         self._write_bytes(packet)
         if DEBUG: dump_packet(packet)
         self._next_seq_id = 1
@@ -783,6 +942,13 @@ class Connection(object):
         if self.user is None:
             raise ValueError("Did not specify a username")
 
+        self.client_flag &= ~(CLIENT.COMPRESS | CLIENT.ZSTD_COMPRESSION_ALGORITHM)
+        if (self.compress == 'zstd' and _compress.zstandard is not None
+                and self.server_capabilities & CLIENT.ZSTD_COMPRESSION_ALGORITHM):
+            self.client_flag |= CLIENT.ZSTD_COMPRESSION_ALGORITHM
+        elif self.compress and self.server_capabilities & CLIENT.COMPRESS:
+            self.client_flag |= CLIENT.COMPRESS
+
         charset_id = charset_by_name(self.charset).id
         if isinstance(self.user, text_type):
             self.user = self.user.encode(self.encoding)
@@ -849,6 +1015,9 @@ class Connection(object):
                 connect_attrs += struct.pack('B', len(v)) + v
             data += struct.pack('B', len(connect_attrs)) + connect_attrs
 
+        if self.client_flag & CLIENT.ZSTD_COMPRESSION_ALGORITHM:
+            data += struct.pack('B', _compress.ZSTD_LEVEL)
+
         self.write_packet(data)
         auth_packet = self._read_packet()
 
@@ -879,6 +1048,15 @@ class Connection(object):
 
         if DEBUG: print("Succeed to auth")
 
+        # compression starts after the OK packet of the authentication
+        if self.client_flag & CLIENT.ZSTD_COMPRESSION_ALGORITHM:
+            self._compression = _compress.ZstdCodec()
+        elif self.client_flag & CLIENT.COMPRESS:
+            self._compression = _compress.ZlibCodec()
+        self._next_compressed_seq_id = 0
+        self._uncompressed = b''
+        self._uncompressed_pos = 0
+
     def _process_auth(self, plugin_name, auth_packet):
         handler = self._get_auth_plugin_handler(plugin_name)
         if handler:
@@ -1042,6 +1220,113 @@ class Connection(object):
     NotSupportedError = err.NotSupportedError
 
 
+def _read_row(packet, converters):
+    """Read a row from *packet* column by column."""
+    row = []
+    for encoding, converter in converters:
+        try:
+            data = packet.read_length_coded_string()
+        except IndexError:
+            # No more columns in this row
+            # See https://github.com/PyMySQL/PyMySQL/pull/434
+            break
+        if data is not None:
+            # data may be a view of the receive buffer, decode it
+            # without copying or turn it into bytes
+            if encoding is not None:
+                data = text_type(data, encoding)
+            else:
+                data = bytes(data)
+            if DEBUG: print("DEBUG: DATA = ", data)
+            if converter is not None:
+                data = converter(data)
+        row.append(data)
+    return tuple(row)
+
+
+def _read_lenenc_head(data, pos, c):
+    """Return start and end of a value with a multi-byte length header."""
+    if c == 252:
+        start = pos + 3
+        return start, start + (data[pos + 1] | data[pos + 2] << 8)
+    if c == 253:
+        start = pos + 4
+        return start, start + (data[pos + 1] | data[pos + 2] << 8 | data[pos + 3] << 16)
+    if c == 254:
+        start = pos + 9
+        return start, start + struct.unpack_from('<Q', data, pos + 1)[0]
+    # Not a valid length, let _read_row deal with it.
+    raise IndexError(c)
+
+
+_ROW_DECODER_COLUMN = """\
+    c = data[pos]
+    if c == 251:
+        v{i} = None
+        pos += 1
+    else:
+        if c < 251:
+            pos += 1
+            end = pos + c
+        else:
+            pos, end = read_lenenc_head(data, pos, c)
+        v{i} = {value}
+        pos = end
+"""
+
+
+def _make_row_decoder(converters):
+    """Build a function that reads a row from a packet for *converters*.
+
+    The function is generated for the columns of one result set: it parses
+    the length coded values straight from the packet data, handles NULL
+    inline and applies each column's conversion without looking it up.
+    Integer and float columns are converted from the bytes, without
+    decoding them first. Rows in a memoryview, short rows and anything
+    else unusual go through _read_row.
+    """
+    if PY2 or DEBUG or not converters:
+        return lambda packet: _read_row(packet, converters)
+
+    namespace = {
+        'read_lenenc_head': _read_lenenc_head,
+        'read_row': _read_row,
+        'converters': converters,
+    }
+    lines = [
+        "def decode_row(packet):",
+        "    data = packet._data",
+        "    if type(data) is not bytes:",
+        "        return read_row(packet, converters)",
+        "    pos = 0",
+        "    try:",
+    ]
+    for i, (encoding, converter) in enumerate(converters):
+        value = 'data[pos:end]'
+        if converter in (int, float):
+            # int() and float() accept the ascii digits as they are
+            value = '%s(%s)' % (converter.__name__, value)
+        else:
+            if encoding is not None:
+                value = '%s.decode(%r)' % (value, encoding)
+            if converter is not None:
+                namespace['convert%d' % i] = converter
+                value = 'convert%d(%s)' % (i, value)
+        column = _ROW_DECODER_COLUMN.format(i=i, value=value)
+        lines.extend('    ' + line for line in column.splitlines())
+    lines += [
+        # a short row, or a value cut short that failed to convert
+        "    except (IndexError, ValueError):",
+        "        return read_row(packet, converters)",
+        "    if pos > len(data):",
+        "        # a value is cut short, let read_row raise the error",
+        "        return read_row(packet, converters)",
+        "    return (%s,)" % ', '.join('v%d' % i for i in range_type(len(converters))),
+    ]
+    exec('\n'.join(lines), namespace)
+    return namespace['decode_row']
+
+
 class MySQLResult(object):
 
     def __init__(self, connection):
@@ -1059,6 +1344,7 @@ class MySQLResult(object):
         self.rows = None
         self.has_next = None
         self.unbuffered_active = False
+        self._decode_row = None
 
     def __del__(self):
         if self.unbuffered_active:
@@ -1116,7 +1402,9 @@ class MySQLResult(object):
             raise RuntimeError(
                 "**WARN**: Received LOAD_LOCAL packet but local_infile option is false.")
         load_packet = LoadLocalPacketWrapper(first_packet)
-        sender = LoadLocalFile(load_packet.filename, self.connection)
+        source, progress = self.connection._local_infile_source or (None, None)
+        sender = LoadLocalFile(load_packet.filename, self.connection,
+                               source, progress)
         try:
             sender.send_data()
         except:
@@ -1151,14 +1439,14 @@ class MySQLResult(object):
             return
 
         # EOF
-        packet = self.connection._read_packet()
+        packet = self.connection._read_packet(allow_view=True)
         if self._check_packet_is_eof(packet):
             self.unbuffered_active = False
             self.connection = None
             self.rows = None
             return
 
-        row = self._read_row_from_packet(packet)
+        row = self._decode_row(packet)
         self.affected_rows = 1
         self.rows = (row,)  # rows should tuple of row for MySQL-python compatibility.
         return row
@@ -1168,7 +1456,7 @@ class MySQLResult(object):
         # in fact, no way to stop MySQL from sending all the data after
         # executing a query, so we just spin, and wait for an EOF packet.
         while self.unbuffered_active:
-            packet = self.connection._read_packet()
+            packet = self.connection._read_packet(allow_view=True)
             if self._check_packet_is_eof(packet):
                 self.unbuffered_active = False
                 self.connection = None  # release reference to kill cyclic reference.
@@ -1176,33 +1464,21 @@ class MySQLResult(object):
     def _read_rowdata_packet(self):
         """Read a rowdata packet for each data row in the result set."""
         rows = []
+        append = rows.append
+        read_packet = self.connection._read_packet
+        decode_row = self._decode_row
         while True:
-            packet = self.connection._read_packet()
+            packet = read_packet(allow_view=True)
             if self._check_packet_is_eof(packet):
                 self.connection = None  # release reference to kill cyclic reference.
                 break
-            rows.append(self._read_row_from_packet(packet))
+            append(decode_row(packet))
 
         self.affected_rows = len(rows)
         self.rows = tuple(rows)
 
     def _read_row_from_packet(self, packet):
-        row = []
-        for encoding, converter in self.converters:
-            try:
-                data = packet.read_length_coded_string()
-            except IndexError:
-                # No more columns in this row
-                # See https://github.com/PyMySQL/PyMySQL/pull/434
-                break
-            if data is not None:
-                if encoding is not None:
-                    data = data.decode(encoding)
-                if DEBUG: print("DEBUG: DATA = ", data)
-                if converter is not None:
-                    data = converter(data)
-            row.append(data)
-        return tuple(row)
+        return self._decode_row(packet)
 
     def _get_descriptions(self):
         """Read a column descriptor packet for each column in the result."""
@@ -1245,12 +1521,25 @@ class MySQLResult(object):
         eof_packet = self.connection._read_packet()
         assert eof_packet.is_eof_packet(), 'Protocol error, expecting EOF'
         self.description = tuple(description)
+        self._decode_row = _make_row_decoder(self.converters)
 
 
 class LoadLocalFile(object):
-    def __init__(self, filename, connection):
+    """
+    Data of a LOAD DATA LOCAL INFILE statement.
+
+    The data is read from *source* if it is given, else from the file the
+    server asked for. The source can be a binary file object, an iterable of
+    bytes, a local path or a URI such as ``s3://bucket/table.csv.gz`` which is
+    opened with smart_open. *progress* is called with the number of bytes sent
+    so far after each packet.
+    """
+
+    def __init__(self, filename, connection, source=None, progress=None):
         self.filename = filename
         self.connection = connection
+        self.source = source
+        self.progress = progress
 
     def send_data(self):
         """Send data packets from the local file to the server"""
@@ -1259,15 +1548,176 @@ class LoadLocalFile(object):
         conn = self.connection
 
         try:
-            with open(self.filename, 'rb') as open_file:
-                packet_size = min(conn.max_allowed_packet, 16*1024)  # 16KB is efficient enough
-                while True:
-                    chunk = open_file.read(packet_size)
-                    if not chunk:
-                        break
-                    conn.write_packet(chunk)
-        except IOError:
-            raise err.OperationalError(1017, "Can't find file '{0}'".format(self.filename))
+            for chunk in self.read_chunks():
+                conn.write_packet(chunk)
         finally:
             # send the empty packet to signify we are done sending data
             conn.write_packet(b'')
+
+    def read_chunks(self):
+        """Yield the data in chunks of the packet size.
+
+        Smaller pieces of the source are gathered into full packets.
+        """
+        packet_size = min(self.connection.max_allowed_packet, LOAD_LOCAL_PACKET_SIZE)
+        progress = self.progress
+        sent = 0
+        with self._open(packet_size) as pieces:
+            pending = bytearray()
+            for piece in pieces:
+                if pending:
+                    missing = packet_size - len(pending)
+                    pending += piece[:missing]
+                    if len(pending) < packet_size:
+                        continue
+                    piece = piece[missing:]
+                    yield bytes(pending)
+                    pending = bytearray()
+                    sent += packet_size
+                    if progress is not None:
+                        progress(sent)
+                end = len(piece) - len(piece) % packet_size
+                for start in range_type(0, end, packet_size):
+                    yield piece[start:start + packet_size]
+                    sent += packet_size
+                    if progress is not None:
+                        progress(sent)
+                pending += piece[end:]
+            if pending:
+                yield bytes(pending)
+                sent += len(pending)
+                if progress is not None:
+                    progress(sent)
+
+    @contextmanager
+    def _open(self, size):
+        """Yields the source as an iterable of byte strings of about *size*."""
+        source = self.source
+        if source is None:
+            source = self.filename
+        elif hasattr(source, 'read'):
+            yield iter(lambda: source.read(size), b'')
+            return
+        elif not isinstance(source, (text_type, bytes)):
+            yield source
+            return
+
+        try:
+            if self.source is not None and isinstance(source, text_type) \
+                    and RE_URI.match(source):
+                try:
+                    import smart_open
+                except ImportError:
+                    raise NotImplementedError("smart_open module not found")
+                open_file = smart_open.open(source, 'rb')
+            else:
+                open_file = open(source, 'rb')
+        except IOError:
+            raise err.OperationalError(1017, "Can't find file '{0}'".format(source))
+        with open_file:
+            yield iter(lambda: open_file.read(size), b'')
+
+
+#: Result of a statement sent through a :class:`Pipeline`.
+PipelineResult = namedtuple(
+    'PipelineResult', ['affected_rows', 'insert_id', 'warning_count', 'rows', 'error'])
+
+
+class Pipeline(object):
+    """
+    Statements sent back to back, their results read in order.
+
+    Each statement is sent before the results of the previous ones are
+    read, so a sequence of statements does not wait for a round trip each::
+
+        with conn.pipeline() as pipeline:
+            for statement in statements:
+                pipeline.execute(statement)
+        for result in pipeline.results:
+            ...
+
+    The server runs the statements one after the other, as if they were
+    sent one at a time. A failed statement does not stop the next ones,
+    its :class:`PipelineResult` holds the error instead of the affected
+    rows. Rows of SELECT statements are read like a buffered cursor does.
+    For a statement with several results, such as a CALL or several
+    statements in one query with MULTI_STATEMENTS, they are all read and
+    the last one is kept.
+
+    At most *depth* statements are waiting for their result at once. The
+    connection should not be used for anything else until :meth:`flush`
+    returned.
+
+    The limit counts statements, not bytes. While a statement is sent, the
+    results of the earlier ones are not read, so once they fill the receive
+    buffers of both ends the server stops reading too and sending blocks
+    for good. This needs statements and results that are large compared to
+    the socket buffers, typically hundreds of kilobytes; pipelines of such
+    statements should use a small *depth*, or run them one at a time.
+    """
+
+    def __init__(self, connection, depth=PIPELINE_DEPTH):
+        if depth < 1:
+            raise ValueError("depth should be at least 1")
+        self.connection = connection
+        self.depth = depth
+        #: :class:`PipelineResult` of the statements read so far, in order.
+        self.results = []
+        self._pending = deque()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.flush()
+        else:
+            self.abort()
+
+    def execute(self, query, args=None):
+        """Send a statement, *args* are escaped like :meth:`Cursor.execute` does."""
+        conn = self.connection
+        if args is not None:
+            query = Cursor(conn).mogrify(query, args)
+        if isinstance(query, text_type) and not (JYTHON or IRONPYTHON):
+            if PY2:
+                query = query.encode(conn.encoding)
+            else:
+                query = query.encode(conn.encoding, 'surrogateescape')
+        while len(self._pending) >= self.depth:
+            self._read()
+        conn._execute_command(COMMAND.COM_QUERY, query)
+        # responses start with the sequence ids that follow their command
+        self._pending.append((conn._next_seq_id, conn._next_compressed_seq_id))
+
+    def flush(self):
+        """Read the results of all the statements sent, return :attr:`results`."""
+        while self._pending:
+            self._read()
+        return self.results
+
+    def abort(self):
+        """Read the results of the statements sent, or give up on them
+        if the connection is lost."""
+        try:
+            self.flush()
+        except (err.OperationalError, err.InterfaceError):
+            pass
+
+    def _read(self):
+        conn = self.connection
+        conn._next_seq_id, conn._next_compressed_seq_id = self._pending.popleft()
+        try:
+            conn._read_query_result()
+            while conn._result.has_next:
+                conn.next_result()
+        except (err.OperationalError, err.InterfaceError):
+            self._pending.clear()
+            raise
+        except err.MySQLError as e:
+            self.results.append(PipelineResult(None, None, None, None, e))
+            return
+        result = conn._result
+        self.results.append(PipelineResult(
+            result.affected_rows, result.insert_id, result.warning_count,
+            result.rows, None))
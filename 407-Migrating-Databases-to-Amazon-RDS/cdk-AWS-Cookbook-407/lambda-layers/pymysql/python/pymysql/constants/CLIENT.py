@@ -29,3 +29,5 @@ CAPABILITIES = (
 HANDLE_EXPIRED_PASSWORDS = 1 << 22
 SESSION_TRACK = 1 << 23
 DEPRECATE_EOF = 1 << 24
+
+ZSTD_COMPRESSION_ALGORITHM = 1 << 26
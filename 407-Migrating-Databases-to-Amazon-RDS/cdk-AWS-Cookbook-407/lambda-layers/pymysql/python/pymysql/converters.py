@@ -70,11 +70,17 @@ _escape_table[ord('\032')] = u'\\Z'
 _escape_table[ord('"')] = u'\\"'
 _escape_table[ord("'")] = u"\\'"
 
+# characters of _escape_table which are escaped
+_escaped_chars_re = re.compile(u'[\\0\\\\\n\r\032"\']')
+
 def _escape_unicode(value, mapping=None):
     """escapes *value* without adding quote.
 
     Value should be unicode
     """
+    # most values have nothing to escape, searching is faster than translating
+    if _escaped_chars_re.search(value) is None:
+        return value
     return value.translate(_escape_table)
 
 if PY2:
@@ -173,6 +179,42 @@ def _convert_second_fraction(s):
 
 DATETIME_RE = re.compile(r"(\d{1,4})-(\d{1,2})-(\d{1,2})[T ](\d{1,2}):(\d{1,2}):(\d{1,2})(?:.(\d{1,6}))?")
 
+# The fromisoformat() of Python 3.7+ parses the values in the shape MySQL
+# sends them much faster than the regular expressions. They are only used
+# when the shape is checked, and anything they reject goes the usual way.
+_fromisoformat = not PY2 and hasattr(datetime.datetime, 'fromisoformat')
+
+#: Number of DATE values kept by convert_date(), the cache is cleared when full.
+DATE_CACHE_SIZE = 4096
+
+_date_cache = {}
+
+
+def _pad_fraction(obj, start):
+    """Check the fraction of seconds from *start* and pad it to 6 digits."""
+    # Nothing may follow the digits: fromisoformat() of Python 3.11+ also
+    # takes a UTC offset there, which the regular expressions ignore.
+    if obj[start] != '.' or not obj[start + 1:].isdigit():
+        return None
+    return obj + '0' * (start + 7 - len(obj))
+
+
+def _fast_datetime(obj):
+    """Parse ``YYYY-MM-DD HH:MM:SS[.ffffff]``, None for anything else."""
+    length = len(obj)
+    if not (length == 19 or 21 <= length <= 26) or obj[4] != '-' \
+            or obj[7] != '-' or obj[10] not in 'T ' or obj[13] != ':' \
+            or obj[16] != ':' or obj[11:13] == '24':
+        return None
+    if length > 19:
+        obj = _pad_fraction(obj, 19)
+        if obj is None:
+            return None
+    try:
+        return datetime.datetime.fromisoformat(obj)
+    except ValueError:
+        return None
+
 
 def convert_datetime(obj):
     """Returns a DATETIME or TIMESTAMP column value as a datetime object:
@@ -193,6 +235,11 @@ def convert_datetime(obj):
     if not PY2 and isinstance(obj, (bytes, bytearray)):
         obj = obj.decode('ascii')
 
+    if _fromisoformat:
+        dt = _fast_datetime(obj)
+        if dt is not None:
+            return dt
+
     m = DATETIME_RE.match(obj)
     if not m:
         return convert_date(obj)
@@ -207,6 +254,33 @@ def convert_datetime(obj):
 TIMEDELTA_RE = re.compile(r"(-)?(\d{1,3}):(\d{1,2}):(\d{1,2})(?:.(\d{1,6}))?")
 
 
+def _fast_timedelta(obj):
+    """Parse ``[-]H:MM:SS[.ffffff]`` with up to 3 digits of hours, None for
+    anything else."""
+    negative = obj[:1] == '-'
+    if negative:
+        obj = obj[1:]
+    hours_end = obj.find(':')
+    length = len(obj)
+    if not 1 <= hours_end <= 3 or obj[hours_end + 3:hours_end + 4] != ':':
+        return None
+    fraction = ''
+    if length != hours_end + 6:
+        if not hours_end + 8 <= length <= hours_end + 13 or obj[hours_end + 6] != '.':
+            return None
+        fraction = obj[hours_end + 7:]
+    hours = obj[:hours_end]
+    minutes = obj[hours_end + 1:hours_end + 3]
+    seconds = obj[hours_end + 4:hours_end + 6]
+    # str.isdecimal() is true for the digits \d matches
+    if not (hours + minutes + seconds + fraction).isdecimal():
+        return None
+    tdelta = datetime.timedelta(
+        0, int(hours) * 3600 + int(minutes) * 60 + int(seconds),
+        int(fraction.ljust(6, '0')) if fraction else 0)
+    return -tdelta if negative else tdelta
+
+
 def convert_timedelta(obj):
     """Returns a TIME column as a timedelta object:
 
@@ -227,6 +301,11 @@ def convert_timedelta(obj):
     if not PY2 and isinstance(obj, (bytes, bytearray)):
         obj = obj.decode('ascii')
 
+    if not PY2:
+        tdelta = _fast_timedelta(obj)
+        if tdelta is not None:
+            return tdelta
+
     m = TIMEDELTA_RE.match(obj)
     if not m:
         return obj
@@ -250,6 +329,22 @@ def convert_timedelta(obj):
 TIME_RE = re.compile(r"(\d{1,2}):(\d{1,2}):(\d{1,2})(?:.(\d{1,6}))?")
 
 
+def _fast_time(obj):
+    """Parse ``HH:MM:SS[.ffffff]``, None for anything else."""
+    length = len(obj)
+    if not (length == 8 or 10 <= length <= 15) or obj[2] != ':' \
+            or obj[5] != ':' or obj[:2] == '24':
+        return None
+    if length > 8:
+        obj = _pad_fraction(obj, 8)
+        if obj is None:
+            return None
+    try:
+        return datetime.time.fromisoformat(obj)
+    except ValueError:
+        return None
+
+
 def convert_time(obj):
     """Returns a TIME column as a time object:
 
@@ -275,6 +370,11 @@ def convert_time(obj):
     if not PY2 and isinstance(obj, (bytes, bytearray)):
         obj = obj.decode('ascii')
 
+    if _fromisoformat:
+        t = _fast_time(obj)
+        if t is not None:
+            return t
+
     m = TIME_RE.match(obj)
     if not m:
         return obj
@@ -305,6 +405,21 @@ def convert_date(obj):
     """
     if not PY2 and isinstance(obj, (bytes, bytearray)):
         obj = obj.decode('ascii')
+    if _fromisoformat:
+        try:
+            return _date_cache[obj]
+        except KeyError:
+            pass
+        if len(obj) == 10 and obj[4] == '-' and obj[7] == '-':
+            try:
+                date = datetime.date.fromisoformat(obj)
+            except ValueError:
+                pass
+            else:
+                if len(_date_cache) >= DATE_CACHE_SIZE:
+                    _date_cache.clear()
+                _date_cache[obj] = date
+                return date
     try:
         return datetime.date(*[ int(x) for x in obj.split('-', 2) ])
     except ValueError:
@@ -5,6 +5,7 @@ import re
 
 from ._compat import range_type, text_type, PY2
 from . import err
+from ._template import get_template
 
 
 #: Regular expression for :meth:`Cursor.executemany`.
@@ -137,10 +138,32 @@ class Cursor(object):
             query = self._ensure_bytes(query, encoding=conn.encoding)
 
         if args is not None:
+            template = get_template(query)
+            if template is not None:
+                formatted = template.format(conn, args)
+                if formatted is not None:
+                    return formatted
             query = query % self._escape_args(args, conn)
 
         return query
 
+    def _format_rows(self, values, rows, conn):
+        """Yield *values* formatted with each of *rows*, like mogrify().
+
+        The escape functions are chosen once, for the types of the first row.
+        """
+        template = get_template(values)
+        escapers = None
+        for row in rows:
+            if template is not None:
+                args = template.values(row)
+                if args is not None:
+                    if escapers is None:
+                        escapers = template.escapers(conn, args)
+                    yield template.join(conn, args, escapers)
+                    continue
+            yield values % self._escape_args(row, conn)
+
     def execute(self, query, args=None):
         """Execute a query
 
@@ -164,6 +187,27 @@ class Cursor(object):
         self._executed = query
         return result
 
+    def load_data_local(self, query, source, progress=None):
+        """Execute a LOAD DATA LOCAL INFILE statement with data from *source*
+
+        :param str query: LOAD DATA LOCAL INFILE statement. The file name in it
+            is only sent to the server, the data is read from source.
+        :param source: Binary file object, iterable of bytes, local path or
+            URI such as ``s3://bucket/table.csv.gz``. URIs are opened with
+            smart_open, which decompresses ``.gz`` and ``.bz2`` files.
+        :param progress: Called with the number of bytes sent so far. (optional)
+        :return: Number of affected rows
+        :rtype: int
+
+        The connection needs ``local_infile=True``.
+        """
+        conn = self._get_db()
+        conn._local_infile_source = (source, progress)
+        try:
+            return self.execute(query)
+        finally:
+            conn._local_infile_source = None
+
     def executemany(self, query, args):
         # type: (str, list) -> int
         """Run several data against one query
@@ -193,8 +237,16 @@ class Cursor(object):
         return self.rowcount
 
     def _do_execute_many(self, prefix, values, postfix, args, max_stmt_length, encoding):
+        rows = 0
+        for sql in self._iter_execute_many(prefix, values, postfix, args,
+                                           max_stmt_length, encoding):
+            rows += self.execute(sql)
+        self.rowcount = rows
+        return rows
+
+    def _iter_execute_many(self, prefix, values, postfix, args, max_stmt_length, encoding):
+        """Yield the multiple-row statements that insert args."""
         conn = self._get_db()
-        escape = self._escape_args
         if isinstance(prefix, text_type):
             prefix = prefix.encode(encoding)
         if PY2 and isinstance(values, text_type):
@@ -202,31 +254,22 @@ class Cursor(object):
         if isinstance(postfix, text_type):
             postfix = postfix.encode(encoding)
         sql = bytearray(prefix)
-        args = iter(args)
-        v = values % escape(next(args), conn)
-        if isinstance(v, text_type):
-            if PY2:
-                v = v.encode(encoding)
-            else:
-                v = v.encode(encoding, 'surrogateescape')
-        sql += v
-        rows = 0
-        for arg in args:
-            v = values % escape(arg, conn)
+        first = True
+        for v in self._format_rows(values, args, conn):
             if isinstance(v, text_type):
                 if PY2:
                     v = v.encode(encoding)
                 else:
                     v = v.encode(encoding, 'surrogateescape')
-            if len(sql) + len(v) + len(postfix) + 1 > max_stmt_length:
-                rows += self.execute(sql + postfix)
+            if first:
+                first = False
+            elif len(sql) + len(v) + len(postfix) + 1 > max_stmt_length:
+                yield sql + postfix
                 sql = bytearray(prefix)
             else:
                 sql += b','
             sql += v
-        rows += self.execute(sql + postfix)
-        self.rowcount = rows
-        return rows
+        yield sql + postfix
 
     def callproc(self, procname, args=()):
         """Execute stored procedure procname with args
@@ -0,0 +1,373 @@
+# -*- coding: utf-8 -*-
+"""
+Thread-safe pool of MySQL connections.
+
+A pool hands out connections that stay open between uses, so only the
+first checkout of each connection pays for the TCP, TLS and authentication
+handshake. Keep the pool in a module-global and warm AWS Lambda
+invocations reuse its connections::
+
+    pool = pymysql.pool.ConnectionPool(host=..., user=..., password=...,
+                                       maxsize=2)
+
+    def lambda_handler(event, context):
+        with pool.connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+
+A connection is reset when it is returned: an unread result is drained,
+the transaction is rolled back and autocommit is set back to the value
+it had when the connection was opened.
+
+The pool does not run a background thread, idle and expired connections
+are closed when a connection is checked out or returned.
+"""
+from __future__ import absolute_import
+from collections import deque, namedtuple
+from contextlib import contextmanager
+import threading
+import time
+
+from . import connections, err
+
+try:
+    _now = time.monotonic
+except AttributeError:  # Python 2
+    _now = time.time
+
+
+#: Snapshot of the state and counters of a :class:`ConnectionPool`.
+#: Latencies are in seconds, ``checkout_time`` is the total over all
+#: ``checkouts``.
+PoolStats = namedtuple('PoolStats', [
+    'size', 'idle', 'in_use', 'waiting',
+    'checkouts', 'checkout_time', 'max_checkout_time',
+    'waits', 'timeouts', 'created', 'closed'])
+
+
+class PoolTimeoutError(err.OperationalError):
+    """Raised when no connection became available within the timeout."""
+
+
+class _Entry(object):
+    __slots__ = ('conn', 'autocommit', 'created', 'last_used')
+
+    def __init__(self, conn, now):
+        self.conn = conn
+        self.autocommit = conn.get_autocommit()
+        self.created = now
+        self.last_used = now
+
+
+class _Waiter(object):
+    __slots__ = ('cond', 'entry')
+
+    def __init__(self, lock):
+        self.cond = threading.Condition(lock)
+        self.entry = _WAITING
+
+
+_WAITING = object()
+
+
+class ConnectionPool(object):
+    """
+    Pool of connections created with ``Connection(*args, **kwargs)``.
+
+    :param minsize: Number of connections opened up front and kept open
+        while they are idle.
+    :param maxsize: Maximum number of connections, in use or idle.
+    :param timeout: Default number of seconds :meth:`acquire` waits for a
+        connection. (default: None - wait forever)
+    :param max_lifetime: Seconds after which a connection is closed
+        instead of being reused. (default: None - no limit)
+    :param max_idle: Seconds after which an idle connection is closed,
+        unless that leaves fewer than minsize. (default: None - no limit)
+    :param ping_interval: A connection that was idle for at least this
+        many seconds is checked with a ping before it is handed out.
+        (default: 1)
+
+    See :class:`connections.Connection` for the other arguments.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.minsize = kwargs.pop('minsize', 0)
+        self.maxsize = kwargs.pop('maxsize', 10)
+        self.timeout = kwargs.pop('timeout', None)
+        self.max_lifetime = kwargs.pop('max_lifetime', None)
+        self.max_idle = kwargs.pop('max_idle', None)
+        self.ping_interval = kwargs.pop('ping_interval', 1)
+        if not 0 <= self.minsize <= self.maxsize or self.maxsize < 1:
+            raise ValueError("Invalid pool size: minsize=%r, maxsize=%r"
+                             % (self.minsize, self.maxsize))
+        self._args = args
+        self._kwargs = kwargs
+
+        self._lock = threading.Lock()
+        self._idle = deque()
+        self._in_use = {}
+        self._size = 0
+        # threads waiting for a connection, in order of arrival
+        self._waiters = deque()
+        self._closed = False
+        self._checkouts = self._waits = self._timeouts = 0
+        self._created = self._discarded = 0
+        self._checkout_time = self._max_checkout_time = 0.0
+
+        for _ in range(self.minsize):
+            self._size += 1
+            entry = self._open()
+            self._idle.append(entry)
+
+    def acquire(self, timeout=-1):
+        """
+        Check out a connection, waiting at most *timeout* seconds for one.
+
+        The default timeout is the one of the pool, None waits forever.
+
+        :raise PoolTimeoutError: If no connection became available in time.
+        :raise InterfaceError: If the pool is closed.
+        """
+        if timeout == -1:
+            timeout = self.timeout
+        start = _now()
+        deadline = None if timeout is None else start + timeout
+        while True:
+            entry, waited = self._checkout(deadline)
+            if entry is None:
+                try:
+                    entry = self._open()
+                except Exception:
+                    self._forget()
+                    raise
+            elif not self._is_healthy(entry):
+                self._close(entry.conn)
+                self._forget()
+                continue
+            break
+
+        now = _now()
+        elapsed = now - start
+        with self._lock:
+            self._in_use[id(entry.conn)] = entry
+            self._checkouts += 1
+            self._checkout_time += elapsed
+            if elapsed > self._max_checkout_time:
+                self._max_checkout_time = elapsed
+            if waited:
+                self._waits += 1
+        return entry.conn
+
+    def release(self, conn, discard=False):
+        """
+        Return a connection to the pool.
+
+        The connection is reset before it can be checked out again. It is
+        closed instead if *discard* is true, the reset fails or it reached
+        its max_lifetime.
+        """
+        with self._lock:
+            try:
+                entry = self._in_use.pop(id(conn))
+            except KeyError:
+                raise ValueError("Connection does not belong to this pool")
+
+        if not discard:
+            try:
+                self._reset(entry)
+            except Exception:
+                discard = True
+        now = _now()
+        if (self.max_lifetime is not None
+                and now - entry.created >= self.max_lifetime):
+            discard = True
+
+        with self._lock:
+            if not (discard or self._closed):
+                entry.last_used = now
+                if self._waiters:
+                    self._wake(entry)
+                else:
+                    self._idle.append(entry)
+                return
+        self._close(conn)
+        self._forget()
+
+    @contextmanager
+    def connection(self, timeout=-1):
+        """
+        Context manager that checks out a connection and returns it on exit.
+
+        The connection is discarded if the block raised an
+        :class:`OperationalError` or :class:`InterfaceError`, which
+        usually means it is no longer usable.
+        """
+        conn = self.acquire(timeout)
+        try:
+            yield conn
+        except (err.OperationalError, err.InterfaceError):
+            self.release(conn, discard=True)
+            raise
+        except BaseException:
+            self.release(conn)
+            raise
+        self.release(conn)
+
+    def close(self):
+        """
+        Close the idle connections and the others when they are returned.
+
+        Waiting and later :meth:`acquire` calls raise InterfaceError.
+        """
+        with self._lock:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+            self._discarded += len(idle)
+            for waiter in self._waiters:
+                waiter.cond.notify()
+        for entry in idle:
+            self._close(entry.conn)
+
+    def stats(self):
+        """Return a :data:`PoolStats` snapshot."""
+        with self._lock:
+            return PoolStats(
+                size=self._size,
+                idle=len(self._idle),
+                in_use=len(self._in_use),
+                waiting=len(self._waiters),
+                checkouts=self._checkouts,
+                checkout_time=self._checkout_time,
+                max_checkout_time=self._max_checkout_time,
+                waits=self._waits,
+                timeouts=self._timeouts,
+                created=self._created,
+                closed=self._discarded)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _checkout(self, deadline):
+        """
+        Return an idle entry, or None after reserving room for a new one.
+
+        Also tells whether it had to wait. Waiting threads are served in
+        order of arrival: while there are any, connections that are
+        returned or room that is freed are handed to the first of them.
+        """
+        expired = []
+        try:
+            with self._lock:
+                if self._closed:
+                    raise err.InterfaceError(0, "Pool is closed")
+                expired = self._evict(_now())
+                if not self._waiters:
+                    if self._idle:
+                        # most recently used first, so the others can idle out
+                        return self._idle.pop(), False
+                    if self._size < self.maxsize:
+                        self._size += 1
+                        return None, False
+
+                waiter = _Waiter(self._lock)
+                self._waiters.append(waiter)
+                try:
+                    while waiter.entry is _WAITING:
+                        if self._closed:
+                            raise err.InterfaceError(0, "Pool is closed")
+                        if deadline is None:
+                            remaining = None
+                        else:
+                            remaining = deadline - _now()
+                            if remaining <= 0:
+                                self._timeouts += 1
+                                raise PoolTimeoutError(
+                                    0, "No connection available in the pool")
+                        waiter.cond.wait(remaining)
+                finally:
+                    if waiter.entry is _WAITING:
+                        self._waiters.remove(waiter)
+                return waiter.entry, True
+        finally:
+            for entry in expired:
+                self._close(entry.conn)
+
+    def _wake(self, entry):
+        """Hand *entry* to the first waiter, the lock must be held.
+
+        None hands over the room for a new connection.
+        """
+        waiter = self._waiters.popleft()
+        waiter.entry = entry
+        waiter.cond.notify()
+
+    def _evict(self, now):
+        """Remove expired idle entries, the lock must be held."""
+        expired = []
+        if self.max_lifetime is not None:
+            for entry in list(self._idle):
+                if now - entry.created >= self.max_lifetime:
+                    self._idle.remove(entry)
+                    expired.append(entry)
+        if self.max_idle is not None:
+            # the least recently used entries are on the left
+            while (self._idle and self._size - len(expired) > self.minsize
+                   and now - self._idle[0].last_used >= self.max_idle):
+                expired.append(self._idle.popleft())
+        self._size -= len(expired)
+        self._discarded += len(expired)
+        return expired
+
+    def _open(self):
+        conn = connections.Connection(*self._args, **self._kwargs)
+        entry = _Entry(conn, _now())
+        with self._lock:
+            self._created += 1
+        return entry
+
+    def _forget(self):
+        """Give up the room of a connection that was closed or not opened."""
+        with self._lock:
+            self._discarded += 1
+            if self._waiters and not self._closed:
+                self._wake(None)
+            else:
+                self._size -= 1
+
+    def _is_healthy(self, entry):
+        if not entry.conn.open:
+            return False
+        if _now() - entry.last_used < self.ping_interval:
+            return True
+        try:
+            entry.conn.ping(reconnect=False)
+        except Exception:
+            return False
+        return True
+
+    def _reset(self, entry):
+        conn = entry.conn
+        if not conn.open:
+            raise err.InterfaceError(0, "Connection is closed")
+        result = conn._result
+        if result is not None:
+            if result.unbuffered_active:
+                result._finish_unbuffered_query()
+            while conn._result is not None and conn._result.has_next:
+                conn.next_result()
+            conn._result = None
+        conn.rollback()
+        if conn.get_autocommit() != entry.autocommit:
+            conn.autocommit(entry.autocommit)
+
+    @staticmethod
+    def _close(conn):
+        try:
+            conn.close()
+        except Exception:
+            conn._force_close()
@@ -0,0 +1,545 @@
+# -*- coding: utf-8 -*-
+"""
+Server-side prepared statements.
+
+:class:`PreparedCursor` prepares each statement on the server once per
+connection, with COM_STMT_PREPARE, and then only sends the statement id
+and the binary encoded arguments. The server does not parse the SQL
+again and sends rows in the binary protocol, numbers and dates are read
+without converting them from text::
+
+    cursor = conn.cursor(pymysql.prepared.PreparedCursor)
+    cursor.execute("SELECT * FROM employees WHERE emp_no = %s", (10001,))
+
+The ``%s`` and ``%(name)s`` placeholders of the other cursors are used.
+Each connection keeps the statements it prepared in a least recently
+used cache of :attr:`PreparedCursor.max_prepared` entries, statements
+that drop out of it are closed on the server.
+
+Numeric, date and time columns of binary rows are decoded directly.
+Custom converters for their types are called with the text the server
+would have sent instead.
+"""
+from __future__ import absolute_import
+from collections import OrderedDict
+import datetime
+from decimal import Decimal
+import re
+import struct
+
+from ._compat import PY2, long_type, range_type, text_type
+from . import converters, err
+from .connections import MySQLResult, _read_lenenc_head, lenenc_int
+from .constants import COMMAND, ER, FIELD_TYPE, FLAG
+from .cursors import Cursor, DictCursorMixin, SSCursor, RE_INSERT_VALUES
+from .protocol import FieldDescriptorPacket
+
+#: Placeholders of the pyformat paramstyle, and escaped percent signs.
+RE_PLACEHOLDER = re.compile(r"%(?:\(([^)]*)\)s|s|%)")
+
+_NULL_TYPE = struct.pack('<BB', FIELD_TYPE.NULL, 0)
+_EXECUTE_HEADER = struct.Struct('<IBI')
+
+
+class PreparedStatement(object):
+    """A statement prepared on the server for one connection."""
+
+    def __init__(self, connection, sql):
+        self.connection = connection
+        self.sql = sql
+        conn = connection
+        conn._execute_command(COMMAND.COM_STMT_PREPARE, sql)
+        packet = conn._read_packet()
+        packet.advance(1)
+        self.statement_id = packet.read_uint32()
+        num_columns = packet.read_uint16()
+        self.param_count = packet.read_uint16()
+        self.params = [conn._read_packet(FieldDescriptorPacket)
+                       for _ in range_type(self.param_count)]
+        if self.param_count:
+            conn._read_packet()  # EOF
+        self.fields = [conn._read_packet(FieldDescriptorPacket)
+                       for _ in range_type(num_columns)]
+        if num_columns:
+            conn._read_packet()  # EOF
+
+    def execute(self, args=(), unbuffered=False):
+        """Execute the statement with *args* and read its result.
+
+        Returns the number of affected rows, like Connection.query().
+        """
+        if len(args) != self.param_count:
+            raise err.ProgrammingError(
+                "Statement takes %d arguments, %d given"
+                % (self.param_count, len(args)))
+        conn = self.connection
+        payload = _EXECUTE_HEADER.pack(self.statement_id, 0, 1)
+        if args:
+            payload += _encode_params(args, conn.encoding)
+        conn._execute_command(COMMAND.COM_STMT_EXECUTE, payload)
+        conn._affected_rows = conn._read_query_result(
+            unbuffered=unbuffered, result_class=BinaryResult)
+        return conn._affected_rows
+
+    def close(self):
+        """Deallocate the statement on the server."""
+        conn = self.connection
+        if conn is None:
+            return
+        self.connection = None
+        if conn.open:
+            # COM_STMT_CLOSE has no response
+            conn._execute_command(COMMAND.COM_STMT_CLOSE,
+                                  struct.pack('<I', self.statement_id))
+
+
+class StatementCache(object):
+    """Least recently used cache of the statements of a connection."""
+
+    def __init__(self, connection, maxsize):
+        self.connection = connection
+        self.maxsize = maxsize
+        self.thread_id = connection.server_thread_id
+        self.hits = self.misses = 0
+        self._statements = OrderedDict()
+
+    def get(self, sql):
+        """Return the statement for *sql*, preparing it if needed."""
+        stmt = self._statements.get(sql)
+        if stmt is not None:
+            self.hits += 1
+            self._statements.move_to_end(sql)
+            return stmt
+        self.misses += 1
+        while len(self._statements) >= self.maxsize:
+            self._statements.popitem(last=False)[1].close()
+        stmt = PreparedStatement(self.connection, sql)
+        self._statements[sql] = stmt
+        return stmt
+
+    def discard(self, sql):
+        """Forget the statement for *sql* without closing it."""
+        self._statements.pop(sql, None)
+
+    def clear(self):
+        """Close all statements."""
+        statements = list(self._statements.values())
+        self._statements.clear()
+        for stmt in statements:
+            stmt.close()
+
+    def __len__(self):
+        return len(self._statements)
+
+
+def get_statement_cache(connection, maxsize):
+    """Return the statement cache of *connection*.
+
+    Prepared statements belong to a server session, the cache is replaced
+    when the connection was reconnected. Its size is the one of the last
+    cursor that used it.
+    """
+    cache = getattr(connection, '_statement_cache', None)
+    if cache is None or cache.thread_id != connection.server_thread_id:
+        cache = connection._statement_cache = StatementCache(connection,
+                                                             maxsize)
+    cache.maxsize = maxsize
+    return cache
+
+
+class PreparedCursor(Cursor):
+    """
+    Cursor that executes statements with arguments as server-side prepared
+    statements. Statements without arguments are sent as text queries.
+    """
+
+    #: Number of statements each connection keeps prepared.
+    max_prepared = 64
+
+    _unbuffered = False
+
+    def execute(self, query, args=None):
+        """Execute a query
+
+        :param str query: Query to execute.
+
+        :param args: parameters used with query. (optional)
+        :type args: tuple, list or dict
+
+        :return: Number of affected rows
+        :rtype: int
+
+        If args is a list or tuple, %s can be used as a placeholder in the query.
+        If args is a dict, %(name)s can be used as a placeholder in the query.
+        """
+        if args is None:
+            return super(PreparedCursor, self).execute(query)
+
+        while self.nextset():
+            pass
+
+        conn = self._get_db()
+        sql, names = convert_placeholders(query)
+        if names is not None:
+            if not isinstance(args, dict):
+                raise err.ProgrammingError(
+                    "Query uses %(name)s placeholders, args must be a dict")
+            params = [args[name] for name in names]
+        elif isinstance(args, dict):
+            raise err.ProgrammingError(
+                "Query uses %s placeholders, args must be a sequence")
+        elif not isinstance(args, (tuple, list)):
+            params = (args,)
+        else:
+            params = args
+
+        result = self._execute_prepared(conn, query, args, sql, params)
+        self._executed = query
+        return result
+
+    def executemany(self, query, args):
+        # type: (str, list) -> int
+        """Run several data against one query
+
+        :param query: query to execute on server
+        :param args:  Sequence of sequences or mappings.  It is used as parameter.
+        :return: Number of rows affected, if any.
+
+        Multiple-row INSERT and REPLACE are sent as text statements, as with
+        the other cursors. Other statements are prepared once and then
+        executed with each item of args.
+        """
+        if not args:
+            return
+        if RE_INSERT_VALUES.match(query):
+            return super(PreparedCursor, self).executemany(query, args)
+        self.rowcount = sum(self.execute(query, arg) for arg in args)
+        return self.rowcount
+
+    def _execute_prepared(self, conn, query, args, sql, params):
+        cache = get_statement_cache(conn, self.max_prepared)
+        self._last_executed = query
+        self._clear_result()
+        for retry in (True, False):
+            try:
+                stmt = cache.get(sql)
+            except err.DatabaseError as e:
+                if e.args[0] != ER.UNSUPPORTED_PS:
+                    raise
+                # not preparable, send it as a text query
+                return self._query(self.mogrify(query, args))
+            try:
+                stmt.execute(params, self._unbuffered)
+                break
+            except err.DatabaseError as e:
+                if not (retry and e.args[0] == ER.UNKNOWN_STMT_HANDLER):
+                    raise
+                cache.discard(sql)
+        self._do_get_result()
+        return self.rowcount
+
+
+class PreparedDictCursor(DictCursorMixin, PreparedCursor):
+    """A prepared statement cursor which returns results as a dictionary"""
+
+
+class PreparedSSCursor(PreparedCursor, SSCursor):
+    """An unbuffered prepared statement cursor, see SSCursor"""
+
+    _unbuffered = True
+
+
+def convert_placeholders(query):
+    """Return *query* with ``?`` placeholders and the names they had.
+
+    The names are None for ``%s`` placeholders.
+    """
+    if isinstance(query, bytes) and not PY2:
+        query = query.decode('utf-8', 'surrogateescape')
+    names = []
+    positional = []
+
+    def replace(m):
+        if m.group(0) == '%%':
+            return '%'
+        if m.group(1) is None:
+            positional.append(True)
+        else:
+            names.append(m.group(1))
+        return '?'
+
+    sql = RE_PLACEHOLDER.sub(replace, query)
+    if names and positional:
+        raise err.ProgrammingError(
+            "Query mixes %s and %(name)s placeholders")
+    return sql, (names if names else None)
+
+
+def _encode_params(args, encoding):
+    """Return the NULL bitmap, types and values of COM_STMT_EXECUTE."""
+    null_bitmap = bytearray((len(args) + 7) // 8)
+    types = []
+    values = []
+    for i, arg in enumerate(args):
+        if arg is None:
+            null_bitmap[i // 8] |= 1 << (i % 8)
+            types.append(_NULL_TYPE)
+            continue
+        field_type, unsigned, value = _encode_param(arg, encoding)
+        types.append(struct.pack('<BB', field_type, 0x80 if unsigned else 0))
+        values.append(value)
+    return bytes(null_bitmap) + b'\x01' + b''.join(types) + b''.join(values)
+
+
+def _encode_param(arg, encoding):
+    """Return the type, unsigned flag and binary value of an argument."""
+    if isinstance(arg, bool):
+        arg = int(arg)
+    if isinstance(arg, (int, long_type)):
+        if -1 << 63 <= arg < 1 << 63:
+            return FIELD_TYPE.LONGLONG, False, struct.pack('<q', arg)
+        if 0 <= arg < 1 << 64:
+            return FIELD_TYPE.LONGLONG, True, struct.pack('<Q', arg)
+        return FIELD_TYPE.NEWDECIMAL, False, _lenenc_str(str(arg).encode())
+    if isinstance(arg, float):
+        return FIELD_TYPE.DOUBLE, False, struct.pack('<d', arg)
+    if isinstance(arg, Decimal):
+        return FIELD_TYPE.NEWDECIMAL, False, _lenenc_str(str(arg).encode())
+    if isinstance(arg, text_type):
+        return FIELD_TYPE.VAR_STRING, False, _lenenc_str(arg.encode(encoding))
+    if isinstance(arg, (bytes, bytearray, memoryview)):
+        return FIELD_TYPE.BLOB, False, _lenenc_str(bytes(arg))
+    if isinstance(arg, datetime.datetime):
+        if arg.microsecond:
+            value = struct.pack('<BHBBBBBI', 11, arg.year, arg.month, arg.day,
+                                arg.hour, arg.minute, arg.second,
+                                arg.microsecond)
+        else:
+            value = struct.pack('<BHBBBBB', 7, arg.year, arg.month, arg.day,
+                                arg.hour, arg.minute, arg.second)
+        return FIELD_TYPE.DATETIME, False, value
+    if isinstance(arg, datetime.date):
+        value = struct.pack('<BHBB', 4, arg.year, arg.month, arg.day)
+        return FIELD_TYPE.DATE, False, value
+    if isinstance(arg, datetime.timedelta):
+        negative = arg < datetime.timedelta(0)
+        if negative:
+            arg = -arg
+        seconds = arg.seconds
+        return FIELD_TYPE.TIME, False, _pack_time(
+            negative, arg.days, seconds // 3600, seconds // 60 % 60,
+            seconds % 60, arg.microseconds)
+    if isinstance(arg, datetime.time):
+        return FIELD_TYPE.TIME, False, _pack_time(
+            False, 0, arg.hour, arg.minute, arg.second, arg.microsecond)
+    if isinstance(arg, (tuple, list, set, frozenset, dict)):
+        raise err.ProgrammingError(
+            "%s can not be a prepared statement argument"
+            % type(arg).__name__)
+    return FIELD_TYPE.VAR_STRING, False, _lenenc_str(
+        text_type(arg).encode(encoding))
+
+
+def _pack_time(negative, days, hours, minutes, seconds, microseconds):
+    if microseconds:
+        return struct.pack('<BBIBBBI', 12, negative, days, hours, minutes,
+                           seconds, microseconds)
+    return struct.pack('<BBIBBB', 8, negative, days, hours, minutes, seconds)
+
+
+def _lenenc_str(value):
+    return lenenc_int(len(value)) + value
+
+
+class BinaryResult(MySQLResult):
+    """Result of a prepared statement, its rows are in the binary protocol."""
+
+    def _get_descriptions(self):
+        MySQLResult._get_descriptions(self)
+        self._decode_row = _make_binary_row_decoder(self.fields,
+                                                    self.converters)
+
+
+_INTEGERS = {
+    FIELD_TYPE.TINY: ('<b', '<B'),
+    FIELD_TYPE.SHORT: ('<h', '<H'),
+    FIELD_TYPE.YEAR: ('<h', '<H'),
+    FIELD_TYPE.INT24: ('<i', '<I'),
+    FIELD_TYPE.LONG: ('<i', '<I'),
+    FIELD_TYPE.LONGLONG: ('<q', '<Q'),
+}
+
+_DEFAULT_DECODERS = {
+    FIELD_TYPE.TINY: int,
+    FIELD_TYPE.SHORT: int,
+    FIELD_TYPE.YEAR: int,
+    FIELD_TYPE.INT24: int,
+    FIELD_TYPE.LONG: int,
+    FIELD_TYPE.LONGLONG: int,
+    FIELD_TYPE.FLOAT: float,
+    FIELD_TYPE.DOUBLE: float,
+    FIELD_TYPE.DATE: converters.convert_date,
+    FIELD_TYPE.NEWDATE: converters.convert_date,
+    FIELD_TYPE.DATETIME: converters.convert_datetime,
+    FIELD_TYPE.TIMESTAMP: converters.convert_datetime,
+    FIELD_TYPE.TIME: converters.convert_timedelta,
+}
+
+
+def _make_binary_row_decoder(fields, column_converters):
+    """Build a function that reads a binary protocol row from a packet."""
+    readers = []
+    for i, (field, (encoding, converter)) in enumerate(
+            zip(fields, column_converters)):
+        # the NULL bitmap of binary rows starts at bit 2
+        bit = i + 2
+        null_byte = 1 + bit // 8
+        null_mask = 1 << (bit % 8)
+        readers.append((null_byte, null_mask,
+                        _column_reader(field, encoding, converter)))
+    first_value = 1 + (len(fields) + 9) // 8
+
+    def decode_row(packet):
+        data = packet._data
+        if type(data) is not bytes:
+            data = bytes(data)
+        pos = first_value
+        row = []
+        for null_byte, null_mask, read in readers:
+            if data[null_byte] & null_mask:
+                row.append(None)
+            else:
+                value, pos = read(data, pos)
+                row.append(value)
+        return tuple(row)
+
+    return decode_row
+
+
+def _column_reader(field, encoding, converter):
+    """Return a function that reads a value of *field* at a position."""
+    field_type = field.type_code
+    native = converter is _DEFAULT_DECODERS.get(field_type) or (
+        converter is None and field_type not in _DEFAULT_DECODERS)
+
+    def as_text(text):
+        # what a text protocol row would have been converted to
+        value = text if encoding is not None else text.encode('ascii')
+        return converter(value) if converter is not None else value
+
+    if field_type in _INTEGERS:
+        unpack = struct.Struct(
+            _INTEGERS[field_type][bool(field.flags & FLAG.UNSIGNED)])
+        size = unpack.size
+        unpack_from = unpack.unpack_from
+
+        def read_int(data, pos):
+            value = unpack_from(data, pos)[0]
+            return (value if native else as_text(str(value))), pos + size
+        return read_int
+
+    if field_type in (FIELD_TYPE.FLOAT, FIELD_TYPE.DOUBLE):
+        is_float = field_type == FIELD_TYPE.FLOAT
+        unpack = struct.Struct('<f' if is_float else '<d')
+        size = unpack.size
+        unpack_from = unpack.unpack_from
+
+        def read_float(data, pos):
+            value = unpack_from(data, pos)[0]
+            if is_float:
+                value = _shortest_float32(value)
+            return (value if native else as_text(repr(value))), pos + size
+        return read_float
+
+    if field_type in (FIELD_TYPE.DATE, FIELD_TYPE.NEWDATE,
+                      FIELD_TYPE.DATETIME, FIELD_TYPE.TIMESTAMP):
+        is_date = field_type in (FIELD_TYPE.DATE, FIELD_TYPE.NEWDATE)
+
+        def read_datetime(data, pos):
+            length = data[pos]
+            end = pos + 1 + length
+            year, month, day, hour, minute, second, usec = _unpack_datetime(
+                data[pos + 1:end])
+            if native:
+                try:
+                    if is_date:
+                        return datetime.date(year, month, day), end
+                    return datetime.datetime(year, month, day, hour, minute,
+                                             second, usec), end
+                except ValueError:
+                    pass
+            text = '%04d-%02d-%02d' % (year, month, day)
+            if not is_date:
+                text += ' %02d:%02d:%02d' % (hour, minute, second)
+                if usec:
+                    text += '.%06d' % usec
+            return as_text(text), end
+        return read_datetime
+
+    if field_type == FIELD_TYPE.TIME:
+        def read_time(data, pos):
+            length = data[pos]
+            end = pos + 1 + length
+            negative, days, hour, minute, second, usec = _unpack_time(
+                data[pos + 1:end])
+            if native:
+                value = datetime.timedelta(days=days, hours=hour,
+                                           minutes=minute, seconds=second,
+                                           microseconds=usec)
+                return (-value if negative else value), end
+            text = '%s%02d:%02d:%02d' % ('-' if negative else '',
+                                         days * 24 + hour, minute, second)
+            if usec:
+                text += '.%06d' % usec
+            return as_text(text), end
+        return read_time
+
+    def read_string(data, pos):
+        c = data[pos]
+        if c < 251:
+            start = pos + 1
+            end = start + c
+        else:
+            start, end = _read_lenenc_head(data, pos, c)
+        value = data[start:end]
+        if encoding is not None:
+            value = value.decode(encoding)
+        if converter is not None:
+            value = converter(value)
+        return value, end
+    return read_string
+
+
+def _unpack_datetime(data):
+    length = len(data)
+    year = month = day = hour = minute = second = usec = 0
+    if length >= 4:
+        year, month, day = struct.unpack_from('<HBB', data)
+    if length >= 7:
+        hour, minute, second = struct.unpack_from('<BBB', data, 4)
+    if length >= 11:
+        usec, = struct.unpack_from('<I', data, 7)
+    return year, month, day, hour, minute, second, usec
+
+
+def _unpack_time(data):
+    length = len(data)
+    if length < 8:
+        return False, 0, 0, 0, 0, 0
+    negative, days, hour, minute, second = struct.unpack_from('<BIBBB', data)
+    usec = struct.unpack_from('<I', data, 8)[0] if length >= 12 else 0
+    return bool(negative), days, hour, minute, second, usec
+
+
+def _shortest_float32(value):
+    """Return the shortest float that rounds to the same FLOAT value.
+
+    The text protocol sends FLOAT columns with as few digits as needed,
+    the binary protocol sends the single precision value.
+    """
+    packed = struct.pack('<f', value)
+    for digits in (6, 7, 8):
+        candidate = float('%.*g' % (digits, value))
+        if struct.pack('<f', candidate) == packed:
+            return candidate
+    return value
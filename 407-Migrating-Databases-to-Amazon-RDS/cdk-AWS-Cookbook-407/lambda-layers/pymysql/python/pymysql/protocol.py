@@ -50,6 +50,10 @@ class MysqlPacket(object):
     """Representation of a MySQL response packet.
 
     Provides an interface for reading/parsing the packet results.
+
+    The data is bytes, except for large row data packets, which the
+    connection may hand out as a memoryview of its receive buffer. Reads
+    from those return memoryview slices instead of copies.
     """
     __slots__ = ('_position', '_data')
 
@@ -12,6 +12,7 @@ import base64
 import io
 import logging
 
+import smart_open.bufferpool
 import smart_open.bytebuffer
 import smart_open.constants
 
@@ -67,7 +68,8 @@ def open(
         mode,
         client=None,  # type: azure.storage.blob.BlobServiceClient
         buffer_size=DEFAULT_BUFFER_SIZE,
-        min_part_size=_DEFAULT_MIN_PART_SIZE
+        min_part_size=_DEFAULT_MIN_PART_SIZE,
+        buffer_pool=None,
         ):
     """Open an Azure Blob Storage blob for reading or writing.
 
@@ -85,6 +87,9 @@ def open(
         The buffer size to use when performing I/O. For reading only.
     min_part_size: int, optional
         The minimum part size for multipart uploads.  For writing only.
+    buffer_pool: smart_open.bufferpool.BufferPool, optional
+        The pool to take the buffer of the parts from.  Defaults to
+        `smart_open.bufferpool.DEFAULT_POOL`.  For writing only.
 
     """
     if not client:
@@ -103,7 +108,8 @@ def open(
             container_id,
             blob_id,
             client,
-            min_part_size=min_part_size
+            min_part_size=min_part_size,
+            buffer_pool=buffer_pool,
         )
     else:
         raise NotImplementedError('Azure Blob Storage support for mode %r not implemented' % mode)
@@ -354,6 +360,7 @@ class Writer(io.BufferedIOBase):
             blob,
             client,  # type: azure.storage.blob.BlobServiceClient
             min_part_size=_DEFAULT_MIN_PART_SIZE,
+            buffer_pool=None,
     ):
         self._client = client
         self._container_client = self._client.get_container_client(container)
@@ -364,7 +371,10 @@ class Writer(io.BufferedIOBase):
         self._total_size = 0
         self._total_parts = 0
         self._bytes_uploaded = 0
-        self._current_part = io.BytesIO()
+        if buffer_pool is None:
+            buffer_pool = smart_open.bufferpool.DEFAULT_POOL
+        self._pool = buffer_pool
+        self._current_part = self._pool.acquire()
         self._block_list = []
 
         #
@@ -381,11 +391,14 @@ class Writer(io.BufferedIOBase):
     def close(self):
         logger.debug("closing")
         if not self.closed:
-            if self._current_part.tell() > 0:
-                self._upload_part()
-            self._blob.commit_block_list(self._block_list)
-            self._block_list = []
-            self._client = None
+            try:
+                if self._current_part.tell() > 0:
+                    self._upload_part()
+                self._blob.commit_block_list(self._block_list)
+                self._block_list = []
+                self._client = None
+            finally:
+                self._release_buffer()
         logger.debug("successfully closed")
 
     @property
@@ -435,8 +448,8 @@ class Writer(io.BufferedIOBase):
         """
         zero_padded_part_num = str(part_num).zfill(64 // 2)
         block_id = base64.b64encode(zero_padded_part_num.encode())
-        self._current_part.seek(0)
-        self._blob.stage_block(block_id, self._current_part.read(content_length))
+        with self._current_part.reader(content_length) as data:
+            self._blob.stage_block(block_id, data, length=content_length)
         self._block_list.append(azure.storage.blob.BlobBlock(block_id=block_id))
 
         logger.info(
@@ -446,8 +459,12 @@ class Writer(io.BufferedIOBase):
 
         self._total_parts += 1
         self._bytes_uploaded += content_length
-        self._current_part = io.BytesIO(self._current_part.read())
-        self._current_part.seek(0, io.SEEK_END)
+        self._current_part.empty()
+
+    def _release_buffer(self):
+        if self._current_part is not None:
+            self._pool.release(self._current_part)
+            self._current_part = None
 
     def __enter__(self):
         return self
@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2020 Radim Rehurek <me@radimrehurek.com>
+#
+# This code is distributed under the terms and conditions
+# from the MIT License (MIT).
+#
+"""Implements reusable part buffers for the writers.
+
+The writers buffer each part of an upload in a :class:`PartBuffer` taken
+from a :class:`BufferPool`, and give it back once the part is uploaded.
+A long upload thus reuses a few buffers, instead of allocating one per
+part, and the parts are uploaded from a view of the buffer, not a copy.
+
+Unless told otherwise, the writers share :data:`DEFAULT_POOL`.
+"""
+
+import io
+import threading
+
+DEFAULT_MAX_POOLED = 256 * 1024**2
+"""Default maximum number of bytes kept in the free buffers of a pool"""
+
+
+class PartBuffer(object):
+    """A byte buffer for a part of an upload, reused for part after part.
+
+    Writing appends to the buffer, growing it as needed.  Emptying the buffer
+    keeps its memory, so that it does not grow again for the next part.
+
+    Example
+    -------
+
+    >>> buf = PartBuffer()
+    >>> buf.write(b'Hello, World!')
+    13
+    >>> buf.reader().read(5)
+    b'Hello'
+    >>> buf.discard(7)
+    >>> buf.reader().read()
+    b'World!'
+    """
+
+    def __init__(self):
+        #
+        # A BytesIO keeps its memory when we seek back to its start, and
+        # lends it out through getbuffer() without a copy.
+        #
+        self._bytes = io.BytesIO()
+        self._length = 0
+        self._capacity = 0
+        self._counted_bytes = 0  # the capacity its pool knows about
+
+    @property
+    def capacity(self):
+        """The number of bytes the buffer holds without growing."""
+        return self._capacity
+
+    def tell(self):
+        """Return the number of bytes in the buffer."""
+        return self._length
+
+    def write(self, b):
+        """Append the bytes-like object b to the buffer.
+
+        Returns the number of bytes written.
+        """
+        written = self._bytes.write(b)
+        self._length += written
+        self._capacity = max(self._capacity, self._length)
+        return written
+
+    def reader(self, size=None):
+        """Return a file-like object reading the first size bytes of the
+        buffer, or all of them, without copying them.
+
+        Close the reader before writing to the buffer again.
+        """
+        if size is None:
+            size = self._length
+        with self._bytes.getbuffer() as view:
+            return _PartReader(view[:min(size, self._length)])
+
+    def view(self, size=None):
+        """Return a memoryview of the first size bytes of the buffer, or all
+        of them, without copying them.
+
+        Unlike a reader, the view may be sent again, should a request be
+        retried.  Release the view before writing to the buffer again.
+        """
+        if size is None:
+            size = self._length
+        with self._bytes.getbuffer() as view:
+            return view[:min(size, self._length)]
+
+    def discard(self, size):
+        """Remove the first size bytes from the buffer, keeping the others."""
+        size = min(size, self._length)
+        if size < self._length:
+            with self._bytes.getbuffer() as view:
+                view[:self._length - size] = view[size:self._length]
+        self._length -= size
+        self._bytes.seek(self._length)
+
+    def empty(self):
+        """Remove all bytes from the buffer."""
+        self._length = 0
+        self._bytes.seek(0)
+
+
+class _PartReader(object):
+    """Reads the bytes of a PartBuffer through a memoryview."""
+
+    def __init__(self, view):
+        self._view = view
+        self._position = 0
+
+    def __len__(self):
+        return len(self._view)
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def read(self, size=-1):
+        start = self._position
+        if size is None or size < 0:
+            stop = len(self._view)
+        else:
+            stop = min(start + size, len(self._view))
+        self._position = max(start, stop)
+        return self._view[start:stop].tobytes()
+
+    def readinto(self, b):
+        with memoryview(b) as view, view.cast('B') as data:
+            chunk = self._view[self._position:self._position + len(data)]
+            data[:len(chunk)] = chunk
+        self._position += len(chunk)
+        return len(chunk)
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            self._position = offset
+        elif whence == io.SEEK_CUR:
+            self._position += offset
+        elif whence == io.SEEK_END:
+            self._position = len(self._view) + offset
+        else:
+            raise ValueError('invalid whence: %r' % whence)
+        self._position = max(0, self._position)
+        return self._position
+
+    def tell(self):
+        return self._position
+
+    def close(self):
+        self._view.release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class BufferPool(object):
+    """A pool of part buffers, safe to share between writers and threads.
+
+    The pool keeps at most max_size bytes in its free buffers; a buffer
+    given back while the pool is full is left to the garbage collector.
+    """
+
+    def __init__(self, max_size=DEFAULT_MAX_POOLED):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._free = []
+        self._free_bytes = 0
+        self._used_bytes = 0
+        self._peak_bytes = 0
+        self._acquired = 0
+        self._reused = 0
+
+    def acquire(self):
+        """Take an empty buffer from the pool, or a new one if there are none."""
+        with self._lock:
+            self._acquired += 1
+            if self._free:
+                buf = self._free.pop()
+                self._free_bytes -= buf.capacity
+                self._reused += 1
+            else:
+                buf = PartBuffer()
+            self._used_bytes += buf.capacity
+            buf._counted_bytes = buf.capacity
+        return buf
+
+    def release(self, buf):
+        """Give a buffer back to the pool.  Its bytes are discarded."""
+        buf.empty()
+        with self._lock:
+            #
+            # The buffer likely grew since it was taken, it is at its
+            # largest now.
+            #
+            self._used_bytes += buf.capacity - buf._counted_bytes
+            self._peak_bytes = max(self._peak_bytes, self._used_bytes + self._free_bytes)
+            self._used_bytes -= buf.capacity
+            if self._free_bytes + buf.capacity <= self.max_size:
+                self._free.append(buf)
+                self._free_bytes += buf.capacity
+
+    def clear(self):
+        """Drop the free buffers."""
+        with self._lock:
+            self._free = []
+            self._free_bytes = 0
+
+    def stats(self):
+        """Return a dictionary of statistics about the use of the pool.
+
+        acquired and reused count the buffers taken from the pool, and the
+        ones of them which were reused.  used_bytes and free_bytes are the
+        sizes of the buffers in use and of the free ones, and peak_bytes
+        the largest sum of both seen when a buffer was given back.
+        """
+        with self._lock:
+            return dict(
+                acquired=self._acquired,
+                reused=self._reused,
+                reuse_rate=self._reused / self._acquired if self._acquired else 0.0,
+                used_bytes=self._used_bytes,
+                free_bytes=self._free_bytes,
+                free_buffers=len(self._free),
+                peak_bytes=self._peak_bytes,
+            )
+
+
+DEFAULT_POOL = BufferPool()
+"""The pool the writers take their buffers from by default"""
@@ -5,12 +5,40 @@
 # This code is distributed under the terms and conditions
 # from the MIT License (MIT).
 #
-"""Implements the compression layer of the ``smart_open`` library."""
+"""Implements the compression layer of the ``smart_open`` library.
+
+Besides the handlers for each extension, this module provides
+:func:`background`, which decompresses in a background thread, and
+:func:`parallel`, which (de)compresses gzip and bzip2 files in blocks
+across a pool of workers.  Register what they return to use them:
+
+>>> register_compressor('.gz', parallel('.gz', workers=4))
+"""
+import collections
+import concurrent.futures
+import importlib.util
+import io
 import logging
 import os.path
+import queue
+import threading
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_CHUNK_SIZE = 1024**2
+"""Default number of bytes decompressed at once in the background"""
+
+DEFAULT_BLOCK_SIZE = 4 * 1024**2
+"""Default number of bytes in each block (de)compressed in parallel"""
+
+_MAX_SEGMENT_BLOCKS = 2
+"""Blocks to read while looking for the start of a member, before giving up"""
+
+_MIN_SEGMENT_FRACTION = 16
+"""Segments are at least block_size / _MIN_SEGMENT_FRACTION compressed bytes"""
+
+_MAX_OUTPUT_BLOCKS = 4
+"""Blocks a worker decompresses from a segment, before giving up on it"""
 
 _COMPRESSOR_REGISTRY = {}
 
@@ -62,6 +90,114 @@ def _handle_gzip(file_obj, mode):
     return gzip.GzipFile(fileobj=file_obj, mode=mode)
 
 
+def _handle_zstd(file_obj, mode):
+    import zstandard
+    if mode.startswith('r'):
+        #
+        # Files written by zstd -T or pzstd hold several frames.
+        #
+        return zstandard.ZstdDecompressor().stream_reader(file_obj, read_across_frames=True)
+    return zstandard.ZstdCompressor().stream_writer(file_obj)
+
+
+def _handle_lz4(file_obj, mode):
+    import lz4.frame
+    return lz4.frame.LZ4FrameFile(file_obj, mode=mode)
+
+
+def background(handler, chunk_size=DEFAULT_CHUNK_SIZE, max_chunks=4):
+    """Wrap a handler so that it decompresses in a background thread.
+
+    One thread reads the compressed file, and another decompresses it, each
+    up to max_chunks chunks of chunk_size bytes ahead, so that downloading,
+    decompressing and whatever the reader does with the data overlap.
+    Writing is left as is.
+
+    Parameters
+    ----------
+    handler: callable
+        The handler to wrap, as given to :func:`register_compressor`.
+    chunk_size: int, optional
+        The number of decompressed bytes in each chunk.
+    max_chunks: int, optional
+        The maximum number of chunks decompressed and not yet read.
+
+    Examples
+    --------
+
+    >>> def _handle_xz(file_obj, mode):
+    ...     import lzma
+    ...     return lzma.LZMAFile(filename=file_obj, mode=mode, format=lzma.FORMAT_XZ)
+    >>>
+    >>> register_compressor('.xz', background(_handle_xz))
+
+    """
+    def handle(file_obj, mode):
+        if not mode.startswith('r'):
+            return handler(file_obj, mode)
+        source = _BackgroundReader(file_obj, chunk_size, max_chunks)
+        stream = handler(io.BufferedReader(source, chunk_size), mode)
+        raw = _BackgroundReader(stream, chunk_size, max_chunks, source=source)
+        return io.BufferedReader(raw, chunk_size)
+    return handle
+
+
+def parallel(ext, workers=None, block_size=DEFAULT_BLOCK_SIZE, compresslevel=9, processes=False):
+    """Return a handler that (de)compresses .gz or .bz2 files in parallel.
+
+    When writing, the data is cut into blocks of block_size bytes, each
+    compressed into a gzip member or bzip2 stream of its own by the workers,
+    like pigz --independent or pbzip2 do.  Any gzip or bzip2 tool reads the
+    result back.
+
+    When reading, the file is cut at the starts of its members, and the
+    segments are decompressed by the workers, in a background thread.  Files
+    made of a single member, like most gzip files, gain nothing from it:
+    once a segment turns out not to be whole members, or to decompress to
+    more than a few blocks, the rest of the file is decompressed in order,
+    a chunk at a time, like GzipFile and BZ2File do.  Either way, memory use
+    stays within a few blocks per worker.
+
+    Parameters
+    ----------
+    ext: str
+        The extension, ``.gz`` or ``.bz2``.
+    workers: int, optional
+        The number of workers.  Defaults to the number of CPUs.
+    block_size: int, optional
+        The number of bytes in each block, before compression when writing,
+        and after it when reading.
+    compresslevel: int, optional
+        The compression level, from 1 to 9.  For writing only.
+    processes: boolean, optional
+        Use processes instead of threads.  Threads suffice for zlib and bz2,
+        which release the GIL while they work, and avoid copying the blocks
+        between processes.
+
+    Examples
+    --------
+
+    >>> register_compressor('.gz', parallel('.gz'))
+    >>> register_compressor('.bz2', parallel('.bz2', workers=8, processes=True))
+
+    """
+    if ext not in ('.gz', '.bz2'):
+        raise ValueError('parallel (de)compression unsupported for %r' % ext)
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    def handle(file_obj, mode):
+        if processes:
+            executor = concurrent.futures.ProcessPoolExecutor(workers)
+        else:
+            executor = concurrent.futures.ThreadPoolExecutor(workers)
+        if mode.startswith('r'):
+            raw = _ParallelReader(file_obj, ext, executor, 2 * workers, block_size)
+            return io.BufferedReader(raw, DEFAULT_CHUNK_SIZE)
+        return _ParallelWriter(file_obj, ext, executor, 2 * workers, block_size, compresslevel)
+    return handle
+
+
 def compression_wrapper(file_obj, mode, filename=None):
     """
     This function will wrap the file_obj with an appropriate
@@ -101,3 +237,437 @@ def compression_wrapper(file_obj, mode, filename=None):
 #
 register_compressor('.bz2', _handle_bz2)
 register_compressor('.gz', _handle_gzip)
+if importlib.util.find_spec('lz4'):
+    register_compressor('.lz4', _handle_lz4)
+if importlib.util.find_spec('zstandard'):
+    register_compressor('.zst', _handle_zstd)
+
+
+class _BackgroundReader(io.RawIOBase):
+    """Reads a stream in a background thread, chunk by chunk.
+
+    Closes source, if given, after the stream."""
+
+    def __init__(self, stream, chunk_size=DEFAULT_CHUNK_SIZE, max_chunks=4, source=None):
+        self._stream = stream
+        self._source = source
+        self._chunk_size = chunk_size
+        self._chunks = queue.Queue(max_chunks)
+        self._thread = None
+        self._position = 0
+        self._start()
+
+    def _start(self):
+        self._chunk = memoryview(b'')
+        self._eof = False
+        self._error = None
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            while not self._stopping:
+                chunk = self._stream.read(self._chunk_size)
+                self._chunks.put(chunk)
+                if not chunk:
+                    break
+        except Exception as error:
+            self._chunks.put(error)
+
+    def _stop(self):
+        self._stopping = True
+        _drain(self._chunks, self._thread)
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return self._stream.seekable()
+
+    def readinto(self, b):
+        while not len(self._chunk):
+            if self._error is not None:
+                raise self._error
+            if self._eof:
+                return 0
+            chunk = self._chunks.get()
+            if isinstance(chunk, Exception):
+                self._error = chunk
+            elif not chunk:
+                self._eof = True
+            else:
+                self._chunk = memoryview(chunk)
+        size = min(len(b), len(self._chunk))
+        b[:size] = self._chunk[:size]
+        self._chunk = self._chunk[size:]
+        self._position += size
+        return size
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset, whence = self._position + offset, io.SEEK_SET
+        self._stop()
+        self._position = self._stream.seek(offset, whence)
+        self._start()
+        return self._position
+
+    def tell(self):
+        return self._position
+
+    def close(self):
+        if not self.closed:
+            self._stop()
+            self._stream.close()
+            if self._source is not None:
+                self._source.close()
+        super().close()
+
+
+class _MemberDecoder(object):
+    """Decompresses gzip members, or bzip2 streams, one after the other.
+
+    Like GzipFile and BZ2File, skips the zeros between gzip members and
+    ignores what follows the last bzip2 stream, unless strict.  Like them
+    too, returns at most max_length bytes at a time, keeping the rest of
+    the data for the next calls."""
+
+    def __init__(self, ext, strict=False):
+        self._ext = ext
+        self._strict = strict
+        self._decompressor = None
+        self._ignore_rest = False
+        self._pending = b''
+
+    @property
+    def at_boundary(self):
+        """True when the data decompressed so far ends with a whole member."""
+        return self._decompressor is None and not self._pending
+
+    @property
+    def needs_input(self):
+        """True when all the data given so far is decompressed."""
+        if self._pending:
+            return False
+        return self._ext == '.gz' or self._decompressor is None or self._decompressor.needs_input
+
+    def decompress(self, data, max_length=-1):
+        import bz2
+        import zlib
+
+        if self._pending:
+            data = self._pending + data if data else self._pending
+            self._pending = b''
+        out = []
+        size = 0
+        while not self._ignore_rest and (max_length < 0 or size < max_length):
+            new_member = self._decompressor is None
+            if new_member:
+                if self._ext == '.gz':
+                    data = data.lstrip(b'\x00')
+                if not data:
+                    break
+                if self._ext == '.gz':
+                    self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+                else:
+                    self._decompressor = bz2.BZ2Decompressor()
+            elif not data and self.needs_input:
+                break
+            try:
+                if self._ext == '.gz':
+                    # zlib takes 0, not -1, for no limit
+                    chunk = self._decompressor.decompress(data, max(max_length - size, 0))
+                else:
+                    chunk = self._decompressor.decompress(data, max_length - size if max_length >= 0 else -1)
+            except zlib.error as error:
+                raise OSError('invalid gzip data: %s' % error) from error
+            except OSError:
+                if new_member and not self._strict and self._ext == '.bz2':
+                    self._decompressor = None
+                    self._ignore_rest = True
+                    break
+                raise
+            out.append(chunk)
+            size += len(chunk)
+            if self._decompressor.eof:
+                data = self._decompressor.unused_data
+                self._decompressor = None
+            elif self._ext == '.gz':
+                data = self._decompressor.unconsumed_tail
+            else:
+                data = b''
+        if not self._ignore_rest:
+            self._pending = data
+        return b''.join(out)
+
+    def finish(self):
+        """Raise EOFError if the data ended in the middle of a member."""
+        if not self.at_boundary:
+            raise EOFError('Compressed file ended before the end-of-stream marker was reached')
+
+
+def _decompress_members(ext, data, max_length):
+    """Decompress data, or return None if it is not made of whole members
+    or holds more than max_length bytes."""
+    decoder = _MemberDecoder(ext, strict=True)
+    try:
+        out = decoder.decompress(data, max_length)
+    except (OSError, EOFError, ValueError):
+        return None
+    return out if decoder.at_boundary and decoder.needs_input else None
+
+
+def _compress_block(ext, data, compresslevel):
+    if ext == '.gz':
+        import gzip
+        return gzip.compress(data, compresslevel)
+    import bz2
+    return bz2.compress(data, compresslevel)
+
+
+def _find_member(ext, data, start):
+    """Return the position of the first likely start of a member in
+    data[start:], or -1."""
+    #
+    # The magic bytes may also turn up in the middle of a member, which is
+    # why the workers check that their segments are made of whole members.
+    #
+    if ext == '.gz':
+        magic, check = b'\x1f\x8b\x08', lambda pos: b'' < data[pos + 3:pos + 4] < b'\x20'
+    else:
+        magic, check = b'BZh', lambda pos: data[pos + 4:pos + 10] == b'1AY&SY'
+    pos = start - 1
+    while True:
+        pos = data.find(magic, pos + 1)
+        if pos < 0 or check(pos):
+            return pos
+
+
+def _drain(chunks, thread):
+    """Empty chunks until thread, which puts into it, is done."""
+    while thread.is_alive():
+        try:
+            item = chunks.get_nowait()
+        except queue.Empty:
+            thread.join(0.01)
+        else:
+            if isinstance(item, tuple) and item[1] is not None:
+                item[1].cancel()
+    while True:
+        try:
+            chunks.get_nowait()
+        except queue.Empty:
+            break
+
+
+class _ParallelReader(io.RawIOBase):
+    """Decompresses gzip or bzip2 in segments of whole members, across a pool.
+
+    A background thread reads the compressed file, cuts it where members
+    start, and submits the segments to the pool.  Once a segment turns out
+    not to be whole members, or too large, the rest of the file is
+    decompressed in order by a _MemberDecoder instead, DEFAULT_CHUNK_SIZE
+    bytes at a time."""
+
+    def __init__(self, file_obj, ext, executor, max_segments, block_size=DEFAULT_BLOCK_SIZE):
+        self._file_obj = file_obj
+        self._ext = ext
+        self._executor = executor
+        self._block_size = block_size
+        self._segments = queue.Queue(max_segments)
+        self._decoder = _MemberDecoder(ext)
+        self._parallel = True
+        self._chunk = memoryview(b'')
+        self._position = 0
+        self._eof = False
+        self._error = None
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            probed = False
+            for segment in self._cut_segments():
+                if self._stopping:
+                    return
+                future = None
+                if self._parallel:
+                    future = self._executor.submit(
+                        _decompress_members,
+                        self._ext,
+                        segment,
+                        _MAX_OUTPUT_BLOCKS * self._block_size,
+                    )
+                    if not probed:
+                        #
+                        # Most files are a single member: learn whether this
+                        # one splits before decompressing more of it.
+                        #
+                        probed = True
+                        if future.result() is None:
+                            self._stop_parallel()
+                self._segments.put((segment, future))
+            self._segments.put(None)
+        except Exception as error:
+            self._segments.put(error)
+
+    def _stop_parallel(self):
+        if self._parallel:
+            logger.debug('%s members too large to decompress in parallel', self._ext)
+            self._parallel = False
+
+    def _cut_segments(self):
+        data = bytearray()
+        min_size = max(1, self._block_size // _MIN_SEGMENT_FRACTION)
+        searched = min_size
+        eof = False
+        while data or not eof:
+            if not self._parallel:
+                #
+                # The rest is decompressed in order, no need to cut it
+                # where members start.
+                #
+                if data:
+                    yield bytes(data)
+                    data = bytearray()
+                if eof:
+                    return
+                block = self._file_obj.read(DEFAULT_CHUNK_SIZE)
+                if not block:
+                    return
+                yield block
+                continue
+            cut = _find_member(self._ext, data, searched) if len(data) > searched else -1
+            if cut < 0 and not eof and len(data) < _MAX_SEGMENT_BLOCKS * self._block_size:
+                searched = max(searched, len(data) - 9)
+                block = self._file_obj.read(DEFAULT_CHUNK_SIZE)
+                if not block:
+                    eof = True
+                data += block
+                continue
+            if cut < 0:
+                cut = len(data)
+            with memoryview(data) as view:
+                segment = bytes(view[:cut])
+            del data[:cut]
+            searched = min_size
+            yield segment
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while not len(self._chunk):
+            if self._error is not None:
+                raise self._error
+            if self._eof:
+                return 0
+            try:
+                self._chunk = memoryview(self._next_chunk())
+            except Exception as error:
+                self._error = error
+        size = min(len(b), len(self._chunk))
+        b[:size] = self._chunk[:size]
+        self._chunk = self._chunk[size:]
+        self._position += size
+        return size
+
+    def tell(self):
+        return self._position
+
+    def _next_chunk(self):
+        if not self._decoder.needs_input:
+            return self._decoder.decompress(b'', DEFAULT_CHUNK_SIZE)
+
+        item = self._segments.get()
+        if item is None:
+            self._eof = True
+            self._decoder.finish()
+            return b''
+        if isinstance(item, Exception):
+            raise item
+
+        segment, future = item
+        if future is not None and self._parallel and self._decoder.at_boundary:
+            out = future.result()
+            if out is not None:
+                return out
+            self._stop_parallel()
+        elif future is not None:
+            future.cancel()
+        return self._decoder.decompress(segment, DEFAULT_CHUNK_SIZE)
+
+    def close(self):
+        if not self.closed:
+            self._stopping = True
+            _drain(self._segments, self._thread)
+            self._executor.shutdown(wait=True)
+            self._file_obj.close()
+        super().close()
+
+
+class _ParallelWriter(io.BufferedIOBase):
+    """Compresses blocks into gzip members or bzip2 streams across a pool."""
+
+    def __init__(
+            self,
+            file_obj,
+            ext,
+            executor,
+            max_blocks,
+            block_size=DEFAULT_BLOCK_SIZE,
+            compresslevel=9):
+        self._file_obj = file_obj
+        self._ext = ext
+        self._executor = executor
+        self._max_blocks = max_blocks
+        self._block_size = block_size
+        self._compresslevel = compresslevel
+        self._block = bytearray()
+        self._blocks = collections.deque()
+        self._written = False
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def write(self, b):
+        if self.closed:
+            raise ValueError('I/O operation on closed file')
+        with memoryview(b) as view, view.cast('B') as data:
+            self._block += data
+            self._position += len(data)
+            written = len(data)
+        start = 0
+        with memoryview(self._block) as view:
+            while len(view) - start >= self._block_size:
+                self._submit(bytes(view[start:start + self._block_size]))
+                start += self._block_size
+        del self._block[:start]
+        return written
+
+    def _submit(self, block):
+        while len(self._blocks) >= self._max_blocks:
+            self._file_obj.write(self._blocks.popleft().result())
+        self._blocks.append(self._executor.submit(_compress_block, self._ext, block, self._compresslevel))
+        self._written = True
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            if self._block or not self._written:
+                self._submit(bytes(self._block))
+                self._block = bytearray()
+            while self._blocks:
+                self._file_obj.write(self._blocks.popleft().result())
+        finally:
+            for future in self._blocks:
+                future.cancel()
+            self._executor.shutdown(wait=True)
+            super().close()
+        self._file_obj.close()
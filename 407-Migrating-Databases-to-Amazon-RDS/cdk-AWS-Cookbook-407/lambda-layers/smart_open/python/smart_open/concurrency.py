@@ -12,6 +12,7 @@ The main entry point is :func:`create_pool`.
 """
 
 import contextlib
+import functools
 import logging
 import warnings
 
@@ -40,37 +41,82 @@ except ImportError:
 
 class DummyPool(object):
     """A class that mimics multiprocessing.pool.Pool for our purposes."""
-    def imap_unordered(self, function, items):
-        return map(function, items)
+    def imap_unordered(self, function, items, discard=None):
+        return (function(item) for item in items)
 
     def terminate(self):
         pass
 
 
+def _discard_result(discard, future):
+    if not future.cancelled() and future.exception() is None:
+        discard(future.result())
+
+
 class ConcurrentFuturesPool(object):
-    """A class that mimics multiprocessing.pool.Pool but uses concurrent futures instead of processes."""
-    def __init__(self, max_workers):
+    """A class that mimics multiprocessing.pool.Pool but uses concurrent futures instead of processes.
+
+    At most max_in_flight items (default: twice the number of workers) are
+    submitted and not yet yielded at any time, so that the items and their
+    results are taken and kept only as fast as the results are consumed."""
+    def __init__(self, max_workers, max_in_flight=None):
         self.executor = concurrent.futures.ThreadPoolExecutor(max_workers)
+        if max_in_flight is None:
+            max_in_flight = 2 * max_workers
+        self.max_in_flight = max(1, max_in_flight)
+
+    def imap_unordered(self, function, items, discard=None):
+        """Yield the results of function over items, as they complete.
 
-    def imap_unordered(self, function, items):
-        futures = [self.executor.submit(function, item) for item in items]
-        for future in concurrent.futures.as_completed(futures):
-            yield future.result()
+        If we are stopped early, the items not started yet are cancelled,
+        and discard, if given, is called with each result that was not
+        yielded, now or once its item is done."""
+        pending = set()
+        done = []
+        try:
+            for item in items:
+                pending.add(self.executor.submit(function, item))
+                if len(pending) >= self.max_in_flight:
+                    done, pending = concurrent.futures.wait(
+                        pending, return_when=concurrent.futures.FIRST_COMPLETED,
+                    )
+                    done = list(done)
+                    while done:
+                        yield done.pop().result()
+            while pending:
+                done, pending = concurrent.futures.wait(
+                    pending, return_when=concurrent.futures.FIRST_COMPLETED,
+                )
+                done = list(done)
+                while done:
+                    yield done.pop().result()
+        finally:
+            #
+            # Do not start the items left if we are stopped early, and let
+            # the caller release the results we will not yield.
+            #
+            for future in list(pending) + done:
+                if not future.cancel() and discard is not None:
+                    future.add_done_callback(functools.partial(_discard_result, discard))
 
     def terminate(self):
         self.executor.shutdown(wait=True)
 
 
 @contextlib.contextmanager
-def create_pool(processes=1):
-    if _MULTIPROCESSING and processes:
+def create_pool(processes=1, threads=False, max_in_flight=None):
+    """Create a pool of processes workers, or of threads if threads is True
+    or multiprocessing is unavailable.  max_in_flight only applies to threads."""
+    if _MULTIPROCESSING and processes and not threads:
         logger.info("creating multiprocessing pool with %i workers", processes)
         pool = multiprocessing.pool.Pool(processes=processes)
     elif _CONCURRENT_FUTURES and processes:
         logger.info("creating concurrent futures pool with %i workers", processes)
-        pool = ConcurrentFuturesPool(max_workers=processes)
+        pool = ConcurrentFuturesPool(max_workers=processes, max_in_flight=max_in_flight)
     else:
         logger.info("creating dummy pool")
         pool = DummyPool()
-    yield pool
-    pool.terminate()
+    try:
+        yield pool
+    finally:
+        pool.terminate()
@@ -18,6 +18,7 @@ try:
 except ImportError:
     MISSING_DEPS = True
 
+import smart_open.bufferpool
 import smart_open.bytebuffer
 import smart_open.utils
 
@@ -112,6 +113,7 @@ def open(
         buffer_size=DEFAULT_BUFFER_SIZE,
         min_part_size=_MIN_MIN_PART_SIZE,
         client=None,  # type: google.cloud.storage.Client
+        buffer_pool=None,
         ):
     """Open an GCS blob for reading or writing.
 
@@ -129,6 +131,9 @@ def open(
         The minimum part size for multipart uploads.  For writing only.
     client: google.cloud.storage.Client, optional
         The GCS client to use when working with google-cloud-storage.
+    buffer_pool: smart_open.bufferpool.BufferPool, optional
+        The pool to take the buffer of the parts from.  Defaults to
+        `smart_open.bufferpool.DEFAULT_POOL`.  For writing only.
 
     """
     if mode == constants.READ_BINARY:
@@ -145,6 +150,7 @@ def open(
             blob_id,
             min_part_size=min_part_size,
             client=client,
+            buffer_pool=buffer_pool,
         )
     else:
         raise NotImplementedError('GCS support for mode %r not implemented' % mode)
@@ -396,6 +402,7 @@ class Writer(io.BufferedIOBase):
             blob,
             min_part_size=_DEFAULT_MIN_PART_SIZE,
             client=None,  # type: google.cloud.storage.Client
+            buffer_pool=None,
     ):
         if client is None:
             client = google.cloud.storage.Client()
@@ -408,7 +415,10 @@ class Writer(io.BufferedIOBase):
         self._total_size = 0
         self._total_parts = 0
         self._bytes_uploaded = 0
-        self._current_part = io.BytesIO()
+        if buffer_pool is None:
+            buffer_pool = smart_open.bufferpool.DEFAULT_POOL
+        self._pool = buffer_pool
+        self._current_part = self._pool.acquire()
 
         self._session = google.auth.transport.requests.AuthorizedSession(client._credentials)
 
@@ -431,11 +441,14 @@ class Writer(io.BufferedIOBase):
     def close(self):
         logger.debug("closing")
         if not self.closed:
-            if self._total_size == 0:  # empty files
-                self._upload_empty_part()
-            else:
-                self._upload_part(is_last=True)
-            self._client = None
+            try:
+                if self._total_size == 0:  # empty files
+                    self._upload_empty_part()
+                else:
+                    self._upload_part(is_last=True)
+                self._client = None
+            finally:
+                self._release_buffer()
         logger.debug("successfully closed")
 
     @property
@@ -485,6 +498,7 @@ class Writer(io.BufferedIOBase):
         # https://cloud.google.com/storage/docs/xml-api/resumable-upload#example_cancelling_an_upload
         #
         self._session.delete(self._resumable_upload_url)
+        self._release_buffer()
 
     #
     # Internal methods.
@@ -524,12 +538,16 @@ class Writer(io.BufferedIOBase):
             "uploading part #%i, %i bytes (total %.3fGB) headers %r",
             part_num, content_length, range_stop / 1024.0 ** 3, headers,
         )
-        self._current_part.seek(0)
-        response = self._session.put(
-            self._resumable_upload_url,
-            data=self._current_part.read(content_length),
-            headers=headers,
-        )
+        #
+        # A view, unlike a file-like object, is sent whole again when the
+        # session retries the request after refreshing its credentials.
+        #
+        with self._current_part.view(content_length) as data:
+            response = self._session.put(
+                self._resumable_upload_url,
+                data=data,
+                headers=headers,
+            )
 
         if is_last:
             expected = _UPLOAD_COMPLETE_STATUS_CODES
@@ -543,10 +561,14 @@ class Writer(io.BufferedIOBase):
         self._bytes_uploaded += content_length
 
         #
-        # For the last part, the below _current_part handling is a NOOP.
+        # Keep the bytes we could not upload yet for the next part.
         #
-        self._current_part = io.BytesIO(self._current_part.read())
-        self._current_part.seek(0, io.SEEK_END)
+        self._current_part.discard(content_length)
+
+    def _release_buffer(self):
+        if self._current_part is not None:
+            self._pool.release(self._current_part)
+            self._current_part = None
 
     def _upload_empty_part(self):
         logger.debug("creating empty file")
@@ -7,9 +7,13 @@
 #
 """Implements file-like objects for reading and writing from/to AWS S3."""
 
+import collections
+import concurrent.futures
+import contextlib
 import io
 import functools
 import logging
+import threading
 import time
 
 try:
@@ -19,6 +23,7 @@ try:
 except ImportError:
     MISSING_DEPS = True
 
+import smart_open.bufferpool
 import smart_open.bytebuffer
 import smart_open.concurrency
 import smart_open.utils
@@ -38,6 +43,9 @@ DEFAULT_HOST = 's3.amazonaws.com'
 
 DEFAULT_BUFFER_SIZE = 128 * 1024
 
+DEFAULT_READ_AHEAD_PART_SIZE = 8 * 1024**2
+"""Default size of the byte ranges fetched concurrently when reading ahead"""
+
 URI_EXAMPLES = (
     's3://my_bucket/my_key',
     's3://my_key:my_secret@my_bucket/my_key',
@@ -185,6 +193,11 @@ def open(
     singlepart_upload_kwargs=None,
     object_kwargs=None,
     defer_seek=False,
+    read_ahead=0,
+    read_ahead_part_size=DEFAULT_READ_AHEAD_PART_SIZE,
+    read_ahead_window=None,
+    upload_workers=0,
+    buffer_pool=None,
 ):
     """Open an S3 object for reading or writing.
 
@@ -222,6 +235,17 @@ def open(
         to `False`, S3 upload will use the S3 Single-Part Upload API, which
         is more ideal for small file sizes.
         For writing only.
+    upload_workers: int, optional
+        Default: `0`
+        The number of parts of a multipart upload to upload concurrently, in
+        the background, while writing continues.  Writing blocks while that
+        many parts are being uploaded.  If set to `0`, each part is uploaded
+        by write() as soon as it is full.
+        For writing only.
+    buffer_pool: smart_open.bufferpool.BufferPool, optional
+        The pool to take the buffers of the parts of a multipart upload from.
+        Defaults to `smart_open.bufferpool.DEFAULT_POOL`.
+        For writing only.
     version_id: str, optional
         Version of the object, used when reading object.
         If None, will fetch the most recent version.
@@ -233,6 +257,24 @@ def open(
         If set to `True` on a file opened for reading, GetObject will not be
         called until the first seek() or read().
         Avoids redundant API queries when seeking before reading.
+    read_ahead: int, optional
+        Default: `0`
+        The number of byte ranges of the object to download concurrently
+        ahead of the reader, each with its own GET request.  If set to `0`,
+        the object is read from a single streaming GET request.
+        boto3 keeps at most 10 connections per client by default, pass a
+        botocore Config with a larger `max_pool_connections` in
+        resource_kwargs to read further ahead.
+        The downloading threads stop when the file is closed, or else when
+        it is garbage collected, so close files read ahead when done.
+        For reading only.
+    read_ahead_part_size: int, optional
+        The size of the byte ranges downloaded when reading ahead.
+        For reading only.
+    read_ahead_window: int, optional
+        The maximum number of bytes downloaded, or being downloaded, ahead of
+        the range being read.  Defaults to `read_ahead * read_ahead_part_size`.
+        For reading only.
     """
     logger.debug('%r', locals())
     if mode not in constants.BINARY_MODES:
@@ -252,6 +294,9 @@ def open(
             resource_kwargs=resource_kwargs,
             object_kwargs=object_kwargs,
             defer_seek=defer_seek,
+            read_ahead=read_ahead,
+            read_ahead_part_size=read_ahead_part_size,
+            read_ahead_window=read_ahead_window,
         )
     elif mode == constants.WRITE_BINARY:
         if multipart_upload:
@@ -262,6 +307,8 @@ def open(
                 session=session,
                 upload_kwargs=multipart_upload_kwargs,
                 resource_kwargs=resource_kwargs,
+                upload_workers=upload_workers,
+                buffer_pool=buffer_pool,
             )
         else:
             fileobj = SinglepartWriter(
@@ -426,6 +473,204 @@ class _SeekableRawReader(object):
         self._position += len(binary)
         return binary
 
+    def close(self):
+        """Close the connection with the remote peer, if any."""
+        if self._body is not None:
+            self._body.close()
+            self._body = None
+
+
+class _ReadAheadRawReader(object):
+    """Read an S3 object with concurrent ranged GET requests.
+
+    The object is split into parts of part_size bytes.  The parts after the
+    one being read are downloaded by a pool of threads, and handed out in
+    order.  At most window bytes are downloaded, or being downloaded, ahead
+    of the part being read.
+
+    This class is internal to the S3 submodule.
+    """
+
+    def __init__(
+        self,
+        s3_object,
+        version_id=None,
+        object_kwargs=None,
+        workers=1,
+        part_size=DEFAULT_READ_AHEAD_PART_SIZE,
+        window=None,
+    ):
+        if part_size < 1:
+            raise ValueError('part_size must be positive, got %r' % part_size)
+        if window is None:
+            window = workers * part_size
+
+        self._object = s3_object
+        self._content_length = None
+        self._version_id = version_id
+        self._position = 0
+        self._object_kwargs = object_kwargs if object_kwargs else {}
+        self._workers = workers
+        self._part_size = part_size
+        self._max_parts = max(1, window // part_size)
+        self._executor = None
+
+        #
+        # The part being read, and the start, stop and future of the parts
+        # being downloaded after it, in order.
+        #
+        self._part = b''
+        self._part_start = 0
+        self._parts = collections.deque()
+        self._next_start = 0
+
+    def seek(self, offset, whence=constants.WHENCE_START):
+        """Seek to the specified position.
+
+        :param int offset: The offset in bytes.
+        :param int whence: Where the offset is from.
+
+        :returns: the position after seeking.
+        :rtype: int
+        """
+        if whence not in constants.WHENCE_CHOICES:
+            raise ValueError('invalid whence, expected one of %r' % constants.WHENCE_CHOICES)
+
+        if whence == constants.WHENCE_START:
+            position = max(0, offset)
+        elif whence == constants.WHENCE_CURRENT:
+            position = max(0, offset + self._position)
+        else:
+            if self._content_length is None:
+                # The last part tells us the length, and likely holds the position.
+                self._open_part(stop=self._part_size)
+            position = max(0, self._content_length - max(0, -offset))
+
+        if self._content_length is None:
+            self._open_part(start=position)
+        self._position = min(position, self._content_length)
+        self._discard_parts()
+        self._schedule()
+        return self._position
+
+    def read(self, size=-1):
+        """Read from the parts downloaded ahead, in order."""
+        if self._content_length is None:
+            # This is necessary for the very first read() after __init__().
+            self._open_part(start=self._position)
+
+        pieces = []
+        while self._position < self._content_length and size != 0:
+            offset = self._position - self._part_start
+            if offset >= len(self._part):
+                self._next_part()
+                offset = self._position - self._part_start
+            stop = len(self._part) if size < 0 else min(len(self._part), offset + size)
+            pieces.append(memoryview(self._part)[offset:stop])
+            self._position += stop - offset
+            if size > 0:
+                size -= stop - offset
+        return b''.join(pieces)
+
+    def close(self):
+        """Cancel the downloads in progress."""
+        self._cancel_parts()
+        self._part = b''
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def _open_part(self, start=None, stop=None):
+        """Download the part at start, or the last stop bytes of the object,
+        to learn the length of the object.
+
+        Set self._position to self._content_length if start is past end of file.
+        """
+        if start is None:
+            range_string = smart_open.utils.make_range_string(stop=stop)
+        else:
+            range_string = smart_open.utils.make_range_string(start, start + self._part_size - 1)
+        logger.debug('range_string: %r', range_string)
+
+        try:
+            response, body = self._download(range_string)
+        except IOError as ioe:
+            # Handle requested content range exceeding content size.
+            error_response = _unwrap_ioerror(ioe)
+            if error_response is None or error_response.get('Code') != _OUT_OF_RANGE:
+                raise
+            self._position = self._content_length = int(error_response['ActualObjectSize'])
+            self._part, self._part_start = b'', self._content_length
+        else:
+            units, start, stop, length = smart_open.utils.parse_content_range(response['ContentRange'])
+            self._content_length = length
+            self._part, self._part_start = body, start
+            etag = response.get('ETag')
+            if etag and not ('IfMatch' in self._object_kwargs or self._version_id):
+                #
+                # Make sure the other parts are of the same object, should it
+                # be overwritten while we read it.
+                #
+                self._object_kwargs = dict(self._object_kwargs, IfMatch=etag)
+        self._next_start = self._part_start + len(self._part)
+        self._schedule()
+
+    def _discard_parts(self):
+        """Drop the parts before self._position, or all of them if
+        self._position is not in the parts we have."""
+        if self._part_start <= self._position < self._part_start + len(self._part):
+            return
+        self._part, self._part_start = b'', self._position
+        while self._parts and self._parts[0][1] < self._position:
+            self._parts.popleft()[2].cancel()
+        if self._parts and self._parts[0][0] > self._position:
+            self._cancel_parts()
+        if not self._parts:
+            self._next_start = self._position
+
+    def _cancel_parts(self):
+        for _, _, future in self._parts:
+            future.cancel()
+        self._parts.clear()
+
+    def _next_part(self):
+        """Make the next part the part being read."""
+        self._schedule()
+        start, stop, future = self._parts.popleft()
+        self._part, self._part_start = future.result(), start
+        self._schedule()
+
+    def _schedule(self):
+        """Start downloading the parts after the ones being downloaded."""
+        while len(self._parts) < self._max_parts and self._next_start < self._content_length:
+            if self._executor is None:
+                self._executor = concurrent.futures.ThreadPoolExecutor(self._workers)
+            start = self._next_start
+            stop = min(start + self._part_size, self._content_length) - 1
+            range_string = smart_open.utils.make_range_string(start, stop)
+            future = self._executor.submit(self._download_body, range_string)
+            self._parts.append((start, stop, future))
+            self._next_start = stop + 1
+
+    def _download_body(self, range_string):
+        return self._download(range_string)[1]
+
+    def _download(self, range_string):
+        """Download a range of the object, return the response and its body."""
+        for attempt in range(2):
+            response = _get(
+                self._object,
+                version=self._version_id,
+                Range=range_string,
+                **self._object_kwargs
+            )
+            try:
+                return response, response['Body'].read()
+            except botocore.exceptions.IncompleteReadError:
+                # The connection was closed by the remote peer.
+                if attempt:
+                    raise
+
 
 def _initialize_boto3(rw, session, resource, resource_kwargs):
     """Created the required objects for accessing S3.  Ideally, they have
@@ -477,7 +722,12 @@ class Reader(io.BufferedIOBase):
         resource_kwargs=None,
         object_kwargs=None,
         defer_seek=False,
+        read_ahead=0,
+        read_ahead_part_size=DEFAULT_READ_AHEAD_PART_SIZE,
+        read_ahead_window=None,
     ):
+        if read_ahead < 0:
+            raise ValueError('read_ahead must not be negative, got %r' % read_ahead)
         self._buffer_size = buffer_size
 
         if resource_kwargs is None:
@@ -491,11 +741,21 @@ class Reader(io.BufferedIOBase):
         self._object = self._resource.Object(bucket, key)
         self._version_id = version_id
 
-        self._raw_reader = _SeekableRawReader(
-            self._object,
-            self._version_id,
-            self._object_kwargs,
-        )
+        if read_ahead:
+            self._raw_reader = _ReadAheadRawReader(
+                self._object,
+                self._version_id,
+                self._object_kwargs,
+                workers=read_ahead,
+                part_size=read_ahead_part_size,
+                window=read_ahead_window,
+            )
+        else:
+            self._raw_reader = _SeekableRawReader(
+                self._object,
+                self._version_id,
+                self._object_kwargs,
+            )
         self._current_pos = 0
         self._buffer = smart_open.bytebuffer.ByteBuffer(buffer_size)
         self._eof = False
@@ -517,6 +777,7 @@ class Reader(io.BufferedIOBase):
         """Flush and close this stream."""
         logger.debug("close: called")
         self._object = None
+        self._raw_reader.close()
 
     def readable(self):
         """Return True if the stream can be read from."""
@@ -702,6 +963,8 @@ class MultipartWriter(io.BufferedIOBase):
         resource=None,
         resource_kwargs=None,
         upload_kwargs=None,
+        upload_workers=0,
+        buffer_pool=None,
     ):
         if min_part_size < MIN_MIN_PART_SIZE:
             logger.warning("S3 requires minimum part size >= 5MB; \
@@ -726,11 +989,21 @@ multipart upload may fail")
                 )
             ) from error
 
-        self._buf = io.BytesIO()
+        if buffer_pool is None:
+            buffer_pool = smart_open.bufferpool.DEFAULT_POOL
+        self._pool = buffer_pool
+        self._buf = self._pool.acquire()
         self._total_bytes = 0
         self._total_parts = 0
         self._parts = []
 
+        #
+        # Futures of the parts being uploaded in the background.
+        #
+        self._upload_workers = upload_workers
+        self._uploads = []
+        self._executor = None
+
         #
         # This member is part of the io.BufferedIOBase interface.
         #
@@ -744,8 +1017,11 @@ multipart upload may fail")
     #
     def close(self):
         logger.debug("closing")
-        if self._buf.tell():
+        if self._buf is not None and self._buf.tell():
             self._upload_next_part()
+        self._wait_for_uploads()
+        self._shutdown_uploads()
+        self._parts.sort(key=lambda part: part['PartNumber'])
 
         if self._total_bytes and self._mp:
             partial = functools.partial(self._mp.complete, MultipartUpload={'Parts': self._parts})
@@ -764,6 +1040,7 @@ multipart upload may fail")
             self._mp.abort()
             self._object.put(Body=b'')
         self._mp = None
+        self._release_buffer()
         logger.debug("successfully closed")
 
     @property
@@ -804,8 +1081,10 @@ multipart upload may fail")
     def terminate(self):
         """Cancel the underlying multipart upload."""
         assert self._mp, "no multipart upload in progress"
+        self._shutdown_uploads()
         self._mp.abort()
         self._mp = None
+        self._release_buffer()
 
     def to_boto3(self):
         """Create an **independent** `boto3.s3.Object` instance that points to
@@ -825,29 +1104,65 @@ multipart upload may fail")
         part_num = self._total_parts + 1
         logger.info("uploading part #%i, %i bytes (total %.3fGB)",
                     part_num, self._buf.tell(), self._total_bytes / 1024.0 ** 3)
-        self._buf.seek(0)
         part = self._mp.Part(part_num)
 
-        #
-        # Network problems in the middle of an upload are particularly
-        # troublesome.  We don't want to abort the entire upload just because
-        # of a temporary connection problem, so this part needs to be
-        # especially robust.
-        #
-        upload = _retry_if_failed(functools.partial(part.upload, Body=self._buf))
-
-        self._parts.append({'ETag': upload['ETag'], 'PartNumber': part_num})
-        logger.debug("upload of part #%i finished" % part_num)
+        if self._upload_workers:
+            self._wait_for_uploads(self._upload_workers - 1)
+            if self._executor is None:
+                self._executor = concurrent.futures.ThreadPoolExecutor(self._upload_workers)
+            future = self._executor.submit(_upload_part, part, part_num, self._buf)
+            future.add_done_callback(functools.partial(_release_part, self._pool, self._buf))
+            self._uploads.append(future)
+            self._buf = self._pool.acquire()
+        else:
+            self._parts.append(_upload_part(part, part_num, self._buf))
+            self._buf.empty()
 
         self._total_parts += 1
-        self._buf = io.BytesIO()
+
+    def _wait_for_uploads(self, limit=0):
+        """Wait until at most limit parts are being uploaded in the background.
+
+        If the upload of a part failed, abort the multipart upload and raise
+        the error.
+        """
+        while self._uploads:
+            timeout = 0 if len(self._uploads) <= limit else None
+            done, pending = concurrent.futures.wait(
+                self._uploads, timeout=timeout, return_when=concurrent.futures.FIRST_COMPLETED,
+            )
+            if not done:
+                break
+            self._uploads = list(pending)
+            for future in done:
+                try:
+                    self._parts.append(future.result())
+                except BaseException:
+                    logger.error("upload of a part failed, aborting the multipart upload")
+                    self.terminate()
+                    raise
+
+    def _shutdown_uploads(self):
+        """Cancel the parts waiting to be uploaded, and wait for the others."""
+        for future in self._uploads:
+            future.cancel()
+        self._uploads = []
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def _release_buffer(self):
+        if self._buf is not None:
+            self._pool.release(self._buf)
+            self._buf = None
 
     def __enter__(self):
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         if exc_type is not None:
-            self.terminate()
+            if not self.closed:
+                self.terminate()
         else:
             self.close()
 
@@ -991,6 +1306,25 @@ class SinglepartWriter(io.BufferedIOBase):
         )
 
 
+def _upload_part(part, part_num, buf):
+    """Upload the part in buf, return its entry in the list of parts to
+    complete the multipart upload with."""
+    #
+    # Network problems in the middle of an upload are particularly
+    # troublesome.  We don't want to abort the entire upload just because
+    # of a temporary connection problem, so this part needs to be
+    # especially robust.
+    #
+    with buf.reader() as body:
+        upload = _retry_if_failed(functools.partial(part.upload, Body=body))
+    logger.debug("upload of part #%i finished" % part_num)
+    return {'ETag': upload['ETag'], 'PartNumber': part_num}
+
+
+def _release_part(pool, buf, future):
+    pool.release(buf)
+
+
 def _retry_if_failed(
         partial,
         attempts=_UPLOAD_ATTEMPTS,
@@ -1082,6 +1416,11 @@ def iter_bucket(
       >>> # limit to 10k files, using 32 parallel workers (default is 16)
       >>> for key, content in iter_bucket(bucket_name, key_limit=10000, workers=32):
       ...     print key, len(content)
+
+    See Also
+    --------
+    :func:`stream_bucket` goes over large objects or many keys without
+    keeping whole objects in memory.
     """
     if accept_key is None:
         accept_key = _accept_all
@@ -1124,6 +1463,176 @@ def iter_bucket(
     logger.info("processed %i keys, total size %i" % (key_no + 1, total_size))
 
 
+def stream_bucket(
+        bucket_name,
+        prefix='',
+        accept_key=None,
+        key_limit=None,
+        workers=16,
+        process=None,
+        max_in_flight=None,
+        buffer_size=DEFAULT_BUFFER_SIZE,
+        retries=3,
+        metrics=None,
+        **session_kwargs):
+    """
+    Iterate over all S3 objects under `s3://bucket_name/prefix`, streaming
+    their contents instead of downloading them whole.
+
+    Parameters
+    ----------
+    bucket_name: str
+        The name of the bucket.
+    prefix: str, optional
+        Limits the iteration to keys starting with the prefix.
+    accept_key: callable, optional
+        This is a function that accepts a key name (unicode string) and
+        returns True/False, signalling whether the given key should be opened.
+        The default behavior is to accept all keys.
+    key_limit: int, optional
+        If specified, the iterator will stop after yielding this many results.
+    workers: int, optional
+        The number of threads to open, and process, the keys with.
+    process: callable, optional
+        A function that accepts a key name and a binary file-like object
+        reading the key, and returns a result to yield instead of the
+        file-like object.  It runs in the worker threads.
+    max_in_flight: int, optional
+        The maximum number of keys opened and not yet yielded.
+        Defaults to twice the number of workers.
+    buffer_size: int, optional
+        The buffer size of the file-like objects.
+    retries: int, optional
+        The number of times to retry opening a key.
+    metrics: dict, optional
+        Updated as the iteration goes with the number of `keys` and `bytes`
+        processed, the `seconds` elapsed, and `keys_per_second` and
+        `mb_per_second`.
+    session_kwargs: dict, optional
+        Keyword arguments to pass when creating a new session.
+        For a list of available names and values, see:
+        https://boto3.amazonaws.com/v1/documentation/api/latest/reference/core/session.html#boto3.session.Session
+
+    Yields
+    ------
+    str
+        The full key name (does not include the bucket name).
+    object
+        A binary file-like object reading the key, or the result of process.
+
+    Notes
+    -----
+    The workers open the keys and fill the first buffer of each, so small
+    objects are downloaded in parallel, and larger ones are read on from the
+    yielded file-like object.  The file-like object is closed when the next
+    key is yielded, so read it before moving on.  At most max_in_flight
+    keys are held at any time, so memory stays bounded by about
+    max_in_flight * buffer_size, whatever the size and number of the keys.
+
+    To reduce each object to a small result, like a count or a checksum,
+    pass process: the workers then read the objects in parallel.
+
+    Examples
+    --------
+
+      >>> # count the lines of all JSON files under "mybucket/foo/"
+      >>> for key, lines in stream_bucket(
+      ...         bucket_name, prefix='foo/',
+      ...         accept_key=lambda key: key.endswith('.json'),
+      ...         process=lambda key, fin: sum(1 for line in fin)):
+      ...     print(key, lines)
+
+      >>> # parse the objects one by one, as they arrive
+      >>> for key, fin in stream_bucket(bucket_name, workers=32):
+      ...     records = json.load(fin)
+    """
+    if accept_key is None:
+        accept_key = _accept_all
+
+    try:
+        bucket_name = bucket_name.name
+    except AttributeError:
+        pass
+
+    if metrics is None:
+        metrics = {}
+    metrics.update(keys=0, bytes=0, seconds=0.0, keys_per_second=0.0, mb_per_second=0.0)
+
+    key_iterator = _list_bucket(
+        bucket_name,
+        prefix=prefix,
+        accept_key=accept_key,
+        **session_kwargs)
+    #
+    # The resources of the readers we closed, for the workers to open the
+    # following keys with.  Creating a resource for each key costs more CPU
+    # than the rest of opening it.
+    #
+    free_resources = []
+    stream_key = functools.partial(
+        _stream_key,
+        bucket_name=bucket_name,
+        process=process,
+        buffer_size=buffer_size,
+        retries=retries,
+        local=threading.local(),
+        free_resources=free_resources,
+        **session_kwargs)
+
+    discard = None
+    if process is None:
+        #
+        # Close the readers opened for the keys we will not yield, should
+        # we be stopped early.
+        #
+        def discard(result):
+            _close_reader(result[1], free_resources)
+
+    start = time.time()
+    reader = None
+    try:
+        with smart_open.concurrency.create_pool(
+                processes=workers, threads=True, max_in_flight=max_in_flight) as pool:
+            results = pool.imap_unordered(stream_key, key_iterator, discard=discard)
+            with contextlib.closing(results):
+                for key, value, size in results:
+                    if process is None:
+                        reader = value
+                    yield key, value
+                    if reader is not None:
+                        size = reader.tell()
+                        _close_reader(reader, free_resources)
+                        reader = None
+
+                    metrics['keys'] += 1
+                    metrics['bytes'] += size
+                    metrics['seconds'] = elapsed = time.time() - start
+                    if elapsed > 0:
+                        metrics['keys_per_second'] = metrics['keys'] / elapsed
+                        metrics['mb_per_second'] = metrics['bytes'] / elapsed / 1024.0 ** 2
+                    if metrics['keys'] % 1000 == 0:
+                        logger.info(
+                            "processed %i keys (%.1fMB), %.1f keys/s, %.1fMB/s",
+                            metrics['keys'], metrics['bytes'] / 1024.0 ** 2,
+                            metrics['keys_per_second'], metrics['mb_per_second'],
+                        )
+
+                    if key_limit is not None and metrics['keys'] >= key_limit:
+                        break
+    finally:
+        if reader is not None:
+            _close_reader(reader, free_resources)
+    logger.info(
+        "processed %i keys, total size %i, %.1f keys/s, %.1fMB/s",
+        metrics['keys'], metrics['bytes'], metrics['keys_per_second'], metrics['mb_per_second'],
+    )
+
+
+def _close_reader(reader, free_resources):
+    reader.close()
+    free_resources.append(reader._resource)
+
+
 def _list_bucket(
         bucket_name,
         prefix='',
@@ -1190,3 +1699,70 @@ def _download_fileobj(bucket, key_name):
     buf = io.BytesIO()
     bucket.download_fileobj(key_name, buf)
     return buf.getvalue()
+
+
+def _stream_key(
+        key_name,
+        bucket_name=None,
+        process=None,
+        buffer_size=DEFAULT_BUFFER_SIZE,
+        retries=3,
+        local=None,
+        free_resources=None,
+        **session_kwargs):
+    """Open a key for stream_bucket, and process it if we were given process.
+
+    Returns the key name, the reader or the result of process, and the number
+    of bytes process read."""
+    if bucket_name is None:
+        raise ValueError('bucket_name may not be None')
+
+    #
+    # Sessions and resources are not thread-safe, so each worker thread gets
+    # its own session, and keeps it for the following keys.  The readers we
+    # yield are read from the consumer's thread while this one opens other
+    # keys, so each of them gets a resource no other thread uses until the
+    # reader is closed: one from free_resources, or else a new one.  The
+    # readers we process here share the resource of the thread.
+    #
+    # https://boto3.amazonaws.com/v1/documentation/api/latest/guide/resources.html#multithreading-and-multiprocessing
+    #
+    if local is None:
+        local = threading.local()
+    try:
+        session = local.session
+    except AttributeError:
+        session = local.session = boto3.session.Session(**session_kwargs)
+    if process is None:
+        resource = None
+        if free_resources is not None:
+            try:
+                resource = free_resources.pop()
+            except IndexError:
+                pass
+        if resource is None:
+            resource = session.resource('s3')
+    else:
+        try:
+            resource = local.resource
+        except AttributeError:
+            resource = local.resource = session.resource('s3')
+
+    for x in range(retries + 1):
+        try:
+            reader = Reader(bucket_name, key_name, buffer_size=buffer_size, resource=resource)
+            reader._fill_buffer()
+        except IOError:
+            # Actually fail on last pass through the loop
+            if x == retries:
+                raise
+        else:
+            break
+
+    if process is None:
+        return key_name, reader, 0
+    try:
+        result = process(key_name, reader)
+        return key_name, result, reader.tell()
+    finally:
+        reader.close()
@@ -14,8 +14,10 @@ import time
 import uuid
 import unittest
 from collections import OrderedDict
+from unittest import mock
 
 import smart_open
+import smart_open.bufferpool
 import smart_open.constants
 
 import azure.storage.blob
@@ -72,7 +74,9 @@ class FakeBlobClient(object):
     def set_blob_metadata(self, metadata):
         self.metadata = metadata
 
-    def stage_block(self, block_id, data):
+    def stage_block(self, block_id, data, length=None):
+        if hasattr(data, 'read'):
+            data = data.read(length)
         self._staged_contents[block_id] = data
 
     def upload_blob(self, data, length=None, metadata=None):
@@ -703,3 +707,13 @@ class WriterTest(unittest.TestCase):
         fout.write(text)
         fout.flush()
         fout.close()
+
+    def test_failed_close_releases_buffer(self):
+        pool = smart_open.bufferpool.BufferPool()
+        fout = smart_open.azure.Writer(CONTAINER_NAME, 'key', CLIENT, buffer_pool=pool)
+        fout.write(b'x' * 1000)
+        with mock.patch.object(fout._blob, 'stage_block', side_effect=IOError('lost connection')):
+            with self.assertRaises(IOError):
+                fout.close()
+        self.assertEqual(pool.stats()['used_bytes'], 0)
+        self.assertEqual(pool.stats()['free_buffers'], 1)
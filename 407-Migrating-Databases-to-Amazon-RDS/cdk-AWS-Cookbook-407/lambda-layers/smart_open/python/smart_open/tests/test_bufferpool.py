@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2020 Radim Rehurek <me@radimrehurek.com>
+#
+# This code is distributed under the terms and conditions
+# from the MIT License (MIT).
+#
+import array
+import io
+import unittest
+
+import smart_open.bufferpool
+
+
+class PartBufferTest(unittest.TestCase):
+    def test_write(self):
+        buf = smart_open.bufferpool.PartBuffer()
+        self.assertEqual(buf.write(b'foo'), 3)
+        self.assertEqual(buf.write(bytearray(b' bar')), 4)
+        self.assertEqual(buf.write(memoryview(b' baz')), 4)
+        self.assertEqual(buf.tell(), 11)
+        self.assertEqual(buf.reader().read(), b'foo bar baz')
+
+    def test_write_multibyte_items(self):
+        buf = smart_open.bufferpool.PartBuffer()
+        data = array.array('i', [1, 2, 3])
+        self.assertEqual(buf.write(data), data.itemsize * 3)
+        self.assertEqual(buf.reader().read(), data.tobytes())
+
+    def test_empty_keeps_capacity(self):
+        buf = smart_open.bufferpool.PartBuffer()
+        buf.write(b'x' * 1000)
+        buf.empty()
+        self.assertEqual(buf.tell(), 0)
+        self.assertEqual(buf.capacity, 1000)
+
+        buf.write(b'foo')
+        self.assertEqual(buf.capacity, 1000)
+        self.assertEqual(buf.reader().read(), b'foo')
+
+    def test_discard(self):
+        buf = smart_open.bufferpool.PartBuffer()
+        buf.write(b'foo bar baz')
+        buf.discard(4)
+        self.assertEqual(buf.tell(), 7)
+        self.assertEqual(buf.reader().read(), b'bar baz')
+
+        buf.write(b'!')
+        self.assertEqual(buf.reader().read(), b'bar baz!')
+
+        buf.discard(100)
+        self.assertEqual(buf.tell(), 0)
+
+    def test_reader(self):
+        buf = smart_open.bufferpool.PartBuffer()
+        buf.write(b'foo bar baz')
+        with buf.reader(7) as reader:
+            self.assertEqual(len(reader), 7)
+            self.assertEqual(reader.read(4), b'foo ')
+            self.assertEqual(reader.tell(), 4)
+            self.assertEqual(reader.read(), b'bar')
+            self.assertEqual(reader.read(), b'')
+
+            reader.seek(-3, io.SEEK_END)
+            out = bytearray(10)
+            self.assertEqual(reader.readinto(out), 3)
+            self.assertEqual(out[:3], b'bar')
+
+            reader.seek(0)
+            self.assertEqual(reader.read(100), b'foo bar')
+
+    def test_view(self):
+        buf = smart_open.bufferpool.PartBuffer()
+        buf.write(b'foo bar baz')
+        with buf.view(7) as view:
+            self.assertEqual(bytes(view), b'foo bar')
+            self.assertEqual(bytes(view), b'foo bar')
+        buf.write(b'x' * 1000)
+        self.assertEqual(buf.tell(), 1011)
+
+    def test_write_after_reader_closed(self):
+        buf = smart_open.bufferpool.PartBuffer()
+        buf.write(b'foo')
+        with buf.reader() as reader:
+            reader.read()
+        buf.write(b'x' * 1000)
+        self.assertEqual(buf.tell(), 1003)
+
+
+class BufferPoolTest(unittest.TestCase):
+    def test_reuse(self):
+        pool = smart_open.bufferpool.BufferPool()
+        buf = pool.acquire()
+        buf.write(b'x' * 100)
+        pool.release(buf)
+
+        again = pool.acquire()
+        self.assertIs(again, buf)
+        self.assertEqual(again.tell(), 0)
+
+        stats = pool.stats()
+        self.assertEqual(stats['acquired'], 2)
+        self.assertEqual(stats['reused'], 1)
+        self.assertEqual(stats['reuse_rate'], 0.5)
+        self.assertEqual(stats['used_bytes'], 100)
+        self.assertEqual(stats['free_buffers'], 0)
+
+    def test_max_size(self):
+        pool = smart_open.bufferpool.BufferPool(max_size=150)
+        bufs = [pool.acquire() for _ in range(2)]
+        for buf in bufs:
+            buf.write(b'x' * 100)
+            pool.release(buf)
+
+        stats = pool.stats()
+        self.assertEqual(stats['free_buffers'], 1)
+        self.assertEqual(stats['free_bytes'], 100)
+        self.assertEqual(stats['used_bytes'], 0)
+        self.assertEqual(stats['peak_bytes'], 200)
+
+    def test_clear(self):
+        pool = smart_open.bufferpool.BufferPool()
+        buf = pool.acquire()
+        buf.write(b'x')
+        pool.release(buf)
+        pool.clear()
+        self.assertEqual(pool.stats()['free_buffers'], 0)
+        self.assertIsNot(pool.acquire(), buf)
@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2020 Radim Rehurek <me@radimrehurek.com>
+#
+# This code is distributed under the terms and conditions
+# from the MIT License (MIT).
+#
+import bz2
+import gzip
+import io
+import random
+import unittest
+
+import smart_open.compression
+
+BLOCK_SIZE = 16 * 1024
+
+
+def make_text(num_words=20000):
+    random.seed(42)
+    words = [b'alpha', b'beta', b'gamma', b'delta', b'\n']
+    return b' '.join(random.choice(words) for _ in range(num_words))
+
+
+def make_buffer(initial_value=b''):
+    buf = io.BytesIO(initial_value)
+    buf.close = lambda: None
+    return buf
+
+
+DECOMPRESS = {'.gz': gzip.decompress, '.bz2': bz2.decompress}
+COMPRESS = {'.gz': gzip.compress, '.bz2': bz2.compress}
+
+
+class ParallelTest(unittest.TestCase):
+    def setUp(self):
+        self.text = make_text()
+
+    def compress(self, ext, text, workers=4):
+        handler = smart_open.compression.parallel(ext, workers=workers, block_size=BLOCK_SIZE)
+        buf = make_buffer()
+        with handler(buf, 'wb') as fout:
+            for i in range(0, len(text), 1000):
+                fout.write(text[i:i + 1000])
+        return buf.getvalue()
+
+    def decompress(self, ext, compressed, workers=4):
+        handler = smart_open.compression.parallel(ext, workers=workers, block_size=BLOCK_SIZE)
+        with handler(make_buffer(compressed), 'rb') as fin:
+            return fin.read()
+
+    def test_write(self):
+        """Are the blocks written as members any tool reads back?"""
+        for ext in ('.gz', '.bz2'):
+            compressed = self.compress(ext, self.text)
+            self.assertEqual(DECOMPRESS[ext](compressed), self.text)
+
+    def test_write_empty(self):
+        for ext in ('.gz', '.bz2'):
+            self.assertEqual(DECOMPRESS[ext](self.compress(ext, b'')), b'')
+
+    def test_read_members(self):
+        for ext in ('.gz', '.bz2'):
+            compressed = self.compress(ext, self.text)
+            self.assertEqual(self.decompress(ext, compressed), self.text)
+
+    def test_read_single_member(self):
+        """Are single member files, which we cannot split, read too?"""
+        for ext in ('.gz', '.bz2'):
+            self.assertEqual(self.decompress(ext, COMPRESS[ext](self.text)), self.text)
+
+    def test_read_lines(self):
+        compressed = self.compress('.gz', self.text)
+        handler = smart_open.compression.parallel('.gz', workers=2, block_size=BLOCK_SIZE)
+        with handler(make_buffer(compressed), 'rb') as fin:
+            lines = list(fin)
+            self.assertEqual(fin.tell(), len(self.text))
+        self.assertEqual(lines, self.text.splitlines(True))
+
+    def test_read_magic_in_data(self):
+        """Are the members read right when their data looks like a member start?"""
+        #
+        # Level 0 stores the data as is, magic bytes included.
+        #
+        text = b'\x1f\x8b\x08\x00' * 20000 + self.text
+        members = gzip.compress(text, compresslevel=0) * 3 + gzip.compress(text)
+        self.assertEqual(self.decompress('.gz', members), text * 4)
+
+    def test_read_truncated(self):
+        for ext in ('.gz', '.bz2'):
+            compressed = self.compress(ext, self.text)
+            with self.assertRaises(EOFError):
+                self.decompress(ext, compressed[:-10])
+
+    def test_read_gzip_padding(self):
+        compressed = gzip.compress(b'foo') + b'\x00' * 10 + gzip.compress(b'bar')
+        self.assertEqual(self.decompress('.gz', compressed), b'foobar')
+
+    def test_read_bz2_trailing_garbage(self):
+        compressed = bz2.compress(b'foo') + b'garbage'
+        self.assertEqual(self.decompress('.bz2', compressed), b'foo')
+
+    def test_unsupported(self):
+        with self.assertRaises(ValueError):
+            smart_open.compression.parallel('.xz')
+
+
+class BackgroundTest(unittest.TestCase):
+    def setUp(self):
+        self.text = make_text()
+        handler = smart_open.compression.background(smart_open.compression._handle_gzip, chunk_size=1024)
+        self.fin = handler(make_buffer(gzip.compress(self.text)), 'rb')
+
+    def tearDown(self):
+        self.fin.close()
+
+    def test_read(self):
+        self.assertEqual(self.fin.read(10), self.text[:10])
+        self.assertEqual(self.fin.read(), self.text[10:])
+
+    def test_seek(self):
+        self.fin.read(5000)
+        self.assertEqual(self.fin.seek(100), 100)
+        self.assertEqual(self.fin.read(10), self.text[100:110])
+        self.fin.seek(50000)
+        self.assertEqual(self.fin.tell(), 50000)
+        self.assertEqual(self.fin.read(), self.text[50000:])
+
+    def test_error(self):
+        handler = smart_open.compression.background(smart_open.compression._handle_gzip)
+        with handler(make_buffer(b'not gzip at all'), 'rb') as fin:
+            with self.assertRaises(OSError):
+                fin.read()
+
+    def test_write(self):
+        handler = smart_open.compression.background(smart_open.compression._handle_gzip)
+        buf = make_buffer()
+        with handler(buf, 'wb') as fout:
+            fout.write(self.text)
+        self.assertEqual(gzip.decompress(buf.getvalue()), self.text)
+
+    def test_close(self):
+        buf = io.BytesIO(gzip.compress(self.text))
+        handler = smart_open.compression.background(smart_open.compression._handle_gzip, chunk_size=1024)
+        fin = handler(buf, 'rb')
+        fin.read(10)
+        fin.close()
+        self.assertTrue(buf.closed)
+
+
+class MemberDecoderTest(unittest.TestCase):
+    def setUp(self):
+        self.text = make_text()
+
+    def test_max_length(self):
+        for ext in ('.gz', '.bz2'):
+            compressed = COMPRESS[ext](self.text) * 2
+            decoder = smart_open.compression._MemberDecoder(ext)
+            chunks = [decoder.decompress(compressed, 1000)]
+            while not decoder.needs_input:
+                chunks.append(decoder.decompress(b'', 1000))
+            self.assertTrue(all(len(chunk) <= 1000 for chunk in chunks))
+            self.assertEqual(b''.join(chunks), self.text * 2)
+            self.assertTrue(decoder.at_boundary)
+
+    def test_worker_output_cap(self):
+        """Do the workers give up on segments that decompress to too much?"""
+        for ext in ('.gz', '.bz2'):
+            compressed = COMPRESS[ext](self.text)
+            decompress = smart_open.compression._decompress_members
+            self.assertEqual(decompress(ext, compressed, len(self.text)), self.text)
+            self.assertIsNone(decompress(ext, compressed, len(self.text) - 1))
+
+    def test_single_member_read_in_order(self):
+        """Is a single member file decompressed in order after the first segment?"""
+        text = make_text(200000)
+        executor = smart_open.compression.concurrent.futures.ThreadPoolExecutor(2)
+        reader = smart_open.compression._ParallelReader(
+            make_buffer(gzip.compress(text)), '.gz', executor, 4, BLOCK_SIZE,
+        )
+        with io.BufferedReader(reader) as fin:
+            self.assertEqual(fin.read(), text)
+        self.assertFalse(reader._parallel)
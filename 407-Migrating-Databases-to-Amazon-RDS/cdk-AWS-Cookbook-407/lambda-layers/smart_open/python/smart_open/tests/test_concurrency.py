@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2020 Radim Rehurek <me@radimrehurek.com>
+#
+# This code is distributed under the terms and conditions
+# from the MIT License (MIT).
+#
+import threading
+import unittest
+
+import smart_open.concurrency
+
+
+@unittest.skipIf(not smart_open.concurrency._CONCURRENT_FUTURES, 'concurrent.futures unavailable')
+class ConcurrentFuturesPoolTest(unittest.TestCase):
+    def test_imap_unordered(self):
+        pool = smart_open.concurrency.ConcurrentFuturesPool(max_workers=4)
+        results = list(pool.imap_unordered(lambda x: x * 2, range(100)))
+        pool.terminate()
+        self.assertEqual(sorted(results), [x * 2 for x in range(100)])
+
+    def test_bounded_in_flight(self):
+        """Are the items taken only as fast as the results are consumed?"""
+        taken = []
+
+        def items():
+            for i in range(100):
+                taken.append(i)
+                yield i
+
+        pool = smart_open.concurrency.ConcurrentFuturesPool(max_workers=2, max_in_flight=3)
+        results = pool.imap_unordered(lambda x: x, items())
+        for consumed in range(1, 11):
+            next(results)
+            self.assertLessEqual(len(taken), consumed + 3)
+        results.close()
+        pool.terminate()
+
+    def test_stop_early(self):
+        """Are the items left cancelled when we stop early?"""
+        started = []
+        gate = threading.Event()
+
+        def function(x):
+            started.append(x)
+            gate.wait()
+            return x
+
+        pool = smart_open.concurrency.ConcurrentFuturesPool(max_workers=1, max_in_flight=5)
+        results = pool.imap_unordered(function, range(100))
+        gate.set()
+        next(results)
+        results.close()
+        pool.terminate()
+        self.assertLessEqual(len(started), 5)
+
+    def test_discard_when_stopped_early(self):
+        """Are the results we did not yield given to discard?"""
+        started = []
+        discarded = []
+
+        def function(x):
+            started.append(x)
+            return x
+
+        pool = smart_open.concurrency.ConcurrentFuturesPool(max_workers=2, max_in_flight=5)
+        results = pool.imap_unordered(function, range(100), discard=discarded.append)
+        yielded = [next(results), next(results)]
+        results.close()
+        pool.terminate()
+        self.assertEqual(sorted(yielded + discarded), sorted(started))
+
+    def test_error(self):
+        def function(x):
+            if x == 3:
+                raise ValueError(x)
+            return x
+
+        with smart_open.concurrency.create_pool(processes=2, threads=True) as pool:
+            with self.assertRaises(ValueError):
+                list(pool.imap_unordered(function, range(10)))
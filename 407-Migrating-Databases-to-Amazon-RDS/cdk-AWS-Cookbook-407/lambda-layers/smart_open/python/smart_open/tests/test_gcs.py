@@ -24,6 +24,7 @@ import google.cloud
 import google.api_core.exceptions
 
 import smart_open
+import smart_open.bufferpool
 import smart_open.constants
 
 BUCKET_NAME = 'test-smartopen-{}'.format(uuid.uuid4().hex)
@@ -875,6 +876,36 @@ class WriterTest(unittest.TestCase):
             with smart_open.gcs.open(BUCKET_NAME, 'key', 'rb') as fin:
                 fin.read()
 
+    def test_terminate_releases_buffer(self):
+        pool = smart_open.bufferpool.BufferPool()
+        fout = smart_open.gcs.Writer(BUCKET_NAME, 'key', buffer_pool=pool)
+        fout.write(b'x' * 1000)
+        fout.terminate()
+        self.assertEqual(pool.stats()['used_bytes'], 0)
+        self.assertEqual(pool.stats()['free_buffers'], 1)
+
+    def test_part_sent_again(self):
+        """Is a part sent whole again when its request is retried?"""
+        min_part_size = 256 * 1024
+        test_string = b'0123456789' * (min_part_size // 5)
+        with smart_open.gcs.Writer(BUCKET_NAME, WRITE_BLOB_NAME, min_part_size=min_part_size) as fout:
+            session_put = fout._session.put
+
+            def put(url, data=None, headers=None):
+                #
+                # Like AuthorizedSession, when refreshing its credentials
+                # after a 401, send the same data twice.
+                #
+                if data is not None:
+                    data.read() if hasattr(data, 'read') else bytes(data)
+                return session_put(url, data=data, headers=headers)
+
+            fout._session.put = put
+            fout.write(test_string)
+
+        with smart_open.gcs.open(BUCKET_NAME, WRITE_BLOB_NAME, "rb") as fin:
+            self.assertEqual(fin.read(), test_string)
+
 
 @maybe_mock_gcs
 class OpenTest(unittest.TestCase):
@@ -6,10 +6,13 @@
 # from the MIT License (MIT).
 #
 from collections import defaultdict
+import concurrent.futures
+import gc
 import gzip
 import io
 import logging
 import os
+import threading
 import time
 import unittest
 import warnings
@@ -23,6 +26,7 @@ import mock
 import moto
 
 import smart_open
+import smart_open.bufferpool
 import smart_open.s3
 
 # To reduce spurious errors due to S3's eventually-consistent behavior
@@ -392,6 +396,122 @@ class SeekableBufferedInputBaseTest(BaseTest):
         self.assertEqual(data, b'')
 
 
+@moto.mock_s3
+class ReadAheadTest(BaseTest):
+    content = u"hello wořld\nhow are you?".encode('utf8')
+
+    def setUp(self):
+        ignore_resource_warnings()
+        put_to_bucket(contents=self.content)
+        super().setUp()
+
+    def tearDown(self):
+        cleanup_bucket()
+
+    def open(self, **kwargs):
+        kwargs.setdefault('read_ahead', 2)
+        kwargs.setdefault('read_ahead_part_size', 4)
+        return smart_open.s3.Reader(BUCKET_NAME, KEY_NAME, **kwargs)
+
+    def test_read(self):
+        # one request per part of 4 bytes
+        with self.assertApiCalls(GetObject=7):
+            with self.open() as fin:
+                self.assertEqual(self.content[:6], fin.read(6))
+                self.assertEqual(self.content[6:14], fin.read(8))
+                self.assertEqual(self.content[14:], fin.read())
+
+    def test_readline(self):
+        with self.open(buffer_size=3) as fin:
+            actual = list(fin)
+        self.assertEqual(actual, self.content.splitlines(True))
+
+    def test_readinto(self):
+        buf = bytearray(10)
+        with self.open() as fin:
+            self.assertEqual(fin.readinto(buf), 10)
+            self.assertEqual(bytes(buf), self.content[:10])
+
+    def test_window(self):
+        with self.open(buffer_size=1, read_ahead_window=12) as fin:
+            fin.read(1)
+            self.assertEqual(len(fin._raw_reader._parts), 3)
+            self.assertEqual(fin.read(), self.content[1:])
+
+    def test_seek_within_parts(self):
+        with self.open(buffer_size=4, read_ahead_window=100) as fin:
+            fin.read(6)
+            concurrent.futures.wait([future for _, _, future in fin._raw_reader._parts])
+            with self.assertApiCalls():
+                fin.seek(14)
+                self.assertEqual(fin.read(4), self.content[14:18])
+
+    def test_seek_back(self):
+        with self.open() as fin:
+            self.assertEqual(fin.read(14), self.content[:14])
+            fin.seek(0)
+            self.assertEqual(fin.read(), self.content)
+            seek = fin.seek(-5, whence=smart_open.constants.WHENCE_CURRENT)
+            self.assertEqual(seek, len(self.content) - 5)
+            self.assertEqual(fin.read(), self.content[-5:])
+
+    def test_seek_end(self):
+        with self.assertApiCalls(GetObject=1):
+            fin = self.open(defer_seek=True)
+            seek = fin.seek(-4, whence=smart_open.constants.WHENCE_END)
+            self.assertEqual(seek, len(self.content) - 4)
+            self.assertEqual(fin.read(), b'you?')
+
+    def test_seek_past_end(self):
+        with self.assertApiCalls(GetObject=1), patch_invalid_range_response(str(len(self.content))):
+            fin = self.open(defer_seek=True)
+            seek = fin.seek(60)
+            self.assertEqual(seek, len(self.content))
+            self.assertEqual(fin.read(), b'')
+
+    def test_read_empty_file(self):
+        put_to_bucket(contents=b'')
+
+        with self.assertApiCalls(GetObject=1), patch_invalid_range_response('0'):
+            with self.open() as fin:
+                data = fin.read()
+
+        self.assertEqual(data, b'')
+
+    def test_error(self):
+        _real_get = smart_open.s3._get
+
+        def mock_get(*args, **kwargs):
+            if kwargs['Range'] == 'bytes=8-11':
+                raise IOError('bad part')
+            return _real_get(*args, **kwargs)
+
+        with self.open(buffer_size=4, read_ahead_window=4) as fin:
+            with patch('smart_open.s3._get', new=mock_get):
+                self.assertEqual(fin.read(8), self.content[:8])
+                with self.assertRaises(IOError):
+                    fin.read(1)
+
+    def test_negative_read_ahead(self):
+        with self.assertRaises(ValueError):
+            self.open(read_ahead=-1)
+
+    def test_threads_stopped_when_collected(self):
+        fin = self.open()
+        fin.read(6)
+        executor = fin._raw_reader._executor
+        self.assertIsNotNone(executor)
+        del fin
+        gc.collect()
+        self.assertTrue(executor._shutdown)
+
+    def test_smart_open(self):
+        transport_params = {'read_ahead': 4, 'read_ahead_part_size': 5}
+        with smart_open.open('s3://%s/%s' % (BUCKET_NAME, KEY_NAME), 'rb', transport_params=transport_params) as fin:
+            self.assertIsInstance(fin._raw_reader, smart_open.s3._ReadAheadRawReader)
+            self.assertEqual(fin.read(), self.content)
+
+
 @moto.mock_s3
 class MultipartWriterTest(unittest.TestCase):
     """
@@ -534,6 +654,91 @@ class MultipartWriterTest(unittest.TestCase):
         boto3_body = returned_obj.get()['Body'].read()
         self.assertEqual(contents, boto3_body)
 
+    def test_upload_workers(self):
+        """Are the parts uploaded in the background assembled in order?"""
+        part_size = smart_open.s3.MIN_MIN_PART_SIZE
+        lines = [u'%d: ой, то не вечер\n'.encode('utf-8') % i for i in range(1000000)]
+        with smart_open.s3.open(BUCKET_NAME, WRITE_KEY_NAME, 'wb', min_part_size=part_size, upload_workers=3) as fout:
+            for line in lines:
+                fout.write(line)
+
+        self.assertGreater(fout._total_parts, 3)
+        self.assertEqual([part['PartNumber'] for part in fout._parts], list(range(1, fout._total_parts + 1)))
+        with smart_open.s3.open(BUCKET_NAME, WRITE_KEY_NAME, 'rb') as fin:
+            self.assertEqual(fin.read(), b''.join(lines))
+
+    def test_upload_workers_backpressure(self):
+        """Does writing wait while too many parts are being uploaded?"""
+        uploading = []
+        most_uploading = []
+
+        def mock_upload_part(part, part_num, body):
+            uploading.append(part_num)
+            most_uploading.append(len(uploading))
+            time.sleep(0.01)
+            uploading.remove(part_num)
+            return {'ETag': 'etag', 'PartNumber': part_num}
+
+        with patch('smart_open.s3._upload_part', new=mock_upload_part):
+            fout = smart_open.s3.MultipartWriter(BUCKET_NAME, WRITE_KEY_NAME, min_part_size=10, upload_workers=2)
+            for _ in range(20):
+                fout.write(b'0123456789')
+                self.assertLessEqual(len(fout._uploads), 2)
+            fout._wait_for_uploads()
+            fout.terminate()
+
+        self.assertEqual(max(most_uploading), 2)
+        self.assertEqual(len(fout._parts), 20)
+
+    def test_upload_workers_error(self):
+        """Does a failed part abort the multipart upload?"""
+        def mock_upload_part(part, part_num, body):
+            if part_num == 3:
+                raise IOError('lost part #%d' % part_num)
+            return {'ETag': 'etag', 'PartNumber': part_num}
+
+        with patch('smart_open.s3._upload_part', new=mock_upload_part):
+            with self.assertRaises(IOError):
+                with smart_open.s3.MultipartWriter(BUCKET_NAME, WRITE_KEY_NAME, min_part_size=10, upload_workers=2) as fout:
+                    upload_id = fout._mp.id
+                    for _ in range(20):
+                        fout.write(b'0123456789')
+
+        self.assertTrue(fout.closed)
+        uploads = boto3.client('s3').list_multipart_uploads(Bucket=BUCKET_NAME).get('Uploads', [])
+        self.assertNotIn(upload_id, [upload['UploadId'] for upload in uploads])
+        with self.assertRaises(IOError):
+            smart_open.s3.open(BUCKET_NAME, WRITE_KEY_NAME, 'rb')
+
+    def test_buffer_pool(self):
+        """Are the buffers of the parts reused and given back to the pool?"""
+        uploaded = []
+
+        def mock_upload_part(part, part_num, buf):
+            with buf.reader() as body:
+                uploaded.append(body.read())
+            return {'ETag': 'etag', 'PartNumber': part_num}
+
+        pool = smart_open.bufferpool.BufferPool()
+        for upload_workers in (0, 2):
+            del uploaded[:]
+            with patch('smart_open.s3._upload_part', new=mock_upload_part):
+                fout = smart_open.s3.MultipartWriter(
+                    BUCKET_NAME, WRITE_KEY_NAME, min_part_size=10,
+                    upload_workers=upload_workers, buffer_pool=pool,
+                )
+                for i in range(20):
+                    fout.write(b'%010d' % i)
+                fout._wait_for_uploads()
+                fout.terminate()
+
+            self.assertEqual(uploaded, [b'%010d' % i for i in range(20)])
+            self.assertEqual(pool.stats()['used_bytes'], 0)
+
+        stats = pool.stats()
+        self.assertLessEqual(stats['free_buffers'], 3)
+        self.assertGreater(stats['reuse_rate'], 0.8)
+
 
 @moto.mock_s3
 class SinglepartWriterTest(unittest.TestCase):
@@ -782,6 +987,141 @@ class IterBucketCredentialsTest(unittest.TestCase):
         self.assertEqual(len(result), num_keys)
 
 
+@moto.mock_s3
+class StreamBucketTest(unittest.TestCase):
+    def setUp(self):
+        ignore_resource_warnings()
+        cleanup_bucket()
+
+    def tearDown(self):
+        cleanup_bucket()
+
+    def test_readers(self):
+        num_keys = 101
+        populate_bucket(num_keys=num_keys)
+        metrics = {}
+        results = []
+        for key, fin in smart_open.s3.stream_bucket(BUCKET_NAME, workers=4, metrics=metrics):
+            results.append((key, fin.read()))
+
+        expected = [('key_%d' % x, b'%d' % x) for x in range(num_keys)]
+        self.assertEqual(sorted(results), sorted(expected))
+        self.assertEqual(metrics['keys'], num_keys)
+        self.assertEqual(metrics['bytes'], sum(len(content) for _, content in expected))
+        self.assertGreater(metrics['keys_per_second'], 0)
+
+    def test_reader_closed_on_next_key(self):
+        populate_bucket(num_keys=3)
+        readers = []
+        for key, fin in smart_open.s3.stream_bucket(BUCKET_NAME, workers=2):
+            self.assertFalse(readers and readers[-1]._object)
+            readers.append(fin)
+        self.assertIsNone(readers[-1]._object)
+
+    def test_large_object(self):
+        contents = b'0123456789' * 100000
+        put_to_bucket(contents=contents)
+        keys = smart_open.s3.stream_bucket(BUCKET_NAME, buffer_size=1024)
+        key, fin = next(keys)
+        self.assertEqual(len(fin._buffer), 1024)
+        self.assertEqual(fin.read(), contents)
+        keys.close()
+
+    def test_read_past_buffer_while_opening(self):
+        """Are the readers read on with resources the workers do not use?"""
+        num_keys = 30
+        contents = [b'%d' % x * 10000 for x in range(num_keys)]
+        s3 = boto3.resource('s3')
+        for x, content in enumerate(contents):
+            s3.Object(BUCKET_NAME, 'key_%d' % x).put(Body=content)
+
+        _real_get = smart_open.s3._get
+        owners = {}
+        clients = set()
+        shared = []
+
+        def mock_get(s3_object, *args, **kwargs):
+            client = id(s3_object.meta.client)
+            if owners.setdefault(client, s3_object.key) != s3_object.key:
+                shared.append((owners[client], s3_object.key))
+            clients.add(client)
+            return _real_get(s3_object, *args, **kwargs)
+
+        results = {}
+        with patch('smart_open.s3._get', new=mock_get):
+            keys = smart_open.s3.stream_bucket(BUCKET_NAME, workers=4, max_in_flight=4, buffer_size=1024)
+            for key, fin in keys:
+                head = fin.read(2048)
+                #
+                # Seeking opens the object again, from this thread.
+                #
+                fin.seek(5000)
+                results[key] = head + fin.read()
+                del owners[id(fin._resource.meta.client)]
+
+        expected = {'key_%d' % x: content[:2048] + content[5000:] for x, content in enumerate(contents)}
+        self.assertEqual(results, expected)
+        self.assertEqual(shared, [])
+        #
+        # The resources of the closed readers are used again.
+        #
+        self.assertLess(len(clients), num_keys)
+
+    def test_process(self):
+        num_keys = 21
+        populate_bucket(num_keys=num_keys)
+        metrics = {}
+        results = smart_open.s3.stream_bucket(
+            BUCKET_NAME,
+            workers=4,
+            process=lambda key, fin: int(fin.read()) * 2,
+            metrics=metrics,
+        )
+        self.assertEqual(sorted(results), sorted(('key_%d' % x, x * 2) for x in range(num_keys)))
+        self.assertEqual(metrics['keys'], num_keys)
+        self.assertEqual(metrics['bytes'], sum(len(b'%d' % x) for x in range(num_keys)))
+
+    def test_key_limit(self):
+        populate_bucket(num_keys=20)
+        results = list(smart_open.s3.stream_bucket(BUCKET_NAME, key_limit=5, workers=2, max_in_flight=2))
+        self.assertEqual(len(results), 5)
+
+    def test_readers_closed_when_stopped_early(self):
+        populate_bucket(num_keys=20)
+        _real_stream_key = smart_open.s3._stream_key
+        readers = []
+
+        def stream_key(*args, **kwargs):
+            result = _real_stream_key(*args, **kwargs)
+            readers.append(result[1])
+            return result
+
+        with patch('smart_open.s3._stream_key', new=stream_key):
+            results = list(smart_open.s3.stream_bucket(BUCKET_NAME, key_limit=3, workers=4, max_in_flight=8))
+        self.assertEqual(len(results), 3)
+        self.assertGreater(len(readers), 3)
+        self.assertEqual([reader for reader in readers if reader._object is not None], [])
+
+    def test_single_thread(self):
+        populate_bucket(num_keys=5)
+        results = smart_open.s3.stream_bucket(BUCKET_NAME, workers=0, process=lambda key, fin: fin.read())
+        self.assertEqual(sorted(results), [('key_%d' % x, b'%d' % x) for x in range(5)])
+
+    def test_intermittent_error(self):
+        put_to_bucket(contents=b'hello')
+        _real_get = smart_open.s3._get
+        side_effect = [IOError('lost connection'), IOError('lost connection')]
+
+        def mock_get(*args, **kwargs):
+            if side_effect:
+                raise side_effect.pop()
+            return _real_get(*args, **kwargs)
+
+        with patch('smart_open.s3._get', new=mock_get):
+            results = list(smart_open.s3.stream_bucket(BUCKET_NAME, process=lambda key, fin: fin.read()))
+        self.assertEqual(results, [(KEY_NAME, b'hello')])
+
+
 @moto.mock_s3
 class DownloadKeyTest(unittest.TestCase):
     def setUp(self):
@@ -12,6 +12,7 @@ import contextlib
 import io
 import gzip
 import hashlib
+import importlib.util
 import logging
 import os
 import tempfile
@@ -1306,7 +1307,7 @@ class CompressionFormatTest(unittest.TestCase):
     """Test transparent (de)compression."""
 
     def write_read_assertion(self, suffix):
-        test_file = make_buffer(name='file' + suffix)
+        test_file = make_buffer(name='file' + suffix, noclose=True)
         with smart_open.open(test_file, 'wb') as fout:
             fout.write(SAMPLE_BYTES)
         self.assertNotEqual(SAMPLE_BYTES, test_file.getvalue())
@@ -1331,6 +1332,16 @@ class CompressionFormatTest(unittest.TestCase):
         """Can write and read bz2?"""
         self.write_read_assertion('.bz2')
 
+    @unittest.skipUnless(importlib.util.find_spec('zstandard'), 'zstandard unavailable')
+    def test_write_read_zst(self):
+        """Can write and read zstd?"""
+        self.write_read_assertion('.zst')
+
+    @unittest.skipUnless(importlib.util.find_spec('lz4'), 'lz4 unavailable')
+    def test_write_read_lz4(self):
+        """Can write and read lz4?"""
+        self.write_read_assertion('.lz4')
+
     def test_gzip_text(self):
         with tempfile.NamedTemporaryFile(suffix='.gz') as f:
             with smart_open.open(f.name, 'wt') as fout:
@@ -14,10 +14,13 @@ from sqlparse import engine
 from sqlparse import tokens
 from sqlparse import filters
 from sqlparse import formatter
+from sqlparse import lexer
+from sqlparse import cache
+from sqlparse.formatter import Formatter
 
 
 __version__ = '0.4.1'
-__all__ = ['engine', 'filters', 'formatter', 'sql', 'tokens', 'cli']
+__all__ = ['engine', 'filters', 'formatter', 'sql', 'tokens', 'cli', 'Formatter']
 
 
 def parse(sql, encoding=None):
@@ -27,14 +30,23 @@ def parse(sql, encoding=None):
     :param encoding: The encoding of the statement (optional).
     :returns: A tuple of :class:`~sqlparse.sql.Statement` instances.
     """
+    parse_cache = cache.get()
+    if parse_cache is not None:
+        return parse_cache.parse(sql, encoding)
     return tuple(parsestream(sql, encoding))
 
 
 def parsestream(stream, encoding=None):
     """Parses sql statements from file-like object.
 
-    :param stream: A file-like object.
-    :param encoding: The encoding of the stream contents (optional).
+    The stream is read and lexed in chunks, so statements are produced
+    while it is being read and only the current statement is held in
+    memory.
+
+    :param stream: A file-like object, text or binary, or an iterable of
+                   string or bytes chunks.
+    :param encoding: The encoding of the stream contents (optional,
+                     UTF-8 by default).
     :returns: A generator of :class:`~sqlparse.sql.Statement` instances.
     """
     stack = engine.FilterStack()
@@ -50,21 +62,58 @@ def format(sql, encoding=None, **options):
     In addition to the formatting options this function accepts the
     keyword "encoding" which determines the encoding of the statement.
 
+    Use a :class:`~sqlparse.formatter.Formatter` to apply the same options
+    to many statements.
+
     :returns: The formatted SQL statement as string.
     """
-    stack = engine.FilterStack()
-    options = formatter.validate_options(options)
-    stack = formatter.build_filter_stack(stack, options)
-    stack.postprocess.append(filters.SerializerUnicode())
-    return ''.join(stack.run(sql, encoding))
+    parse_cache = cache.get()
+    if parse_cache is not None:
+        return parse_cache.format(sql, encoding, **options)
+    return formatter.get_formatter(options).format(sql, encoding)
 
 
-def split(sql, encoding=None):
+def split(sql, encoding=None, fast=False):
     """Split *sql* into single statements.
 
     :param sql: A string containing one or more SQL statements.
     :param encoding: The encoding of the statement (optional).
+    :param fast: If ``True``, find the statement boundaries without
+      building a token stream. Returns the same statements, but is much
+      faster on large scripts such as database dumps.
     :returns: A list of strings.
     """
+    if fast:
+        splitter = engine.StatementSplitter()
+        sql = lexer.decode(sql, encoding)
+        return [stmt.strip() for stmt in splitter.split(sql)]
     stack = engine.FilterStack()
     return [str(stmt).strip() for stmt in stack.run(sql, encoding)]
+
+
+def enable_cache(max_bytes=cache.DEFAULT_MAX_BYTES):
+    """Cache the results of :func:`parse` and :func:`format`.
+
+    Results are kept for repeated SQL text until the estimated size of
+    the cache exceeds *max_bytes*, then the least recently used ones are
+    dropped. :func:`parse` returns copies of the cached statements.
+
+    :param max_bytes: The memory budget of the cache.
+    :returns: The :class:`~sqlparse.cache.ParseCache` in use.
+    """
+    return cache.enable(max_bytes)
+
+
+def disable_cache():
+    """Stop caching the results of :func:`parse` and :func:`format`."""
+    cache.disable()
+
+
+def cache_info():
+    """Return the statistics of the enabled cache or ``None``.
+
+    :returns: A :class:`~sqlparse.cache.CacheInfo` with hits, misses,
+      evictions, entries, size and max_bytes.
+    """
+    parse_cache = cache.get()
+    return parse_cache.info() if parse_cache is not None else None
@@ -0,0 +1,164 @@
+#
+# Copyright (C) 2009-2020 the sqlparse authors and contributors
+# <see AUTHORS file>
+#
+# This module is part of python-sqlparse and is released under
+# the BSD License: https://opensource.org/licenses/BSD-3-Clause
+
+"""Cache for parsed and formatted SQL.
+
+The cache is opt-in: :func:`sqlparse.enable_cache` makes
+:func:`sqlparse.parse` and :func:`sqlparse.format` look up the SQL text
+before lexing it.
+"""
+
+import sys
+import threading
+from collections import OrderedDict, namedtuple
+
+from sqlparse import engine, formatter
+
+DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+
+CacheInfo = namedtuple(
+    'CacheInfo', 'hits misses evictions entries size max_bytes')
+
+
+class ParseCache:
+    """LRU cache of parse and format results, bounded by *max_bytes*.
+
+    Entries are keyed on the SQL text, its encoding and the formatting
+    options. Their size is estimated from the objects they hold, the
+    least recently used entries are evicted once the total exceeds
+    *max_bytes*. Cached statements are never handed out, each
+    :meth:`parse` returns a copy of them that the caller may modify.
+
+    The cache can be shared by several threads.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._size = 0
+        self._hits = self._misses = self._evictions = 0
+
+    def parse(self, sql, encoding=None):
+        """Like :func:`sqlparse.parse`, returns a tuple of statements."""
+        if not isinstance(sql, (str, bytes)):
+            return tuple(_parsestream(sql, encoding))
+
+        key = ('parse', sql, encoding)
+        statements = self._get(key)
+        if statements is None:
+            statements = tuple(_parsestream(sql, encoding))
+            self._put(key, statements, _sizeof_statements(statements))
+        return tuple(_copy(stmt) for stmt in statements)
+
+    def format(self, sql, encoding=None, **options):
+        """Like :func:`sqlparse.format`, returns the formatted SQL."""
+        options_key = tuple(sorted(options.items()))
+        try:
+            hash(options_key)
+        except TypeError:
+            options_key = None
+        if options_key is None or not isinstance(sql, (str, bytes)):
+            return formatter.get_formatter(options).format(sql, encoding)
+
+        key = ('format', sql, encoding, options_key)
+        result = self._get(key)
+        if result is None:
+            result = formatter.get_formatter(options).format(sql, encoding)
+            self._put(key, result, sys.getsizeof(result))
+        return result
+
+    def info(self):
+        """Returns hit, miss and eviction counts and the current size."""
+        with self._lock:
+            return CacheInfo(self._hits, self._misses, self._evictions,
+                             len(self._entries), self._size, self.max_bytes)
+
+    def clear(self):
+        """Removes all entries and resets the statistics."""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+            self._hits = self._misses = self._evictions = 0
+
+    def _get(self, key):
+        with self._lock:
+            try:
+                value, _ = self._entries[key]
+            except KeyError:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def _put(self, key, value, size):
+        size += sys.getsizeof(key[1])
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = value, size
+            self._size += size
+            while self._size > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._size -= evicted_size
+                self._evictions += 1
+
+
+def _parsestream(sql, encoding):
+    stack = engine.FilterStack()
+    stack.enable_grouping()
+    return stack.run(sql, encoding)
+
+
+def _copy(token, parent=None):
+    """Returns a deep copy of *token* attached to *parent*."""
+    new = object.__new__(type(token))
+    new.value = token.value
+    new.ttype = token.ttype
+    new.parent = parent
+    if token.is_group:
+        new.tokens = [_copy(child, new) for child in token.tokens]
+    return new
+
+
+def _sizeof_statements(statements):
+    size = sys.getsizeof(statements)
+    stack = list(statements)
+    while stack:
+        token = stack.pop()
+        size += sys.getsizeof(token) + sys.getsizeof(token.value)
+        if token.is_group:
+            size += sys.getsizeof(token.tokens)
+            stack.extend(token.tokens)
+    return size
+
+
+_active = None
+
+
+def enable(max_bytes=DEFAULT_MAX_BYTES):
+    """Enables the cache used by :func:`sqlparse.parse` and ``format``.
+
+    Returns the new :class:`ParseCache`, replacing an enabled one.
+    """
+    global _active
+    _active = ParseCache(max_bytes)
+    return _active
+
+
+def disable():
+    """Disables the cache used by :func:`sqlparse.parse` and ``format``."""
+    global _active
+    _active = None
+
+
+def get():
+    """Returns the enabled :class:`ParseCache` or ``None``."""
+    return _active
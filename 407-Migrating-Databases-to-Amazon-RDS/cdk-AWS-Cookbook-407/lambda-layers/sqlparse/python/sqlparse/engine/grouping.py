@@ -15,16 +15,20 @@ T_NAME = (T.Name, T.Name.Placeholder)
 
 
 def _group_matching(tlist, cls):
-    """Groups Tokens that have beginning and end."""
-    opens = []
-    tidx_offset = 0
-    for idx, token in enumerate(list(tlist)):
-        tidx = idx - tidx_offset
+    """Groups Tokens that have beginning and end.
 
+    The child list is rebuilt in a single pass: a group replaces the tail
+    of the new list starting at its opening token, so nothing after it has
+    to be moved.
+    """
+    opens = []
+    tokens = []
+    for token in tlist.tokens:
         if token.is_whitespace:
             # ~50% of tokens will be whitespace. Will checking early
             # for them avoid 3 comparisons, but then add 1 more comparison
             # for the other ~50% of tokens...
+            tokens.append(token)
             continue
 
         if token.is_group and not isinstance(token, cls):
@@ -32,21 +36,25 @@ def _group_matching(tlist, cls):
             # of different type is inside (i.e., case). though ideally  should
             # should check for all open/close tokens at once to avoid recursion
             _group_matching(token, cls)
+            tokens.append(token)
             continue
 
         if token.match(*cls.M_OPEN):
-            opens.append(tidx)
-
-        elif token.match(*cls.M_CLOSE):
-            try:
-                open_idx = opens.pop()
-            except IndexError:
-                # this indicates invalid sql and unbalanced tokens.
-                # instead of break, continue in case other "valid" groups exist
-                continue
-            close_idx = tidx
-            tlist.group_tokens(cls, open_idx, close_idx)
-            tidx_offset += close_idx - open_idx
+            opens.append(len(tokens))
+
+        elif token.match(*cls.M_CLOSE) and opens:
+            # unmatched closing tokens indicate invalid sql and unbalanced
+            # tokens. they are kept in case other "valid" groups exist
+            open_idx = opens.pop()
+            tokens.append(token)
+            grp = cls(tokens[open_idx:])
+            grp.parent = tlist
+            tokens[open_idx:] = [grp]
+            continue
+
+        tokens.append(token)
+
+    tlist.tokens[:] = tokens
 
 
 def group_brackets(tlist):
@@ -384,38 +392,62 @@ def group_values(tlist):
         tlist.group_tokens(sql.Values, start_idx, end_idx, extend=True)
 
 
+# The grouping passes in the order they are run. Each one is listed with
+# the token types and keyword or punctuation values that can start one of
+# its groups; a pass is skipped when the statement contains none of them.
+# Token types also stand for their subtypes, None means the pass always
+# runs.
+GROUPING = [
+    (group_comments, (T.Comment,), ()),
+
+    # _group_matching
+    (group_brackets, (), ('[',)),
+    (group_parenthesis, (), ('(',)),
+    (group_case, (), ('CASE',)),
+    (group_if, (), ('IF',)),
+    (group_for, (), ('FOR', 'FOREACH')),
+    (group_begin, (), ('BEGIN',)),
+
+    (group_functions, (T.Name,), ()),
+    (group_where, (), ('WHERE',)),
+    (group_period, (), ('.',)),
+    (group_arrays, (), ('[',)),
+    (group_identifier, (T.String.Symbol, T.Name), ()),
+    (group_order, (T.Keyword.Order,), ()),
+    (group_typecasts, (), ('::',)),
+    (group_tzcasts, (T.Keyword.TZCast,), ()),
+    (group_typed_literal, (T.Name.Builtin,), ('TIMESTAMP',)),
+    (group_operator, (T.Operator, T.Wildcard), ()),
+    (group_comparison, (T.Operator.Comparison,), ()),
+    (group_as, (), ('AS',)),
+    (group_aliased, None, None),
+    (group_assignment, (T.Assignment,), ()),
+
+    (align_comments, (T.Comment,), ()),
+    (group_identifier_list, (), (',',)),
+    (group_values, (), ('VALUES',)),
+]
+
+
+def _index(stmt):
+    """Returns the token types and keyword or punctuation values in stmt."""
+    ttypes = set()
+    values = set()
+    for token in stmt.flatten():
+        ttypes.add(token.ttype)
+        if token.is_keyword or token.ttype is T.Punctuation:
+            values.add(token.normalized)
+    return ttypes, values
+
+
 def group(stmt):
-    for func in [
-        group_comments,
-
-        # _group_matching
-        group_brackets,
-        group_parenthesis,
-        group_case,
-        group_if,
-        group_for,
-        group_begin,
-
-        group_functions,
-        group_where,
-        group_period,
-        group_arrays,
-        group_identifier,
-        group_order,
-        group_typecasts,
-        group_tzcasts,
-        group_typed_literal,
-        group_operator,
-        group_comparison,
-        group_as,
-        group_aliased,
-        group_assignment,
-
-        align_comments,
-        group_identifier_list,
-        group_values,
-    ]:
-        func(stmt)
+    ttypes, values = _index(stmt)
+    for func, needs_ttypes, needs_values in GROUPING:
+        if needs_ttypes is None \
+                or not values.isdisjoint(needs_values) \
+                or any(ttype in needs for ttype in ttypes
+                       for needs in needs_ttypes):
+            func(stmt)
     return stmt
 
 
@@ -5,7 +5,24 @@
 # This module is part of python-sqlparse and is released under
 # the BSD License: https://opensource.org/licenses/BSD-3-Clause
 
+import re
+
 from sqlparse import sql, tokens as T
+from sqlparse.keywords import FLAGS, SQL_SCANNER, SQL_SCANNER_ACTIONS
+from sqlparse.lexer import SCANNERS
+
+# Runs of text that the lexer is known to split into tokens that never change
+# the split level: single quoted strings, plain numbers, NULL, commas,
+# whitespace and parenthesized lists thereof (like the rows of an extended
+# INSERT). Each alternative starts with a character that no lexer rule of
+# higher priority can match, so the run always ends on a token boundary.
+_VALUE = (r"""(?:'(?:''|\\\\|\\'|[^'])*'"""
+          r'|-?\d+(?:\.\d+)?(?=[,)])'
+          r'|NULL(?=[,)])'
+          r'|,'
+          r'|[ \t\r\n])')
+SAFE_RUN = re.compile(
+    r'(?:{value}|\({value}*\))+'.format(value=_VALUE), FLAGS)
 
 
 class StatementSplitter:
@@ -105,3 +122,61 @@ class StatementSplitter:
         # Yield pending statement (if any)
         if self.tokens and not all(t.is_whitespace for t in self.tokens):
             yield sql.Statement(self.tokens)
+
+    def split(self, text):
+        """Split text and yield the source of each statement.
+
+        Finds the same statement boundaries as :meth:`process` does on the
+        token stream of *text* without creating any
+        :class:`~sqlparse.sql.Token` objects. Tokens are matched with the
+        lexer's compiled scanners and long runs of values, e.g. the rows of
+        an extended INSERT, are skipped in one go.
+        """
+        EOS_TTYPE = T.Whitespace, T.Comment.Single
+        default = SQL_SCANNER, SQL_SCANNER_ACTIONS
+        get_scanner = SCANNERS.get
+        skip = SAFE_RUN.match
+        start = pos = 0
+        end = len(text)
+        has_text = False
+
+        while pos < end:
+            if not self.consume_ws:
+                m = skip(text, pos)
+                if m is not None:
+                    pos = m.end()
+                    if not has_text:
+                        has_text = bool(m.group().strip(' \t\r\n'))
+                    continue
+
+            match, actions = get_scanner(text[pos], default)
+            m = match(text, pos)
+            action = actions[m.lastindex]
+            value = m.group()
+            if callable(action):
+                ttype, value = action(value)
+            else:
+                ttype = action
+
+            if self.consume_ws and ttype not in EOS_TTYPE:
+                yield text[start:pos]
+                self._reset()
+                start = pos
+                has_text = False
+
+            if ttype is T.Punctuation:
+                if value == '(':
+                    self.level += 1
+                elif value == ')':
+                    self.level -= 1
+                elif value == ';' and self.level <= 0:
+                    self.consume_ws = True
+            elif ttype in T.Keyword:
+                self.level += self._change_splitlevel(ttype, value)
+
+            if not has_text:
+                has_text = ttype not in T.Whitespace
+            pos = m.end()
+
+        if has_text:
+            yield text[start:]
@@ -7,7 +7,10 @@
 
 """SQL formatter"""
 
-from sqlparse import filters
+import functools
+
+from sqlparse import filters, tokens as T
+from sqlparse.engine import FilterStack, grouping
 from sqlparse.exceptions import SQLParseError
 
 
@@ -196,3 +199,90 @@ def build_filter_stack(stack, options):
             stack.postprocess.append(fltr)
 
     return stack
+
+
+class Formatter:
+    """Formats SQL according to a fixed set of *options*.
+
+    The options are validated once, so a formatter can be applied to many
+    statements with less overhead than calling :func:`sqlparse.format`
+    for each of them. Available options are documented in
+    :ref:`formatting`.
+    """
+
+    def __init__(self, options=None, **kwargs):
+        options = dict(options or {}, **kwargs)
+        self.options = validate_options(options)
+
+        stack = build_filter_stack(FilterStack(), self.options)
+        self._strip_comments_only = (
+            not stack.preprocess and not stack.postprocess
+            and len(stack.stmtprocess) == 1
+            and isinstance(stack.stmtprocess[0], filters.StripCommentsFilter))
+
+    def run(self, sql, encoding=None):
+        """Returns a generator of the formatted statements in *sql*."""
+        serializer = filters.SerializerUnicode()
+        if self._strip_comments_only:
+            return (serializer.process(_strip_comments(stmt))
+                    for stmt in FilterStack().run(sql, encoding))
+
+        stack = build_filter_stack(FilterStack(), self.options)
+        stack.postprocess.append(serializer)
+        return stack.run(sql, encoding)
+
+    def format(self, sql, encoding=None):
+        """Format *sql* and return it as string."""
+        return ''.join(self.run(sql, encoding))
+
+    __call__ = format
+
+
+@functools.lru_cache(maxsize=64)
+def _cached_formatter(options):
+    return Formatter(dict(options))
+
+
+def get_formatter(options):
+    """Returns a :class:`Formatter` for *options*.
+
+    Formatters are cached by their options, so repeated calls with the
+    same options validate them only once.
+    """
+    key = tuple(sorted(options.items()))
+    try:
+        hash(key)
+    except TypeError:
+        # unhashable option values, e.g. a list given as wrap_after
+        return Formatter(options)
+    return _cached_formatter(key)
+
+
+def _strip_comments(stmt):
+    """Strips comments from an ungrouped statement.
+
+    How a comment is replaced depends on its neighbours in the grouped
+    statement. If all comments come before the first keyword, only
+    group_comments() affects them and the other grouping passes are
+    skipped.
+    """
+    start = None
+    has_comments = False
+    for idx, token in enumerate(stmt.tokens):
+        if token.ttype in T.Comment:
+            if start is not None:
+                break
+            has_comments = True
+        elif start is None and not token.is_whitespace:
+            start = idx
+    else:
+        if not has_comments:
+            return stmt
+        first = stmt.tokens[start] if start is not None else None
+        if first is None or first.ttype in (T.DML, T.DDL, T.CTE) or (
+                first.ttype is T.Keyword and first.normalized != 'AS'):
+            grouping.group_comments(stmt)
+            return filters.StripCommentsFilter().process(stmt)
+
+    grouping.group(stmt)
+    return filters.StripCommentsFilter().process(stmt)
@@ -37,7 +37,8 @@ SQL_REGEX = {
 
         (r"`(``|[^`])*`", tokens.Name),
         (r"´(´´|[^´])*´", tokens.Name),
-        (r'((?<!\S)\$(?:[_A-ZÀ-Ü]\w*)?\$)[\s\S]*?\1', tokens.Literal),
+        (r'(?P<dollar>(?<!\S)\$(?:[_A-ZÀ-Ü]\w*)?\$)[\s\S]*?(?P=dollar)',
+         tokens.Literal),
 
         (r'\?', tokens.Name.Placeholder),
         (r'%(\(\w+\))?s', tokens.Name.Placeholder),
@@ -97,7 +98,30 @@ SQL_REGEX = {
     ]}
 
 FLAGS = re.IGNORECASE | re.UNICODE
-SQL_REGEX = [(re.compile(rx, FLAGS).match, tt) for rx, tt in SQL_REGEX['root']]
+
+
+def compile_scanner(rules):
+    """Compile a list of SQL_REGEX rules into one regular expression.
+
+    The rules are tried in the given order. A last alternative catches
+    characters no rule matches (lexed as tokens.Error). Returns a
+    (match, actions) pair where actions[m.lastindex] is the action of the
+    rule that produced the match m.
+    """
+    scanner = re.compile('|'.join(
+        ['(?P<r{}>{})'.format(i, rx) for i, (rx, _) in enumerate(rules)]
+        + [r'(?P<error>[\s\S])']), FLAGS)
+    actions = [None] * (scanner.groups + 1)
+    for i, (_, tt) in enumerate(rules):
+        actions[scanner.groupindex['r{}'.format(i)]] = tt
+    actions[scanner.groupindex['error']] = tokens.Error
+    return scanner.match, actions
+
+
+SQL_REGEX_RULES = SQL_REGEX['root']
+SQL_SCANNER, SQL_SCANNER_ACTIONS = compile_scanner(SQL_REGEX_RULES)
+
+SQL_REGEX = [(re.compile(rx, FLAGS).match, tt) for rx, tt in SQL_REGEX_RULES]
 
 KEYWORDS = {
     'ABORT': tokens.Keyword,
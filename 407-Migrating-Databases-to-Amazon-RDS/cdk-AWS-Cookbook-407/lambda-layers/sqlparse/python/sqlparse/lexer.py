@@ -12,12 +12,141 @@
 # It's separated from the rest of pygments to increase performance
 # and to allow some customizations.
 
+import codecs
+import re
 from io import TextIOBase
 
-from sqlparse import tokens
-from sqlparse.keywords import SQL_REGEX
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+from sqlparse import keywords, tokens
+from sqlparse.keywords import FLAGS, SQL_REGEX, SQL_SCANNER, \
+    SQL_SCANNER_ACTIONS
 from sqlparse.utils import consume
 
+_ASCII = frozenset(map(chr, range(128)))
+_CATEGORIES = {
+    sre_parse.CATEGORY_DIGIT: r'\d',
+    sre_parse.CATEGORY_NOT_DIGIT: r'\D',
+    sre_parse.CATEGORY_SPACE: r'\s',
+    sre_parse.CATEGORY_NOT_SPACE: r'\S',
+    sre_parse.CATEGORY_WORD: r'\w',
+    sre_parse.CATEGORY_NOT_WORD: r'\W',
+}
+
+
+def _first_chars(pattern):
+    """Return (chars, nullable) for a parsed regular expression.
+
+    *chars* is a superset of the ASCII characters a match can start with,
+    *nullable* tells whether the pattern can match without consuming
+    anything. Anything unknown is treated as matching every character.
+    """
+    chars = set()
+    for op, av in pattern:
+        nullable = False
+        if op is sre_parse.LITERAL:
+            chars.add(chr(av))
+        elif op is sre_parse.NOT_LITERAL or op is sre_parse.ANY:
+            chars |= _ASCII
+        elif op is sre_parse.IN:
+            chars |= _charset(av)
+        elif op is sre_parse.BRANCH:
+            for item in av[1]:
+                first, empty = _first_chars(item)
+                chars |= first
+                nullable = nullable or empty
+        elif op is sre_parse.SUBPATTERN:
+            first, nullable = _first_chars(av[-1])
+            chars |= first
+        elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT):
+            first, empty = _first_chars(av[2])
+            chars |= first
+            nullable = av[0] == 0 or empty
+        elif op in (sre_parse.AT, sre_parse.ASSERT, sre_parse.ASSERT_NOT):
+            nullable = True
+        else:
+            return _ASCII, True
+        if not nullable:
+            return chars, False
+    return chars, True
+
+
+def _charset(items):
+    """Return the ASCII characters in a character class."""
+    chars = set()
+    for op, av in items:
+        if op is sre_parse.NEGATE:
+            return _ASCII
+        elif op is sre_parse.LITERAL:
+            chars.add(chr(av))
+        elif op is sre_parse.RANGE:
+            chars.update(map(chr, range(av[0], min(av[1], 0xFFFF) + 1)))
+        elif op is sre_parse.CATEGORY and av in _CATEGORIES:
+            rx = re.compile(_CATEGORIES[av], FLAGS)
+            chars.update(c for c in _ASCII if rx.match(c))
+        else:
+            return _ASCII
+    return chars
+
+
+def _build_scanners():
+    """Map each ASCII character to a scanner for the tokens starting with it.
+
+    A scanner is a (match, actions) pair like (SQL_SCANNER.match,
+    SQL_SCANNER_ACTIONS), but only contains the rules of SQL_REGEX that can
+    match at that character, still in their original order.
+    """
+    rules = keywords.SQL_REGEX_RULES
+    starts = []
+    for rx, _ in rules:
+        try:
+            chars, nullable = _first_chars(sre_parse.parse(rx, FLAGS))
+        except Exception:
+            chars, nullable = _ASCII, True
+        if nullable:
+            chars = _ASCII
+        # IGNORECASE: a character also starts a match of its other case
+        chars = {v for c in chars for v in (c, c.lower(), c.upper())}
+        starts.append(chars & _ASCII)
+
+    scanners = {}
+    compiled = {}
+    for char in sorted(_ASCII):
+        selected = tuple(i for i, chars in enumerate(starts) if char in chars)
+        if selected not in compiled:
+            compiled[selected] = keywords.compile_scanner(
+                [rules[i] for i in selected])
+        scanners[char] = compiled[selected]
+    return scanners
+
+
+SCANNERS = _build_scanners()
+
+# Size of the reads when lexing a file-like object.
+CHUNK_SIZE = 64 * 1024
+# A token is only taken from a partially read stream when at least this many
+# characters follow it, enough for all look-ahead of the rules in SQL_REGEX.
+LOOKAHEAD = 1024
+# Opening delimiters with no closing one in the rest of the text. The lexer
+# rules for these constructs fail on such input, but may match once more of
+# the stream is read. Strings and quoted names follow the escapes of their
+# rules in SQL_REGEX: a body that can be read up to the end of the text, a
+# trailing backslash or quote maybe starting an escape, is still open.
+UNTERMINATED = re.compile(r"""
+    '(?:[^'\\]|\\'?|'')*'?\Z
+  | "(?:[^"\\]|\\"?|"")*"?\Z
+  | `(?:[^`]|``)*`?\Z
+  | ´(?:[^´]|´´)*´?\Z
+  | /\*(?:(?!\*/)[\s\S])*\Z
+  | (?P<tag>(?<!\S)\$(?:[_A-ZÀ-Ü]\w*)?\$)(?:(?!(?P=tag))[\s\S])*\Z
+  | (?<![\w\])])\[[^\]\[]*\Z
+  | (?:AT|WITH')\s+TIME\s+ZONE\s+'[^']*\Z
+""", FLAGS | re.VERBOSE)
+_OPENERS = frozenset('\'"`´/$[aAwW')
+
 
 class Lexer:
     """Lexer
@@ -25,7 +154,7 @@ class Lexer:
     """
 
     @staticmethod
-    def get_tokens(text, encoding=None):
+    def get_tokens(text, encoding=None, compiled=True):
         """
         Return an iterable of (tokentype, value) pairs generated from
         `text`. If `unfiltered` is set to `True`, the filtering mechanism
@@ -37,24 +166,86 @@ class Lexer:
         Split ``text`` into (tokentype, text) pairs.
 
         ``stack`` is the initial stack (default: ``['root']``)
+
+        By default tokens are matched with the compiled per-character
+        scanners (see :data:`SCANNERS`). With ``compiled=False`` each
+        pattern of SQL_REGEX is tried in turn instead; both produce the
+        same tokens.
         """
-        if isinstance(text, TextIOBase):
-            text = text.read()
-
-        if isinstance(text, str):
-            pass
-        elif isinstance(text, bytes):
-            if encoding:
-                text = text.decode(encoding)
+        if compiled and not isinstance(text, (str, bytes)):
+            return Lexer._get_tokens_chunked(iter_chunks(text, encoding))
+
+        text = decode(text, encoding)
+        if not compiled:
+            return Lexer._get_tokens_by_rule(text)
+        return Lexer._get_tokens_compiled(text)
+
+    @staticmethod
+    def _get_tokens_compiled(text, pos=0):
+        default = SQL_SCANNER, SQL_SCANNER_ACTIONS
+        get_scanner = SCANNERS.get
+        end = len(text)
+        while pos < end:
+            match, actions = get_scanner(text[pos], default)
+            m = match(text, pos)
+            action = actions[m.lastindex]
+            if callable(action):
+                yield action(m.group())
             else:
-                try:
-                    text = text.decode('utf-8')
-                except UnicodeDecodeError:
-                    text = text.decode('unicode-escape')
-        else:
-            raise TypeError("Expected text or file-like object, got {!r}".
-                            format(type(text)))
+                yield action, m.group()
+            pos = m.end()
 
+    @staticmethod
+    def _get_tokens_chunked(chunks):
+        """Lex text arriving in chunks, keeping only the unlexed rest.
+
+        Tokens are only produced while the text read so far decides them:
+        they must be followed by LOOKAHEAD more characters and must not
+        start an unterminated string, quoted name or comment.
+
+        The unlexed rest is only scanned again once the chunks read after
+        it are at least as long as itself, so that a token spanning many
+        chunks, like a large string literal, is lexed in linear time.
+        """
+        default = SQL_SCANNER, SQL_SCANNER_ACTIONS
+        get_scanner = SCANNERS.get
+        text = ''
+        pos = 0
+        pending = []
+        pending_size = 0
+        for chunk in chunks:
+            pending.append(chunk)
+            pending_size += len(chunk)
+            if pending_size < len(text) - pos:
+                continue
+            # keep a character before pos for the look-behind assertions
+            keep = max(pos - 1, 0)
+            pending.insert(0, text[keep:])
+            text = ''.join(pending)
+            pos -= keep
+            pending = []
+            pending_size = 0
+            limit = len(text) - LOOKAHEAD
+            while pos < limit:
+                char = text[pos]
+                match, actions = get_scanner(char, default)
+                m = match(text, pos)
+                if m.end() > limit or (char in _OPENERS
+                                       and UNTERMINATED.match(text, pos)):
+                    break
+                action = actions[m.lastindex]
+                if callable(action):
+                    yield action(m.group())
+                else:
+                    yield action, m.group()
+                pos = m.end()
+
+        if pending:
+            text += ''.join(pending)
+        yield from Lexer._get_tokens_compiled(text, pos)
+
+    @staticmethod
+    def _get_tokens_by_rule(text):
         iterable = enumerate(text)
         for pos, char in iterable:
             for rexmatch, action in SQL_REGEX:
@@ -73,6 +264,66 @@ class Lexer:
                 yield tokens.Error, char
 
 
+def decode(text, encoding=None):
+    """Return *text* as a string.
+
+    *text* may be a string, bytes in *encoding* (UTF-8 is tried if no
+    encoding is given) or a text file-like object.
+    """
+    if isinstance(text, TextIOBase):
+        text = text.read()
+
+    if isinstance(text, str):
+        pass
+    elif isinstance(text, bytes):
+        if encoding:
+            text = text.decode(encoding)
+        else:
+            try:
+                text = text.decode('utf-8')
+            except UnicodeDecodeError:
+                text = text.decode('unicode-escape')
+    else:
+        raise TypeError("Expected text or file-like object, got {!r}".
+                        format(type(text)))
+    return text
+
+
+def iter_chunks(stream, encoding=None):
+    """Yield the contents of *stream* as strings of limited size.
+
+    *stream* is a file-like object, text or binary, or an iterable of
+    string or bytes chunks. Bytes are decoded incrementally using
+    *encoding* (default UTF-8).
+    """
+    if hasattr(stream, 'read'):
+        chunks = _read_chunks(stream)
+    elif hasattr(stream, '__iter__'):
+        chunks = stream
+    else:
+        raise TypeError("Expected text or file-like object, got {!r}".
+                        format(type(stream)))
+
+    decoder = None
+    for chunk in chunks:
+        if isinstance(chunk, (bytes, bytearray)):
+            if decoder is None:
+                decoder = codecs.getincrementaldecoder(encoding or 'utf-8')()
+            chunk = decoder.decode(chunk)
+        if chunk:
+            yield chunk
+    if decoder is not None:
+        yield decoder.decode(b'', final=True)
+
+
+def _read_chunks(stream):
+    while True:
+        chunk = stream.read(CHUNK_SIZE)
+        if not chunk:
+            return
+        yield chunk
+
+
 def tokenize(sql, encoding=None):
     """Tokenize sql.
 
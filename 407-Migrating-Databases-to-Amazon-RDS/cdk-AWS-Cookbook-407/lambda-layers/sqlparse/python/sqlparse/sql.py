@@ -13,9 +13,31 @@ from sqlparse import tokens as T
 from sqlparse.utils import imt, remove_quotes
 
 
+class _SubtypeOf(dict):
+    """Maps token types to whether they are *ttype* or a subtype of it.
+
+    Results are computed on first lookup of each type, which is cheaper
+    than the tuple slicing of ``ttype in parent`` for every token.
+    """
+
+    def __init__(self, ttype):
+        super().__init__()
+        self.ttype = ttype
+
+    def __missing__(self, ttype):
+        self[ttype] = result = ttype in self.ttype
+        return result
+
+
+_is_keyword = _SubtypeOf(T.Keyword)
+_is_whitespace = _SubtypeOf(T.Whitespace)
+
+
 class NameAliasMixin:
     """Implements get_real_name and get_alias."""
 
+    __slots__ = ()
+
     def get_real_name(self):
         """Returns the real name (object name) of this identifier."""
         # a.b
@@ -42,20 +64,34 @@ class Token:
     It represents a single token and has two instance attributes:
     ``value`` is the unchanged value of the token and ``ttype`` is
     the type of the token.
+
+    ``normalized``, ``is_keyword`` and ``is_whitespace`` are derived from
+    these two when accessed, so a token only stores its value, type and
+    parent.
     """
 
-    __slots__ = ('value', 'ttype', 'parent', 'normalized', 'is_keyword',
-                 'is_group', 'is_whitespace')
+    __slots__ = ('value', 'ttype', 'parent')
+
+    is_group = False
 
     def __init__(self, ttype, value):
-        value = str(value)
-        self.value = value
+        self.value = str(value)
         self.ttype = ttype
         self.parent = None
-        self.is_group = False
-        self.is_keyword = ttype in T.Keyword
-        self.is_whitespace = self.ttype in T.Whitespace
-        self.normalized = value.upper() if self.is_keyword else value
+
+    @property
+    def is_keyword(self):
+        return _is_keyword[self.ttype]
+
+    @property
+    def is_whitespace(self):
+        return _is_whitespace[self.ttype]
+
+    @property
+    def normalized(self):
+        if _is_keyword[self.ttype]:
+            return self.value.upper()
+        return self.value
 
     def __str__(self):
         return self.value
@@ -155,11 +191,12 @@ class TokenList(Token):
 
     __slots__ = 'tokens'
 
+    is_group = True
+
     def __init__(self, tokens=None):
         self.tokens = tokens or []
         [setattr(token, 'parent', self) for token in self.tokens]
         super().__init__(None, str(self))
-        self.is_group = True
 
     def __str__(self):
         return ''.join(token.value for token in self.flatten())
@@ -240,7 +277,11 @@ class TokenList(Token):
                     if func(token):
                         return idx, token
         else:
-            for idx, token in enumerate(self.tokens[start:end], start=start):
+            # index the list instead of slicing it, callers walk long
+            # statements calling this repeatedly with increasing start
+            tokens = self.tokens
+            for idx in range(len(tokens))[start:end]:
+                token = tokens[idx]
                 for func in funcs:
                     if func(token):
                         return idx, token
@@ -302,7 +343,7 @@ class TokenList(Token):
     def token_index(self, token, start=0):
         """Return list index of token."""
         start = start if isinstance(start, int) else self.token_index(start)
-        return start + self.tokens[start:].index(token)
+        return self.tokens.index(token, start)
 
     def group_tokens(self, grp_cls, start, end, include_end=True,
                      extend=False):
@@ -322,7 +363,7 @@ class TokenList(Token):
             grp = start
             grp.tokens.extend(subtokens)
             del self.tokens[start_idx + 1:end_idx]
-            grp.value = str(start)
+            grp.value += ''.join(str(token) for token in subtokens)
         else:
             subtokens = self.tokens[start_idx:end_idx]
             grp = grp_cls(subtokens)
@@ -403,6 +444,8 @@ class TokenList(Token):
 class Statement(TokenList):
     """Represents a SQL statement."""
 
+    __slots__ = ()
+
     def get_type(self):
         """Returns the type of a statement.
 
@@ -445,6 +488,8 @@ class Identifier(NameAliasMixin, TokenList):
     Identifiers may have aliases or typecasts.
     """
 
+    __slots__ = ()
+
     def is_wildcard(self):
         """Return ``True`` if this identifier contains a wildcard."""
         _, token = self.token_next_by(t=T.Wildcard)
@@ -473,6 +518,8 @@ class Identifier(NameAliasMixin, TokenList):
 class IdentifierList(TokenList):
     """A list of :class:`~sqlparse.sql.Identifier`\'s."""
 
+    __slots__ = ()
+
     def get_identifiers(self):
         """Returns the identifiers.
 
@@ -485,6 +532,7 @@ class IdentifierList(TokenList):
 
 class TypedLiteral(TokenList):
     """A typed literal, such as "date '2001-09-28'" or "interval '2 hours'"."""
+    __slots__ = ()
     M_OPEN = [(T.Name.Builtin, None), (T.Keyword, "TIMESTAMP")]
     M_CLOSE = T.String.Single, None
     M_EXTEND = T.Keyword, ("DAY", "HOUR", "MINUTE", "MONTH", "SECOND", "YEAR")
@@ -492,6 +540,7 @@ class TypedLiteral(TokenList):
 
 class Parenthesis(TokenList):
     """Tokens between parenthesis."""
+    __slots__ = ()
     M_OPEN = T.Punctuation, '('
     M_CLOSE = T.Punctuation, ')'
 
@@ -502,6 +551,7 @@ class Parenthesis(TokenList):
 
 class SquareBrackets(TokenList):
     """Tokens between square brackets"""
+    __slots__ = ()
     M_OPEN = T.Punctuation, '['
     M_CLOSE = T.Punctuation, ']'
 
@@ -513,15 +563,19 @@ class SquareBrackets(TokenList):
 class Assignment(TokenList):
     """An assignment like 'var := val;'"""
 
+    __slots__ = ()
+
 
 class If(TokenList):
     """An 'if' clause with possible 'else if' or 'else' parts."""
+    __slots__ = ()
     M_OPEN = T.Keyword, 'IF'
     M_CLOSE = T.Keyword, 'END IF'
 
 
 class For(TokenList):
     """A 'FOR' loop."""
+    __slots__ = ()
     M_OPEN = T.Keyword, ('FOR', 'FOREACH')
     M_CLOSE = T.Keyword, 'END LOOP'
 
@@ -529,6 +583,8 @@ class For(TokenList):
 class Comparison(TokenList):
     """A comparison used for example in WHERE clauses."""
 
+    __slots__ = ()
+
     @property
     def left(self):
         return self.tokens[0]
@@ -541,12 +597,15 @@ class Comparison(TokenList):
 class Comment(TokenList):
     """A comment."""
 
+    __slots__ = ()
+
     def is_multiline(self):
         return self.tokens and self.tokens[0].ttype == T.Comment.Multiline
 
 
 class Where(TokenList):
     """A WHERE clause."""
+    __slots__ = ()
     M_OPEN = T.Keyword, 'WHERE'
     M_CLOSE = T.Keyword, (
         'ORDER BY', 'GROUP BY', 'LIMIT', 'UNION', 'UNION ALL', 'EXCEPT',
@@ -555,12 +614,14 @@ class Where(TokenList):
 
 class Having(TokenList):
     """A HAVING clause."""
+    __slots__ = ()
     M_OPEN = T.Keyword, 'HAVING'
     M_CLOSE = T.Keyword, ('ORDER BY', 'LIMIT')
 
 
 class Case(TokenList):
     """A CASE statement with one or more WHEN and possibly an ELSE part."""
+    __slots__ = ()
     M_OPEN = T.Keyword, 'CASE'
     M_CLOSE = T.Keyword, 'END'
 
@@ -615,6 +676,8 @@ class Case(TokenList):
 class Function(NameAliasMixin, TokenList):
     """A function or procedure call."""
 
+    __slots__ = ()
+
     def get_parameters(self):
         """Return a list of parameters."""
         parenthesis = self.tokens[-1]
@@ -628,6 +691,7 @@ class Function(NameAliasMixin, TokenList):
 
 class Begin(TokenList):
     """A BEGIN/END block."""
+    __slots__ = ()
     M_OPEN = T.Keyword, 'BEGIN'
     M_CLOSE = T.Keyword, 'END'
 
@@ -635,10 +699,16 @@ class Begin(TokenList):
 class Operation(TokenList):
     """Grouping of operations"""
 
+    __slots__ = ()
+
 
 class Values(TokenList):
     """Grouping of values"""
 
+    __slots__ = ()
+
 
 class Command(TokenList):
     """Grouping of CLI commands."""
+
+    __slots__ = ()
@@ -6,32 +6,175 @@ import logging
 import os
 import json
 import re
-import sqlparse
+import time
+from pymysql.constants import CLIENT
 from smart_open import open
 
 logger = logging.getLogger()
-logger.setLevel(logging.ERROR)
+logger.setLevel(logging.INFO)
 s3 = boto3.resource('s3')
 session = boto3.session.Session()
 
+# Size of each read from the (decompressed) smart_open stream.
+READ_CHUNK_SIZE = 4 * 1024 * 1024
+# Statements are sent to MySQL in multi-statement packets of about this size.
+# Keep it well below the server's max_allowed_packet (4 MB on RDS by default).
+BATCH_BYTES = 1024 * 1024
+BATCH_STATEMENTS = 500
+# Stop and hand back a resume offset when less than this much time is left.
+TIME_MARGIN_MS = 30 * 1000
+PROGRESS_INTERVAL = 10
 
-def exec_sql_parse(cursor, sql_file):
-    file = open(sql_file, "rb")
-    sql = file.read()
-    file.close()
+# Lexical units of a MySQL script.  Quoted strings and comments may run up to
+# the end of the buffer, which tells the splitter it has to read more data.
+SQL_TOKEN = re.compile(rb"""
+    '(?:[^'\\]|\\.|'')*(?:'|\\?\Z)      |
+    "(?:[^"\\]|\\.|"")*(?:"|\\?\Z)      |
+    `(?:[^`]|``)*(?:`|\Z)               |
+    (?:--(?=\s|\Z)|\#)[^\n]*(?:\n|\Z)   |
+    /\*.*?(?:\*/|\Z)                    |
+    ;                                   |
+    [^'"`\-\#/;]+                       |
+    .
+""", re.VERBOSE | re.DOTALL)
+COMMENT_START = (b'--', b'#', b'/*')
+FLUSH_LOGS = re.compile(rb'flush[ \t]*logs', re.IGNORECASE)
+USE_DB = re.compile(rb'use\s+`?([^`\s]+)`?\s*$', re.IGNORECASE)
 
-    parsed = sqlparse.split(sql)
 
-    for stmt in parsed:
-        parsed_stmt = sqlparse.format(stmt, strip_comments=True).strip()
-        if not parsed_stmt.startswith(';') and not re.search(r'flush[ \t]*logs', parsed_stmt):
-            logger.info("Parsed Statement: " + parsed_stmt)
-            try:
-                cursor.execute(parsed_stmt)
-            except pymysql.OperationalError as e:
-                logger.error("MySQLError OperationalError during execute statement \n\tArgs: " + (str(e.args)))
-            except pymysql.ProgrammingError as e:
-                logger.error("MySQLError ProgrammingError during execute statement \n\tArgs: " + (str(e.args)))
+def iter_statements(reader, chunk_size=READ_CHUNK_SIZE, offset=0):
+    """Split a SQL script read from reader into statements.
+
+    Yields (statement, end_offset) pairs where statement is the statement
+    bytes with comments removed and end_offset is the position in the stream
+    just after its terminating semicolon. Only the statement currently being
+    scanned is held in memory.
+    """
+    buf = b''
+    pos = 0
+    parts = []
+    eof = False
+    while not eof:
+        chunk = reader.read(chunk_size)
+        eof = not chunk
+        buf = buf[pos:] + chunk
+        offset += pos
+        pos = 0
+        size = len(buf)
+        while pos < size:
+            m = SQL_TOKEN.match(buf, pos)
+            end = m.end()
+            if end == size and not eof:
+                # the token may continue in the next chunk
+                break
+            token = m.group()
+            pos = end
+            if token == b';':
+                yield b''.join(parts).strip(), offset + pos
+                parts = []
+            elif token.startswith(COMMENT_START):
+                parts.append(b' ')
+            else:
+                parts.append(token)
+
+    stmt = b''.join(parts).strip()
+    if stmt:
+        yield stmt, offset + pos
+
+
+def exec_batch(cursor, batch):
+    """Execute batch in as few round trips as possible.
+
+    Returns the number of affected rows. A failing statement is logged and
+    skipped, the remainder of the batch is sent again.
+    """
+    rows = 0
+    while batch:
+        done = 0
+        try:
+            cursor.execute(b';\n'.join(batch))
+            rows += max(cursor.rowcount, 0)
+            done += 1
+            while cursor.nextset():
+                rows += max(cursor.rowcount, 0)
+                done += 1
+        except (pymysql.OperationalError, pymysql.ProgrammingError) as e:
+            logger.error("MySQLError " + type(e).__name__ + " during execute statement \n\tArgs: " + (str(e.args))
+                         + "\n\tStatement: " + batch[done][:200].decode('utf-8', 'replace'))
+            done += 1
+        batch = batch[done:]
+    return rows
+
+
+def log_progress(stats):
+    elapsed = max(time.time() - stats["started"], 1e-6)
+    logger.info(
+        "Loaded %d statements, %d rows, %d bytes (offset %d) in %.1fs: %.0f rows/sec, %.0f bytes/sec",
+        stats["statements"], stats["rows"], stats["bytes"], stats["offset"], elapsed,
+        stats["rows"] / elapsed, stats["bytes"] / elapsed)
+
+
+def exec_sql_stream(conn, sql_file, start_offset=0, database=None, context=None):
+    """Stream sql_file into MySQL in batched multi-statement packets.
+
+    Commits after every batch. Returns a dict of statistics whose "offset" is
+    the position just after the last committed statement and "database" the
+    schema selected by the script at that point; pass both back to resume an
+    interrupted load.
+    """
+    stats = {
+        "statements": 0,
+        "rows": 0,
+        "bytes": 0,
+        "offset": start_offset,
+        "database": database,
+        "complete": False,
+        "started": time.time(),
+    }
+    last_report = stats["started"]
+    batch = []
+    batch_bytes = 0
+
+    with open(sql_file, "rb") as reader, conn.cursor() as cursor:
+        if start_offset:
+            reader.seek(start_offset)
+        if database:
+            conn.select_db(database)
+
+        def flush(end_offset):
+            stats["rows"] += exec_batch(cursor, batch)
+            conn.commit()
+            stats["statements"] += len(batch)
+            stats["bytes"] += end_offset - stats["offset"]
+            stats["offset"] = end_offset
+
+        for stmt, end_offset in iter_statements(reader, offset=start_offset):
+            if stmt and not FLUSH_LOGS.match(stmt):
+                batch.append(stmt)
+                batch_bytes += len(stmt)
+                use = USE_DB.match(stmt)
+                if use:
+                    stats["database"] = use.group(1).decode()
+            if batch_bytes < BATCH_BYTES and len(batch) < BATCH_STATEMENTS:
+                continue
+
+            flush(end_offset)
+            batch = []
+            batch_bytes = 0
+
+            now = time.time()
+            if now - last_report >= PROGRESS_INTERVAL:
+                log_progress(stats)
+                last_report = now
+            if context is not None and context.get_remaining_time_in_millis() < TIME_MARGIN_MS:
+                log_progress(stats)
+                return stats
+        else:
+            flush(reader.tell())
+
+    stats["complete"] = True
+    log_progress(stats)
+    return stats
 
 
 def lambda_handler(event, context):
@@ -44,6 +187,8 @@ def lambda_handler(event, context):
     secret = os.environ["DB_SECRET_ARN"]
     initial_sql = "employees.sql.gz"
     data_file = ""
+    event = event or {}
+    start_offset = int(event.get("start_offset", 0))
 
     client = session.client(
         service_name='secretsmanager',
@@ -64,7 +209,8 @@ def lambda_handler(event, context):
         sys.exit(e)
 
     try:
-        conn = pymysql.connect(rds_host, user=username, passwd=password, db=db_name, connect_timeout=5)
+        conn = pymysql.connect(rds_host, user=username, passwd=password, db=db_name, connect_timeout=5,
+                               client_flag=CLIENT.MULTI_STATEMENTS)
         logger.info("SUCCESS: Connected to the MySQL RDS Database!")
     except pymysql.MySQLError as e:
         logger.error("ERROR: Could not connect to MySQL RDS Database!")
@@ -72,11 +218,14 @@ def lambda_handler(event, context):
         sys.exit(e)
 
     sql_file = "s3://" + s3_bucket + "/" + initial_sql
-    exec_sql_parse(conn.cursor(), sql_file)
+    stats = exec_sql_stream(conn, sql_file, start_offset, event.get("database"), context)
+    if not stats["complete"]:
+        # Out of time: invoke again with this payload to continue the load.
+        return {"start_offset": stats["offset"], "database": stats["database"]}
 
     if data_file:
         sql_data_file = "s3://" + s3_bucket + "/" + data_file
-        exec_sql_parse(conn.cursor(), sql_data_file)
+        exec_sql_stream(conn, sql_data_file)
 
     with conn.cursor() as cursor:
         cursor.execute("show tables")